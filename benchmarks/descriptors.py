@@ -0,0 +1,66 @@
+"""
+descriptors.py
+
+compares the classification and formatting of events by the DescriptorRegistry with the lookup of the LogSource
+of the channel and format_map
+
+usage: python -m benchmarks.descriptors [--number NUMBER]
+"""
+import argparse
+import timeit
+
+from evtxtools.DescriptorRegistry import DESCRIPTORS
+from evtxtools.EventDescriptor import EVENT_DESCRIPTORS
+from evtxtools.LogSource import LogSource
+from evtxtools.WindowsEvent import projected_fields
+
+CHANNEL = 'Security'
+EVENT_ID = 4624
+EVENT_DATA = {
+    'LogonType': 'Network',
+    'TargetDomainName': 'CORP',
+    'TargetUserName': 'alice',
+    'WorkstationName': 'WS01',
+    'IpAddress': '10.0.0.11',
+}
+DESCRIPTOR = DESCRIPTORS.get(CHANNEL, EVENT_ID)
+VALUES = tuple(EVENT_DATA.get(field) for field in projected_fields(DESCRIPTOR))
+
+
+class FriendlyDict(dict):
+    def __missing__(self, key):
+        return '-'
+
+
+def enum_classify():
+    descriptor = EVENT_DESCRIPTORS[EVENT_ID]
+    return descriptor if descriptor.log_source == LogSource(CHANNEL) else None
+
+
+def format_map_description():
+    event_data = {field: value for field, value in zip(projected_fields(DESCRIPTOR), VALUES)}
+    return DESCRIPTOR.description.format_map(FriendlyDict(event_data))
+
+
+CASES = [
+    ('classify', enum_classify, lambda: DESCRIPTORS.get(CHANNEL, EVENT_ID)),
+    ('format', format_map_description, lambda: DESCRIPTOR.formatter.format(VALUES)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='event descriptor micro-benchmark')
+    parser.add_argument('--number', help='number of iterations per case', type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, baseline, candidate in CASES:
+        assert baseline() == candidate()
+        baseline_ns = timeit.timeit(baseline, number=args.number) / args.number * 1e9
+        candidate_ns = timeit.timeit(candidate, number=args.number) / args.number * 1e9
+        print("{name:10} LogSource/format_map: {baseline:8.0f} ns   DescriptorRegistry: {candidate:8.0f} ns   "
+              "speedup: {speedup:5.1f}x".format(name=name, baseline=baseline_ns, candidate=candidate_ns,
+                                                 speedup=baseline_ns / candidate_ns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+events.py
+
+measures the memory retained per WindowsEvent, compared with an event which keeps the complete EventData
+in its __dict__ (the layout used before the events were projected to the fields used by their descriptions)
+
+usage: python -m benchmarks.events [--number NUMBER]
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+
+import orjson
+
+from evtxtools.EventDescriptor import EVENT_DESCRIPTORS
+from evtxtools.Timestamp import parse_record_timestamp
+from evtxtools.WindowsEvent import WindowsEvent
+
+USERS = ['alice', 'bob', 'carol', 'dave', 'admin']
+HOSTS = ['WS{:02d}'.format(i) for i in range(1, 20)]
+
+
+class FullWindowsEvent:
+    """
+    keeps the same attributes as WindowsEvent did before, including the complete event data
+    """
+    def __init__(self, record: dict):
+        record_data = orjson.loads(record['data'])
+        self.__event_id = int(record_data['Event']['System']['EventID'])
+        self.__descriptor = EVENT_DESCRIPTORS[self.__event_id]
+        self.__timestamp = parse_record_timestamp(record['timestamp'])
+        self.__event_data = record_data['Event']['EventData']
+        self.__activity_id = self.__event_data['TargetLogonId']
+
+
+def logon_record(rnd: random.Random, record_id: int) -> dict:
+    user = rnd.choice(USERS)
+    host = rnd.choice(HOSTS)
+    data = {
+        'Event': {
+            'System': {
+                'EventID': 4624,
+                'Channel': 'Security',
+                'Computer': 'DC01.corp.example.com',
+                'EventRecordID': record_id,
+            },
+            'EventData': {
+                'SubjectUserSid': 'S-1-5-18',
+                'SubjectUserName': 'DC01$',
+                'SubjectDomainName': 'CORP',
+                'SubjectLogonId': '0x3e7',
+                'TargetUserSid': 'S-1-5-21-1004336348-1177238915-682003330-{}'.format(1000 + USERS.index(user)),
+                'TargetUserName': user,
+                'TargetDomainName': 'CORP',
+                'TargetLogonId': '0x{:x}'.format(0x100000 + record_id),
+                'LogonType': rnd.choice([2, 3, 10]),
+                'LogonProcessName': 'NtLmSsp ',
+                'AuthenticationPackageName': 'NTLM',
+                'WorkstationName': host,
+                'LogonGuid': '00000000-0000-0000-0000-000000000000',
+                'TransmittedServices': '-',
+                'LmPackageName': 'NTLM V2',
+                'KeyLength': 128,
+                'ProcessId': '0x0',
+                'ProcessName': '-',
+                'IpAddress': '10.0.0.{}'.format(HOSTS.index(host) + 10),
+                'IpPort': str(rnd.randint(49152, 65535)),
+                'ImpersonationLevel': '%%1833',
+                'RestrictedAdminMode': '-',
+                'TargetOutboundUserName': '-',
+                'TargetOutboundDomainName': '-',
+                'VirtualAccount': '%%1843',
+                'TargetLinkedLogonId': '0x0',
+                'ElevatedToken': '%%1842',
+            }
+        }
+    }
+    return {
+        'event_record_id': record_id,
+        'timestamp': '2020-11-23 08:{:02d}:{:02d}.{:06d} UTC'.format(record_id // 60 % 60, record_id % 60, record_id),
+        'data': orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+    }
+
+
+def retained_bytes(factory, records: list) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    events = [factory(r) for r in records]
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(events) == len(records)
+    return (after - before) / len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='memory per retained event')
+    parser.add_argument('--number', help='number of events', type=int, default=20000)
+    args = parser.parse_args()
+
+    rnd = random.Random(1)
+    records = [logon_record(rnd, i) for i in range(1, args.number + 1)]
+    full = retained_bytes(FullWindowsEvent, records)
+    slim = retained_bytes(WindowsEvent, records)
+    print("complete event data: {full:8.0f} bytes/event   WindowsEvent: {slim:8.0f} bytes/event   "
+          "ratio: {ratio:5.1f}x".format(full=full, slim=slim, ratio=full / slim))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+fixtures.py
+
+creates synthetic evtx files for the benchmarks. The records look like the records of a Security log of a
+workstation: logons, logoffs, failed logons and explicit credential usage, between lots of process and network
+events which are not relevant for logins.py. Names are stored inline in the binary XML, without templates,
+which is valid, but less compact than the files written by Windows.
+"""
+import random
+import struct
+import tempfile
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from evtx import PyEvtxParser
+
+FILE_HEADER_SIZE = 4096
+CHUNK_SIZE = 65536
+CHUNK_HEADER_SIZE = 512
+FILETIME_EPOCH = datetime(1601, 1, 1)
+START = datetime(2020, 11, 23, 8, 0, 0)
+
+
+def filetime(timestamp: datetime) -> int:
+    return (timestamp - FILETIME_EPOCH) // timedelta(microseconds=1) * 10
+
+
+class BinXmlWriter:
+    def __init__(self, offset: int):
+        # names are referenced by their offset in the chunk
+        self.__offset = offset
+        self.data = bytearray()
+
+    def __name(self, name: str):
+        self.data += struct.pack('<I', self.__offset + len(self.data) + 4)
+        self.data += struct.pack('<IHH', 0, 0, len(name)) + name.encode('utf-16-le') + b'\0\0'
+
+    def __value(self, value):
+        value = str(value)
+        self.data += bytes([0x05, 0x01]) + struct.pack('<H', len(value)) + value.encode('utf-16-le')
+
+    def element(self, name: str, attributes: dict = None, children: list = None, text=None):
+        self.data += bytes([0x41 if attributes else 0x01]) + struct.pack('<h', -1)
+        size_offset = len(self.data)
+        self.data += b'\0\0\0\0'
+        start = len(self.data)
+        self.__name(name)
+        if attributes:
+            attributes_size_offset = len(self.data)
+            self.data += b'\0\0\0\0'
+            attributes_start = len(self.data)
+            items = list(attributes.items())
+            for i, (key, value) in enumerate(items):
+                # 0x46 is followed by another attribute, 0x06 is the last one
+                self.data += bytes([0x46 if i < len(items) - 1 else 0x06])
+                self.__name(key)
+                self.__value(value)
+            struct.pack_into('<I', self.data, attributes_size_offset, len(self.data) - attributes_start)
+        if children is None and text is None:
+            self.data += b'\x03'
+        else:
+            self.data += b'\x02'
+            if text is not None:
+                self.__value(text)
+            for child in children or []:
+                self.element(*child)
+            self.data += b'\x04'
+        struct.pack_into('<I', self.data, size_offset, len(self.data) - start)
+
+
+def event_xml(event: dict) -> tuple:
+    system = [
+        ('Provider', {'Name': 'Microsoft-Windows-Security-Auditing',
+                      'Guid': '{54849625-5478-4994-a5ba-3e3b0328c30d}'}),
+        ('EventID', None, None, event['event_id']),
+        ('Version', None, None, 2),
+        ('Level', None, None, 0),
+        ('Task', None, None, 12544),
+        ('TimeCreated', {'SystemTime': event['timestamp'].strftime('%Y-%m-%dT%H:%M:%S.%fZ')}),
+        ('EventRecordID', None, None, event['record_id']),
+        ('Correlation', {'ActivityID': event['activity_id']} if event.get('activity_id') else None),
+        ('Execution', {'ProcessID': 4, 'ThreadID': 8}),
+        ('Channel', None, None, 'Security'),
+        ('Computer', None, None, 'WS01.corp.local'),
+        ('Security', None),
+    ]
+    data = [('Data', {'Name': key}, None, value) for key, value in event['data'].items()]
+    return ('Event', {'xmlns': 'http://schemas.microsoft.com/win/2004/08/events/event'},
+            [('System', None, system), ('EventData', None, data)])
+
+
+def encode_record(event: dict, offset: int) -> bytes:
+    writer = BinXmlWriter(offset + 24)
+    writer.data += bytes([0x0f, 1, 1, 0])
+    writer.element(*event_xml(event))
+    writer.data += b'\x00'
+    size = 24 + len(writer.data) + 4
+    return struct.pack('<IIQQ', 0x00002a2a, size, event['record_id'], filetime(event['timestamp'])) \
+        + bytes(writer.data) + struct.pack('<I', size)
+
+
+def encode_chunk(events: list) -> tuple:
+    """
+    returns the chunk and the number of events which fit into it
+    """
+    data = bytearray(CHUNK_HEADER_SIZE)
+    count = 0
+    last_record_offset = 0
+    for event in events:
+        record = encode_record(event, len(data))
+        if len(data) + len(record) > CHUNK_SIZE:
+            break
+        last_record_offset = len(data)
+        data += record
+        count += 1
+    free_space_offset = len(data)
+    data += bytes(CHUNK_SIZE - len(data))
+
+    first, last = events[0]['record_id'], events[count - 1]['record_id']
+    header = b'ElfChnk\0' + struct.pack('<QQQQIII', first, last, first, last, 128, last_record_offset,
+                                        free_space_offset)
+    data[0:len(header)] = header
+    struct.pack_into('<I', data, 52, zlib.crc32(bytes(data[CHUNK_HEADER_SIZE:free_space_offset])))
+    struct.pack_into('<I', data, 124, zlib.crc32(bytes(data[0:120]) + bytes(data[128:CHUNK_HEADER_SIZE])))
+    return bytes(data), count
+
+
+def write_evtx(path: Path, events: list):
+    chunks = list()
+    i = 0
+    while i < len(events):
+        chunk, count = encode_chunk(events[i:])
+        chunks.append(chunk)
+        i += count
+
+    header = b'ElfFile\0' + struct.pack('<QQQIHHHH', 0, len(chunks) - 1, events[-1]['record_id'] + 1,
+                                        128, 1, 3, FILE_HEADER_SIZE, len(chunks))
+    header += bytes(120 - len(header))
+    header += struct.pack('<II', 0, zlib.crc32(header))
+    header += bytes(FILE_HEADER_SIZE - len(header))
+    with open(path, 'wb') as f:
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+
+
+def security_events(count: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    timestamp = START
+    events = list()
+    open_sessions = list()
+    for record_id in range(1, count + 1):
+        timestamp += timedelta(seconds=rnd.randint(1, 90), microseconds=rnd.randint(0, 999999))
+        event = {'record_id': record_id, 'timestamp': timestamp}
+        kind = rnd.random()
+        if kind < 0.08:
+            logon_id = '0x%x' % rnd.randint(0x10000, 0xffffff)
+            open_sessions.append(logon_id)
+            user = rnd.choice(['alice', 'bob', 'carol', 'SYSTEM', 'ANONYMOUS LOGON'])
+            sid = {'SYSTEM': 'S-1-5-18', 'ANONYMOUS LOGON': 'S-1-5-7'}.get(
+                user, 'S-1-5-21-1-2-3-%d' % rnd.randint(1000, 1010))
+            event.update(event_id=4624, data={
+                'SubjectUserSid': 'S-1-5-18', 'TargetUserSid': sid, 'TargetUserName': user,
+                'TargetDomainName': 'CORP', 'TargetLogonId': logon_id, 'LogonType': rnd.choice([2, 3, 10]),
+                'WorkstationName': 'WS%02d' % rnd.randint(1, 20), 'IpAddress': '10.0.0.%d' % rnd.randint(1, 254),
+                'IpPort': rnd.randint(1024, 65535)})
+        elif kind < 0.14 and len(open_sessions) > 0:
+            logon_id = open_sessions.pop(rnd.randrange(len(open_sessions)))
+            event.update(event_id=rnd.choice([4634, 4647]), data={
+                'TargetUserSid': 'S-1-5-21-1-2-3-1000', 'TargetUserName': 'x', 'TargetDomainName': 'CORP',
+                'TargetLogonId': logon_id, 'LogonType': 3})
+        elif kind < 0.16:
+            event.update(event_id=4625, data={
+                'TargetUserSid': 'S-1-0-0', 'TargetUserName': 'mallory', 'TargetDomainName': 'CORP',
+                'LogonType': 3, 'WorkstationName': 'EVIL', 'IpAddress': '192.168.1.66', 'Status': '0xc000006d'})
+        elif kind < 0.17:
+            event.update(event_id=4648,
+                         activity_id='{ABCDEF%02d-0000-0000-0000-000000000000}' % rnd.randint(0, 30),
+                         data={'SubjectUserName': 'alice', 'TargetUserName': 'admin',
+                               'ProcessName': 'C:\\Windows\\System32\\runas.exe'})
+        else:
+            event.update(event_id=rnd.choice([4688, 4689, 4672, 5156, 4703]), data={
+                'SubjectUserSid': 'S-1-5-18', 'SubjectUserName': 'WS01$',
+                'NewProcessName': 'C:\\Windows\\System32\\svchost.exe',
+                'CommandLine': 'svchost.exe -k netsvcs -p ' + 'x' * rnd.randint(0, 200)})
+        events.append(event)
+    return events
+
+
+def security_log(count: int, directory: Path = None) -> Path:
+    """
+    writes a Security.evtx with count records into the directory (or a new temporary directory),
+    and returns the path of the file
+    """
+    directory = Path(directory or tempfile.mkdtemp(prefix='evtxtools-benchmark-'))
+    path = directory / 'Security.evtx'
+    write_evtx(path, security_events(count))
+    return path
+
+
+def security_records(path: Path) -> list:
+    """
+    returns the records of the file as returned by PyEvtxParser.records_json()
+    """
+    return list(PyEvtxParser(str(path)).records_json())
@@ -0,0 +1,209 @@
+"""
+pipeline.py
+
+measures the throughput and the peak memory of the stages of logins.py and evtx2elasticsearch.py, using a
+synthetic Security.evtx (see fixtures.py). The results are written as JSON, and can be compared with the results
+of a previous run.
+
+usage: python -m benchmarks.pipeline [--records RECORDS] [--repeat REPEAT] [--output OUTPUT] [--compare BASELINE]
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from importlib import metadata
+from operator import attrgetter
+
+from benchmarks import fixtures
+from evtxtools.Activity import Activity
+from evtxtools.EventDescriptor import EVENT_DESCRIPTORS
+from evtxtools.EvtxParser import EvtxParser
+from evtxtools.RawEventList import RawEventList
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+from evtxtools.WellKnownSids import WellKnownSidFilter
+from evtxtools.WindowsEvent import WindowsEvent
+
+
+@contextlib.contextmanager
+def silenced():
+    """
+    discards everything written to stdout and stderr, including the output of progress bars
+    which have kept a reference to the original streams
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+        finally:
+            sys.stderr.flush()
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def windows_events(records: list) -> list:
+    events = list()
+    for record in records:
+        try:
+            events.append(WindowsEvent(record))
+        except WindowsEvent.IgnoreThisEvent:
+            pass
+    return events
+
+
+def stage_windows_event(path, records):
+    windows_events(records)
+    return len(records)
+
+
+def stage_raw_event_list(path, records):
+    event_list = RawEventList([path], set(EVENT_DESCRIPTORS.keys()), datetime.min, datetime.max)
+    for _ in event_list:
+        pass
+    return event_list.records_read
+
+
+def stage_parse_events(path, records):
+    parser = EvtxParser([path], WellKnownSidFilter(), datetime.min, datetime.max)
+    # the progress bar and the sessions are not part of the measurement
+    with silenced():
+        parser.parse_events()
+        parser.print_logins()
+    return len(records)
+
+
+def stage_event_to_dict(path, records):
+    from el import event_to_dict
+    for record in records:
+        event_to_dict(filename=path.name, swe=SimpleWindowsEvent(record), index='benchmark')
+    return len(records)
+
+
+def stage_activity_sort(path, records, events=None):
+    activities = dict()
+    for event in events:
+        activity = activities.get(event.activity_id)
+        if activity is None:
+            activity = Activity(None)
+            activities[event.activity_id] = activity
+        activity.add_event(event)
+    sorted(activities.values(), key=attrgetter('sort_key'))
+    return len(events)
+
+
+STAGES = [
+    ('WindowsEvent', stage_windows_event),
+    ('RawEventList', stage_raw_event_list),
+    ('EvtxParser.parse_events+print_logins', stage_parse_events),
+    ('SimpleWindowsEvent+event_to_dict', stage_event_to_dict),
+    ('Activity grouping+sorting', stage_activity_sort),
+]
+
+
+def measure(stage, path, records, repeat: int, **kwargs) -> dict:
+    seconds = None
+    count = 0
+    for _ in range(0, repeat):
+        gc.collect()
+        start = time.perf_counter()
+        count = stage(path, records, **kwargs)
+        duration = time.perf_counter() - start
+        seconds = duration if seconds is None else min(seconds, duration)
+
+    gc.collect()
+    tracemalloc.start()
+    stage(path, records, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'records': count,
+        'seconds': seconds,
+        'records_per_second': count / seconds if seconds > 0 else None,
+        'peak_memory_bytes': peak,
+    }
+
+
+def version(package: str) -> str:
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def compare(results: dict, baseline: dict):
+    print("{stage:40} {baseline:>14} {current:>14} {ratio:>8}".format(
+        stage='stage', baseline='baseline rec/s', current='current rec/s', ratio='ratio'), file=sys.stderr)
+    for name, result in results['stages'].items():
+        previous = baseline.get('stages', dict()).get(name)
+        if previous is None or 'records_per_second' not in previous or 'records_per_second' not in result:
+            continue
+        print("{stage:40} {baseline:14.0f} {current:14.0f} {ratio:7.2f}x".format(
+            stage=name,
+            baseline=previous['records_per_second'],
+            current=result['records_per_second'],
+            ratio=result['records_per_second'] / previous['records_per_second']), file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='throughput and memory of the processing stages')
+    parser.add_argument('--records', help='number of records in the synthetic Security.evtx', type=int,
+                        default=20000)
+    parser.add_argument('--repeat', help='number of runs per stage, the fastest one is reported', type=int,
+                        default=3)
+    parser.add_argument('--output', help='write the results to this file instead of stdout', type=str)
+    parser.add_argument('--compare', help='results of a previous run, to be compared with this run', type=str)
+    args = parser.parse_args()
+
+    path = fixtures.security_log(args.records)
+    try:
+        records = fixtures.security_records(path)
+        events = windows_events(records)
+
+        results = {
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'evtx': version('evtx'),
+                'orjson': version('orjson'),
+            },
+            'records': len(records),
+            'stages': dict(),
+        }
+        for name, stage in STAGES:
+            kwargs = {'events': events} if stage is stage_activity_sort else dict()
+            try:
+                results['stages'][name] = measure(stage, path, records, args.repeat, **kwargs)
+            except ImportError as e:
+                # e.g. elasticsearch_dsl is not installed
+                results['stages'][name] = {'skipped': str(e)}
+    finally:
+        shutil.rmtree(path.parent)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
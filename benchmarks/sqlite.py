@@ -0,0 +1,93 @@
+"""
+sqlite.py
+
+measures the throughput of the stages of evtx2sqlite.py, using a synthetic Security.evtx (see fixtures.py):
+parsing the records, converting them into rows, inserting the rows, and the whole import including the worker
+processes and the creation of the indexes.
+
+usage: python -m benchmarks.sqlite [--records RECORDS] [--repeat REPEAT] [--workers WORKERS]
+"""
+import argparse
+import gc
+import logging
+import os
+import shutil
+import time
+
+from benchmarks import fixtures
+from benchmarks.pipeline import silenced
+from evtx2sqlite import convert_records, evtx2sqlite, open_database, SqliteLoader
+from evtxtools.RecordSource import EvtxFileSource
+
+
+def stage_parse(path, records, directory):
+    return len(fixtures.security_records(path))
+
+
+def stage_convert(path, records, directory):
+    return len(convert_records(records))
+
+
+def stage_insert(path, records, directory, rows=None):
+    connection = open_database(directory / 'insert.db')
+    try:
+        loader = SqliteLoader(connection)
+        for row in rows:
+            loader.add(row)
+        loader.flush()
+        return loader.events_written
+    finally:
+        connection.close()
+        (directory / 'insert.db').unlink()
+
+
+def stage_evtx2sqlite(path, records, directory, workers=None):
+    with silenced():
+        evtx2sqlite([EvtxFileSource(path)], directory / 'import.db', workers=workers)
+    (directory / 'import.db').unlink()
+    return len(records)
+
+
+def measure(stage, path, records, directory, repeat: int, **kwargs) -> float:
+    seconds = None
+    for _ in range(0, repeat):
+        gc.collect()
+        start = time.perf_counter()
+        count = stage(path, records, directory, **kwargs)
+        duration = time.perf_counter() - start
+        assert count == len(records)
+        seconds = duration if seconds is None else min(seconds, duration)
+    return len(records) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='throughput of the stages of evtx2sqlite.py')
+    parser.add_argument('--records', help='number of records in the synthetic Security.evtx', type=int,
+                        default=20000)
+    parser.add_argument('--repeat', help='number of runs per stage, the fastest one is reported', type=int,
+                        default=3)
+    parser.add_argument('--workers', help='number of worker processes of the whole import', type=int)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    path = fixtures.security_log(args.records)
+    directory = path.parent
+    try:
+        records = fixtures.security_records(path)
+        rows = convert_records(records)
+        stages = [
+            ('parse records', stage_parse, dict()),
+            ('convert records', stage_convert, dict()),
+            ('insert rows', stage_insert, dict(rows=rows)),
+            ('evtx2sqlite', stage_evtx2sqlite, dict(workers=args.workers)),
+        ]
+        print("{count} records, {cpus} CPUs".format(count=len(records), cpus=os.cpu_count()))
+        for name, stage, kwargs in stages:
+            rate = measure(stage, path, records, directory, args.repeat, **kwargs)
+            print("{name:20} {rate:10.0f} events/s".format(name=name, rate=rate))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
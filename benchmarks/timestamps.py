@@ -0,0 +1,59 @@
+"""
+timestamps.py
+
+compares the timestamp decoders in evtxtools.Timestamp with datetime.strptime
+
+usage: python -m benchmarks.timestamps [--number NUMBER]
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+from evtxtools.Timestamp import TimeWindow, parse_record_timestamp, parse_system_time
+
+RECORD_TIMESTAMP = '2020-11-23 08:00:18.596852 UTC'
+SYSTEM_TIME = '2020-11-23T08:00:18.596853Z'
+WINDOW = TimeWindow(datetime(2020, 12, 1), datetime(2020, 12, 2))
+
+
+def strptime_record_timestamp():
+    if RECORD_TIMESTAMP[19] == '.':
+        return datetime.strptime(RECORD_TIMESTAMP, "%Y-%m-%d %H:%M:%S.%f %Z")
+    else:
+        return datetime.strptime(RECORD_TIMESTAMP, "%Y-%m-%d %H:%M:%S %Z")
+
+
+def strptime_system_time():
+    if SYSTEM_TIME[19] == '.':
+        return datetime.strptime(SYSTEM_TIME, "%Y-%m-%dT%H:%M:%S.%fZ")
+    else:
+        return datetime.strptime(SYSTEM_TIME, "%Y-%m-%dT%H:%M:%SZ")
+
+
+def strptime_window_check():
+    timestamp = strptime_record_timestamp()
+    return WINDOW.from_date <= timestamp <= WINDOW.to_date
+
+
+CASES = [
+    ('record timestamp', strptime_record_timestamp, lambda: parse_record_timestamp(RECORD_TIMESTAMP)),
+    ('SystemTime', strptime_system_time, lambda: parse_system_time(SYSTEM_TIME)),
+    ('--from/--to check', strptime_window_check, lambda: WINDOW.contains(RECORD_TIMESTAMP)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='timestamp decoding micro-benchmark')
+    parser.add_argument('--number', help='number of iterations per case', type=int, default=200000)
+    args = parser.parse_args()
+
+    for name, baseline, candidate in CASES:
+        assert name.startswith('--') or baseline() == candidate()
+        baseline_ns = timeit.timeit(baseline, number=args.number) / args.number * 1e9
+        candidate_ns = timeit.timeit(candidate, number=args.number) / args.number * 1e9
+        print("{name:20} strptime: {baseline:8.0f} ns   evtxtools.Timestamp: {candidate:8.0f} ns   speedup: {speedup:5.1f}x"
+              .format(name=name, baseline=baseline_ns, candidate=candidate_ns, speedup=baseline_ns / candidate_ns))
+
+
+if __name__ == '__main__':
+    main()
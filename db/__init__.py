@@ -34,8 +34,11 @@ class Provider(Base):
 class Correlation(Base):
     __tablename__ = 'correlation'
     id = Column(Integer, unique=True, nullable=False, primary_key=True)
-    activityid = Column(Text, unique=True)
-    relatedactivityid = Column(Text, unique=True)
+    activityid = Column(Text)
+    relatedactivityid = Column(Text)
+    __table_args__ = (
+        UniqueConstraint('activityid', 'relatedactivityid', name="unique_correlation"),
+    )
 
     def __repr__(self):
         return self.activityid
@@ -71,7 +74,7 @@ class Computer(Base):
 
 class Event(Base):
     __tablename__ = 'event'
-    id = Column(Integer, unique=True, nullable=False, primary_key=True)
+    id = Column(Integer, nullable=False, primary_key=True)
     event_id = Column(Integer, nullable=False)
     provider_id = Column(Integer, ForeignKey("provider.id"), nullable=False)
     timecreated = Column(DateTime, nullable=False)
@@ -89,10 +92,21 @@ class Event(Base):
 
 class EventData(Base):
     __tablename__ = 'event_data'
-    id = Column(Integer, unique=True, nullable=False, primary_key=True)
+    id = Column(Integer, nullable=False, primary_key=True)
     eventid = Column(Integer, ForeignKey("event.id"), nullable=False)
     key = Column(Text, nullable=False)
     value = Column(Text, nullable=False)
 
     event = relationship("Event", back_populates="event_data")
-Event.event_data = relationship("EventData", back_populates="event")
\ No newline at end of file
+Event.event_data = relationship("EventData", back_populates="event")
+
+
+# indexes on the event tables, which are created after all events have been loaded
+DEFERRED_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_event_event_id ON event (event_id)",
+    "CREATE INDEX IF NOT EXISTS ix_event_timecreated ON event (timecreated)",
+    "CREATE INDEX IF NOT EXISTS ix_event_computer_id ON event (computer_id)",
+    "CREATE INDEX IF NOT EXISTS ix_event_channel_id ON event (channel_id)",
+    "CREATE INDEX IF NOT EXISTS ix_event_data_eventid ON event_data (eventid)",
+    "CREATE INDEX IF NOT EXISTS ix_event_data_key ON event_data (key)",
+]
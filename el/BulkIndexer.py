@@ -0,0 +1,252 @@
+import logging
+import threading
+import time
+from typing import Callable, Iterable
+
+import orjson
+from elasticsearch import ConnectionError, Elasticsearch, TransportError
+
+from evtxtools.Statistics import NO_STATISTICS, Statistics
+
+
+class BulkStatistics:
+    def __init__(self):
+        self.documents = 0
+        self.failed = 0
+        self.bytes = 0
+        self.requests = 0
+        self.retries = 0
+        self.seconds = 0.0
+
+    def add(self, other):
+        self.documents += other.documents
+        self.failed += other.failed
+        self.bytes += other.bytes
+        self.requests += other.requests
+        self.retries += other.retries
+        self.seconds += other.seconds
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return "{documents} documents ({bytes:.1f} MiB) in {seconds:.1f}s, " \
+               "{dps:.0f} docs/s, {bps:.2f} MiB/s, {requests} bulk requests, {retries} retries, {failed} failed".format(
+                documents=self.documents,
+                bytes=self.bytes / 1024 / 1024,
+                seconds=self.seconds,
+                dps=self.documents_per_second,
+                bps=self.bytes_per_second / 1024 / 1024,
+                requests=self.requests,
+                retries=self.retries,
+                failed=self.failed)
+
+
+class BulkIndexer:
+    """
+    sends documents to an elasticsearch index using several concurrent bulk requests.
+
+    Every thread takes the next chunk of documents from the shared iterator, so the documents are generated
+    by the thread which is about to send them. Documents rejected with 429 (Too Many Requests) are retried
+    with an exponential backoff; while a thread waits, it does not take any new documents. Bulk requests which
+    fail because of a connection error or a timeout are retried in the same way. A request which timed out
+    may have been processed anyway, so documents without an id may be indexed twice.
+
+    If a callback is passed to index(), the documents must be (token, document) tuples, and the callback is called
+    with the tokens of all documents which have been indexed successfully by a bulk request.
+
+    A document may be a (document id, document) tuple, so that indexing it again replaces the previous document
+    instead of adding another one. Otherwise, elasticsearch assigns a random id.
+    """
+    ACTION = b'{"index":{}}\n'
+
+    @staticmethod
+    def action(document) -> tuple:
+        """
+        returns the action line and the source of a document
+        """
+        if isinstance(document, tuple):
+            document_id, document = document
+            action = b'{"index":{"_id":"' + document_id.encode('utf-8') + b'"}}\n'
+        else:
+            action = BulkIndexer.ACTION
+        return action, document if isinstance(document, bytes) else orjson.dumps(document)
+
+    def __init__(self,
+                 client: Elasticsearch,
+                 index: str,
+                 threads: int = 4,
+                 chunk_size: int = 500,
+                 max_chunk_bytes: int = 10 * 1024 * 1024,
+                 max_retries: int = 8,
+                 initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 statistics: Statistics = None):
+        self.__client = client
+        self.__index = index
+        self.__threads = threads
+        self.__chunk_size = chunk_size
+        self.__max_chunk_bytes = max_chunk_bytes
+        self.__max_retries = max_retries
+        self.__initial_backoff = initial_backoff
+        self.__max_backoff = max_backoff
+        self.__stats = statistics or NO_STATISTICS
+        self.__lock = threading.Lock()
+
+    def index(self, documents: Iterable, on_acknowledged: Callable = None) -> BulkStatistics:
+        self.__documents = iter(documents) if on_acknowledged is not None else ((None, d) for d in documents)
+        self.__on_acknowledged = on_acknowledged
+        self.__exhausted = False
+        self.__error = None
+        self.__statistics = BulkStatistics()
+
+        start = time.monotonic()
+        workers = list()
+        for _ in range(0, self.__threads):
+            th = threading.Thread(target=self.__worker)
+            workers.append(th)
+            th.start()
+        for th in workers:
+            th.join()
+        self.__statistics.seconds = time.monotonic() - start
+
+        if self.__error is not None:
+            raise self.__error
+        return self.__statistics
+
+    def __next_chunk(self) -> list:
+        chunk = list()
+        with self.__lock:
+            size = 0
+            while not self.__exhausted and self.__error is None and len(chunk) < self.__chunk_size:
+                try:
+                    token, document = next(self.__documents)
+                except StopIteration:
+                    self.__exhausted = True
+                    break
+                action, source = self.action(document)
+                chunk.append((token, action, source))
+                size += len(action) + len(source) + 1
+                if size >= self.__max_chunk_bytes:
+                    break
+        return chunk
+
+    def __worker(self):
+        try:
+            # the time spent waiting for the next chunk includes converting its documents
+            with self.__stats.timer('bulk worker idle'):
+                chunk = self.__next_chunk()
+            while len(chunk) > 0:
+                with self.__stats.timer('bulk worker busy'):
+                    self.__send(chunk)
+                with self.__stats.timer('bulk worker idle'):
+                    chunk = self.__next_chunk()
+        except Exception as e:
+            with self.__lock:
+                if self.__error is None:
+                    self.__error = e
+
+    def __backoff(self, attempt: int):
+        time.sleep(min(self.__initial_backoff * 2 ** attempt, self.__max_backoff))
+
+    def __send(self, chunk: list):
+        attempt = 0
+        while True:
+            body = b''.join(action + source + b'\n' for _, action, source in chunk)
+            start = time.perf_counter()
+            try:
+                response = self.__client.bulk(body=body, index=self.__index)
+            except TransportError as e:
+                self.__stats.observe('bulk request', (time.perf_counter() - start) * 1000)
+                # ConnectionTimeout is a ConnectionError, neither of them has a status code
+                connection_error = isinstance(e, ConnectionError)
+                self.__stats.count('bulk request errors',
+                                   key=type(e).__name__ if connection_error else str(e.status_code))
+                if (e.status_code == 429 or connection_error) and attempt < self.__max_retries:
+                    if connection_error:
+                        logging.warning("bulk request failed, retrying: {error}".format(error=str(e)))
+                    self.__count(retries=len(chunk))
+                    self.__backoff(attempt)
+                    attempt += 1
+                    continue
+                raise
+            self.__stats.observe('bulk request', (time.perf_counter() - start) * 1000)
+
+            retry = list()
+            acknowledged = list()
+            indexed_bytes = 0
+            failed = 0
+            for (token, action, source), item in zip(chunk, response['items']):
+                result = next(iter(item.values()))
+                if result['status'] < 300:
+                    acknowledged.append(token)
+                    indexed_bytes += len(source)
+                elif result['status'] == 429 and attempt < self.__max_retries:
+                    retry.append((token, action, source))
+                else:
+                    failed += 1
+                    logging.error("failed to index document: {error}".format(error=result.get('error')))
+            self.__count(documents=len(acknowledged), bytes=indexed_bytes, failed=failed, requests=1,
+                         retries=len(retry))
+            self.__stats.count('documents indexed', len(acknowledged))
+            self.__stats.count('documents failed', failed)
+            self.__stats.count('documents retried', len(retry))
+            if self.__on_acknowledged is not None and len(acknowledged) > 0:
+                self.__on_acknowledged(acknowledged)
+
+            if len(retry) == 0:
+                return
+            chunk = retry
+            self.__backoff(attempt)
+            attempt += 1
+
+    def __count(self, documents: int = 0, bytes: int = 0, failed: int = 0, requests: int = 0, retries: int = 0):
+        with self.__lock:
+            self.__statistics.documents += documents
+            self.__statistics.bytes += bytes
+            self.__statistics.failed += failed
+            self.__statistics.requests += requests
+            self.__statistics.retries += retries
+
+
+class DryRunIndexer:
+    """
+    serializes the documents like BulkIndexer, but does not send them anywhere. All documents are acknowledged,
+    and the statistics contain the number of bulk requests which would have been sent
+    """
+    def __init__(self, chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024, statistics: Statistics = None):
+        self.__chunk_size = chunk_size
+        self.__max_chunk_bytes = max_chunk_bytes
+        self.__stats = statistics or NO_STATISTICS
+
+    def index(self, documents: Iterable, on_acknowledged: Callable = None) -> BulkStatistics:
+        statistics = BulkStatistics()
+        start = time.monotonic()
+        chunk = list()
+        size = 0
+        for item in documents:
+            token, document = item if on_acknowledged is not None else (None, item)
+            action, source = BulkIndexer.action(document)
+            chunk.append(token)
+            size += len(action) + len(source) + 1
+            statistics.documents += 1
+            statistics.bytes += len(source)
+            if len(chunk) >= self.__chunk_size or size >= self.__max_chunk_bytes:
+                self.__flush(chunk, statistics, on_acknowledged)
+                chunk = list()
+                size = 0
+        if len(chunk) > 0:
+            self.__flush(chunk, statistics, on_acknowledged)
+        statistics.seconds = time.monotonic() - start
+        return statistics
+
+    def __flush(self, chunk: list, statistics: BulkStatistics, on_acknowledged: Callable):
+        statistics.requests += 1
+        self.__stats.count('documents indexed', len(chunk))
+        if on_acknowledged is not None:
+            on_acknowledged(chunk)
@@ -0,0 +1,63 @@
+import logging
+
+from elasticsearch import Elasticsearch
+
+# a force merge of a large index takes much longer than a usual request
+FORCE_MERGE_TIMEOUT = 6 * 3600
+
+
+class BulkLoad:
+    """
+    changes the settings of an index while it is loaded: the index is not refreshed, no replicas are written,
+    and the translog is not synced after every bulk request. Afterwards, the previous settings are restored,
+    also if the load fails. Settings which had not been set explicitly are reset to their defaults.
+
+    If the load succeeds, the index can be force merged, so that searches do not need to visit the many small
+    segments which have been written during the load
+    """
+    SETTINGS = {
+        'index.refresh_interval': '-1',
+        'index.number_of_replicas': 0,
+        'index.translog.durability': 'async',
+    }
+
+    def __init__(self, connection: Elasticsearch, index: str, replicas: int = None, force_merge: bool = False,
+                 max_num_segments: int = 1):
+        """
+        replicas is the number of replicas after the load, by default the index keeps its number of replicas
+        """
+        self.__connection = connection
+        self.__index = index
+        self.__replicas = replicas
+        self.__force_merge = force_merge
+        self.__max_num_segments = max_num_segments
+        self.__previous = None
+
+    def __enter__(self):
+        settings = self.__connection.indices.get_settings(index=self.__index, flat_settings=True)
+        current = settings[self.__index]['settings']
+        self.__previous = {key: current.get(key) for key in self.SETTINGS.keys()}
+        if self.__replicas is not None:
+            self.__previous['index.number_of_replicas'] = self.__replicas
+        logging.info("changing the settings of index '{index}' for the bulk load".format(index=self.__index))
+        self.__connection.indices.put_settings(index=self.__index, body=self.SETTINGS)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        logging.info("restoring the settings of index '{index}'".format(index=self.__index))
+        try:
+            self.__connection.indices.put_settings(index=self.__index, body=self.__previous)
+        except Exception as e:
+            if exc_type is None:
+                raise
+            # do not hide the error which made the load fail
+            logging.error("unable to restore the settings of index '{index}': {error}".format(
+                index=self.__index, error=str(e)))
+        if exc_type is not None:
+            return
+        self.__connection.indices.refresh(index=self.__index)
+        if self.__force_merge:
+            logging.info("force merging index '{index}' into {count} segments".format(
+                index=self.__index, count=self.__max_num_segments))
+            self.__connection.indices.forcemerge(index=self.__index, max_num_segments=self.__max_num_segments,
+                                                 request_timeout=FORCE_MERGE_TIMEOUT)
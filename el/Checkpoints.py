@@ -0,0 +1,129 @@
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import orjson
+
+from evtxtools.RecordSource import RecordSource
+
+
+class Checkpoints:
+    """
+    stores the highest EventRecordID of every evtx file up to which all records have been acknowledged by
+    elasticsearch, separately for every index. The checkpoints are kept in a local JSON file, which is replaced
+    atomically whenever it is saved.
+
+    If the checkpoints are read only, e.g. during a dry run, the file is never written.
+    """
+    def __init__(self, path: Path, index: str, read_only: bool = False):
+        self.__path = path
+        self.__index = index
+        self.__read_only = read_only
+        self.__lock = threading.Lock()
+        try:
+            with open(path, 'rb') as f:
+                self.__checkpoints = orjson.loads(f.read())
+        except FileNotFoundError:
+            self.__checkpoints = dict()
+
+    @staticmethod
+    def key(file: RecordSource) -> str:
+        return file.key
+
+    def get(self, file: RecordSource) -> int:
+        """
+        returns the EventRecordID up to which all records of the file have been indexed, or 0
+        """
+        with self.__lock:
+            return self.__checkpoints.get(self.__index, dict()).get(self.key(file), 0)
+
+    def set(self, file: RecordSource, record_id: int):
+        with self.__lock:
+            self.__checkpoints.setdefault(self.__index, dict())[self.key(file)] = record_id
+
+    def clear(self):
+        """
+        forgets the checkpoints of the index, e.g. because the index has been deleted
+        """
+        with self.__lock:
+            self.__checkpoints.pop(self.__index, None)
+
+    def save(self):
+        if self.__read_only:
+            return
+        with self.__lock:
+            temp = self.__path.with_name(self.__path.name + '.tmp')
+            with open(temp, 'wb') as f:
+                f.write(orjson.dumps(self.__checkpoints, option=orjson.OPT_INDENT_2))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp, self.__path)
+
+
+class Watermark:
+    """
+    tracks which records of a file have been acknowledged. The records are acknowledged in arbitrary order
+    by concurrent bulk requests, the watermark is the highest EventRecordID of the longest sequence of
+    acknowledged records at the start of the file (in the order in which they have been read).
+
+    If the record ids do not increase in the order of the records, e.g. because the log has wrapped around,
+    the watermark is only stored after all records of the file have been acknowledged.
+    """
+    def __init__(self, file: RecordSource, checkpoints: Checkpoints, records_in_order: bool = True,
+                 save_interval: float = 5.0):
+        self.__file = file
+        self.__checkpoints = checkpoints
+        self.__records_in_order = records_in_order
+        self.__save_interval = save_interval
+        self.__last_saved = time.monotonic()
+        self.__lock = threading.Lock()
+        self.__record_ids = dict()
+        self.__acknowledged = set()
+        self.__next_sequence = 0
+        self.__next_unacknowledged = 0
+        self.__value = checkpoints.get(file)
+
+    @property
+    def value(self) -> int:
+        return self.__value
+
+    def add(self, record_id: int) -> int:
+        """
+        registers a record which has been read, and returns its sequence number
+        """
+        with self.__lock:
+            sequence = self.__next_sequence
+            self.__next_sequence += 1
+            self.__record_ids[sequence] = record_id
+            return sequence
+
+    def acknowledge(self, sequences: list):
+        with self.__lock:
+            self.__acknowledged.update(sequences)
+            while self.__next_unacknowledged in self.__acknowledged:
+                self.__acknowledged.remove(self.__next_unacknowledged)
+                record_id = self.__record_ids.pop(self.__next_unacknowledged)
+                self.__value = max(self.__value, record_id)
+                self.__next_unacknowledged += 1
+            if self.__records_in_order and time.monotonic() - self.__last_saved >= self.__save_interval:
+                self.__store()
+
+    def finish(self):
+        """
+        stores the watermark, must be called after all records have been acknowledged
+        """
+        with self.__lock:
+            complete = self.__next_unacknowledged == self.__next_sequence
+            if not complete:
+                logging.warning("{count} records of {filename} have not been indexed".format(
+                    count=self.__next_sequence - self.__next_unacknowledged, filename=self.__file.name))
+            if complete or self.__records_in_order:
+                self.__store()
+
+    def __store(self):
+        # must be called while holding the lock, so that the stored watermark never decreases
+        self.__checkpoints.set(self.__file, self.__value)
+        self.__checkpoints.save()
+        self.__last_saved = time.monotonic()
@@ -0,0 +1,258 @@
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import orjson
+
+from evtxtools.RecordSource import RecordSource, source_from_spec
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+DEFAULT_LEASE = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL_INTERVAL = 5.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL UNIQUE,
+    spec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    checkpoint INTEGER NOT NULL DEFAULT 0,
+    documents INTEGER,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, size);
+CREATE TABLE IF NOT EXISTS settings (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def worker_name() -> str:
+    return "{host}:{pid}".format(host=socket.gethostname(), pid=os.getpid())
+
+
+class Job:
+    def __init__(self, job_id: int, source: RecordSource, attempts: int, checkpoint: int):
+        self.id = job_id
+        self.source = source
+        self.attempts = attempts
+        self.checkpoint = checkpoint
+
+
+class JobQueue:
+    """
+    a queue of logs which are imported by several workers, stored in a SQLite database which can be shared by
+    workers on several hosts. A worker claims a job for a limited time (its lease), and must renew the lease
+    while it imports the log. If a worker crashes, its lease expires, and the job is claimed by another worker,
+    which resumes the import at the checkpoint of the job. A job which has failed max_attempts times is not
+    claimed again.
+
+    The leases are compared with the clocks of the workers, so the clocks of all hosts must be synchronized
+    """
+    def __init__(self, path: Path, lease: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.__lease = lease
+        self.__max_attempts = max_attempts
+        self.__lock = threading.Lock()
+        # transactions are started explicitly, claims must lock the database before reading the jobs
+        self.__connection = sqlite3.connect(str(path), timeout=60, isolation_level=None, check_same_thread=False)
+        self.__connection.executescript(SCHEMA)
+
+    @property
+    def lease(self) -> float:
+        return self.__lease
+
+    @property
+    def poll_interval(self) -> float:
+        """
+        the number of seconds between two checks of the queue, short enough to claim expired jobs soon
+        """
+        return min(DEFAULT_POLL_INTERVAL, self.__lease / 3)
+
+    def close(self):
+        self.__connection.close()
+
+    def __transaction(self, statements):
+        with self.__lock:
+            self.__connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.__connection)
+                self.__connection.execute("COMMIT")
+                return result
+            except BaseException:
+                self.__connection.execute("ROLLBACK")
+                raise
+
+    def get_setting(self, name: str) -> str:
+        with self.__lock:
+            row = self.__connection.execute("SELECT value FROM settings WHERE name = ?", (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_setting(self, name: str, value: str):
+        self.__transaction(lambda c: c.execute("INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)",
+                                               (name, value)))
+
+    def clear(self):
+        """
+        removes all jobs, e.g. because the index has been deleted
+        """
+        self.__transaction(lambda c: c.execute("DELETE FROM jobs"))
+
+    def retry_failed(self):
+        """
+        failed jobs are claimed again, e.g. after the cause of the failure has been fixed
+        """
+        self.__transaction(lambda c: c.execute("UPDATE jobs SET state = ?, attempts = 0 WHERE state = ?",
+                                               (PENDING, FAILED)))
+
+    def add(self, sources: list) -> int:
+        """
+        adds a job for every source which is not in the queue yet, and returns the number of added jobs
+        """
+        def insert(c: sqlite3.Connection) -> int:
+            added = 0
+            for source in sources:
+                cursor = c.execute("INSERT OR IGNORE INTO jobs (source, spec, size) VALUES (?, ?, ?)",
+                                   (source.key, orjson.dumps(source.spec).decode('utf-8'), source.size))
+                added += cursor.rowcount
+            return added
+        return self.__transaction(insert)
+
+    def claim(self, worker: str) -> Job:
+        """
+        returns the largest pending job, or a job whose lease has expired, or None if no job can be claimed
+        """
+        def claim_job(c: sqlite3.Connection) -> Job:
+            now = time.time()
+            c.execute("UPDATE jobs SET state = ?, error = 'the lease of the last worker has expired' "
+                      "WHERE state = ? AND lease_expires < ? AND attempts >= ?",
+                      (FAILED, RUNNING, now, self.__max_attempts))
+            row = c.execute("SELECT id, spec, attempts, checkpoint FROM jobs "
+                            "WHERE state = ? OR (state = ? AND lease_expires < ?) "
+                            "ORDER BY size DESC LIMIT 1", (PENDING, RUNNING, now)).fetchone()
+            if row is None:
+                return None
+            job_id, spec, attempts, checkpoint = row
+            c.execute("UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = ? WHERE id = ?",
+                      (RUNNING, worker, now + self.__lease, attempts + 1, job_id))
+            return Job(job_id, source_from_spec(orjson.loads(spec)), attempts + 1, checkpoint)
+        return self.__transaction(claim_job)
+
+    def renew(self, job: Job, worker: str) -> bool:
+        """
+        extends the lease of the job, returns False if the job has been claimed by another worker meanwhile
+        """
+        cursor = self.__transaction(lambda c: c.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = ?",
+            (time.time() + self.__lease, job.id, worker, RUNNING)))
+        return cursor.rowcount > 0
+
+    def save_checkpoint(self, job: Job, checkpoint: int):
+        self.__transaction(lambda c: c.execute("UPDATE jobs SET checkpoint = ? WHERE id = ? AND checkpoint < ?",
+                                               (checkpoint, job.id, checkpoint)))
+
+    def complete(self, job: Job, worker: str, documents: int):
+        self.__transaction(lambda c: c.execute(
+            "UPDATE jobs SET state = ?, documents = ?, lease_expires = NULL, error = NULL "
+            "WHERE id = ? AND worker = ?", (DONE, documents, job.id, worker)))
+
+    def fail(self, job: Job, worker: str, error: str):
+        """
+        the job is retried by the next worker, unless it has failed max_attempts times
+        """
+        state = FAILED if job.attempts >= self.__max_attempts else PENDING
+        self.__transaction(lambda c: c.execute(
+            "UPDATE jobs SET state = ?, error = ?, lease_expires = NULL WHERE id = ? AND worker = ?",
+            (state, error, job.id, worker)))
+
+    def counts(self) -> dict:
+        """
+        returns the number of jobs in every state
+        """
+        with self.__lock:
+            rows = self.__connection.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall()
+        counts = {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def failed_jobs(self) -> list:
+        with self.__lock:
+            return self.__connection.execute("SELECT source, error FROM jobs WHERE state = ? ORDER BY source",
+                                             (FAILED,)).fetchall()
+
+    def total_size(self) -> int:
+        """
+        the total size of all logs in the queue
+        """
+        with self.__lock:
+            return self.__connection.execute("SELECT COALESCE(SUM(size), 0) FROM jobs").fetchone()[0]
+
+    def finished(self) -> bool:
+        counts = self.counts()
+        return counts[PENDING] == 0 and counts[RUNNING] == 0
+
+
+class JobCheckpoints:
+    """
+    stores the checkpoint of a job in the job queue instead of a local file, so that the worker which retries
+    the job can resume the import. Provides the methods of Checkpoints which are used by Watermark
+    """
+    def __init__(self, queue: JobQueue, job: Job):
+        self.__queue = queue
+        self.__job = job
+        self.__value = job.checkpoint
+        self.__saved = job.checkpoint
+
+    def get(self, file: RecordSource) -> int:
+        return self.__value
+
+    def set(self, file: RecordSource, record_id: int):
+        self.__value = record_id
+
+    def save(self):
+        if self.__value != self.__saved:
+            self.__queue.save_checkpoint(self.__job, self.__value)
+            self.__saved = self.__value
+
+
+class LeaseKeeper:
+    """
+    renews the lease of a job in a background thread, until it is stopped
+    """
+    def __init__(self, queue: JobQueue, job: Job, worker: str):
+        self.__queue = queue
+        self.__job = job
+        self.__worker = worker
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__stopped.set()
+        self.__thread.join()
+
+    def __run(self):
+        while not self.__stopped.wait(self.__queue.lease / 3):
+            try:
+                if not self.__queue.renew(self.__job, self.__worker):
+                    logging.warning("{source} has been claimed by another worker".format(source=self.__job.source))
+                    return
+            except sqlite3.Error as e:
+                logging.error("unable to renew the lease of {source}: {error}".format(
+                    source=self.__job.source, error=str(e)))
@@ -1,7 +1,10 @@
+import hashlib
 from datetime import datetime
 from elasticsearch_dsl import Document, Date, Nested, Boolean, \
     analyzer, InnerDoc, Completion, Keyword, Text, Integer
 
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+
 class WindowsEvent(Document):
     event = Nested(
         properties={
@@ -46,3 +49,66 @@ class WindowsEvent(Document):
         }
     )
     json = Text()
+
+
+def document_digest(swe: SimpleWindowsEvent) -> bytes:
+    """
+    identifies an event independently of the file it has been read from, so that the same event from another
+    copy of the log, e.g. from a repeated collection or a shadow copy, gets the same document id
+    """
+    key = "{computer}|{channel}|{record_id}|{timestamp}".format(
+        computer=swe.computer, channel=swe.channel, record_id=swe.record_id, timestamp=swe.timecreated.isoformat())
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+
+
+# the contents of the json field of the documents: the record with its normalized event data, the record as it
+# has been read from the log, which is not serialized again, or no json field at all
+JSON_NORMALIZED = 'normalized'
+JSON_RAW = 'raw'
+JSON_NONE = 'none'
+JSON_FIELDS = (JSON_NORMALIZED, JSON_RAW, JSON_NONE)
+
+
+def without_empty(values: dict) -> dict:
+    """
+    drops empty values like Document.to_dict() does, numeric zeros are kept. Like there, the values of nested
+    fields are not changed
+    """
+    return {key: value for key, value in values.items() if value not in ([], {}, None)}
+
+
+def event_to_dict(filename: str, swe: SimpleWindowsEvent, index: str = None, json: str = JSON_NORMALIZED) -> dict:
+    """
+    converts an event into the ECS shaped document which is stored in elasticsearch and written by evtx2jsonl.py.
+    The document is the same as WindowsEvent(...).to_dict(), but it is built directly, because constructing
+    a Document with its nested fields takes longer than the rest of the conversion
+    """
+    document = {
+        'event': {
+            'code': swe.event_id,
+            'created': swe.timecreated,
+            'provider': swe.provider_name,
+            'severity': swe.level
+        },
+        'record_id': swe.record_id,
+        'timestamp': swe.timestamp,
+        'correlation': {'activity_id': swe.activity_id, 'related_activity_id': swe.related_activity_id},
+        'channel': swe.channel,
+        'computer': swe.computer,
+        'user': {
+            'id': swe.user
+        },
+        'execution': {'process_id': swe.process_id, 'thread_id': swe.thread_id},
+        'event_data': swe.event_data,
+        'log': {
+            'file': {
+                'path': filename
+            },
+            'level': swe.level
+        },
+    }
+    if json == JSON_NORMALIZED:
+        document['json'] = swe.to_json()
+    elif json == JSON_RAW:
+        document['json'] = swe.raw_json
+    return without_empty(document)
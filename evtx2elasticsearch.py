@@ -1,5 +1,5 @@
 """
-evtx2sqlite.py
+evtx2elasticsearch.py
 
 converts evtx files to an elasticsearch index.
 
@@ -14,243 +14,491 @@ FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
 You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
+import contextlib
+import multiprocessing
 import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from datetime import datetime
+from typing import Callable, Iterable
 
 import progressbar
-from evtx import PyEvtxParser
 
 import el
 import evtxtools
+from evtxtools.BloomFilter import BloomFilter
+from evtxtools.BoundedBuffer import BoundedBuffer
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+from evtxtools.Statistics import NO_STATISTICS, Statistics
 import orjson
 import coloredlogs, logging
-from elasticsearch_dsl import connections, Index, IndexTemplate, Mapping
-from elasticsearch.helpers import bulk
-
-class SimpleWindowsEvent:
-    SEPARATOR = "/"
-    event_id: int
-    record_id: int
-    level: int
-    provider_name: str
-    provider_guid: str
-    process_id: int
-    thread_id: int
-    activity_id: str
-    related_activity_id: str
-    channel: str
-    computer: str
-    timestamp: datetime
-    timecreated: datetime
-    user: str
-    event_data: dict
-
-    def __init__(self, record: dict):
-        self.__values = dict()
-        if record['timestamp'][19] == '.':
-            self.timestamp = datetime.strptime(record['timestamp'], "%Y-%m-%d %H:%M:%S.%f %Z")
-        else:
-            self.timestamp = datetime.strptime(record['timestamp'], "%Y-%m-%d %H:%M:%S %Z")
-
-        self.__record = orjson.loads(record['data'])
-        self.cache_values(prefix="", dictionary=self.__record['Event'])
-
-        self.event_id = self.safe_int(self["/System/EventID"])
-        self.record_id = self.safe_int(self["/System/EventRecordID"])
-        self.level = self.safe_int(self["/System/Level"])
-        self.provider_name = str(self["/System/Provider/@Name"])
-        self.provider_guid = str(self["/System/Provider/@Guid"])
-        self.process_id = self.safe_int(self["/System/Execution/@ProcessID"])
-        self.thread_id = self.safe_int(self["/System/Execution/@ThreadID"])
-        self.activity_id = str(self["/System/Correlation/@ActivityID"])
-        self.related_activity_id = str(self["/System/Correlation/@RelatedActivityID"])
-        self.channel = str(self["/System/Channel"])
-        self.computer = str(self["/System/Computer"])
-        self.timecreated = self.get_time_created(self["/System/TimeCreated/@SystemTime"])
-        self.user = str(self["/System/Security/@UserID"])
-        self.event_data = self.__record['Event'].get('EventData')
-
-        if self.event_data:
-            if '#attributes' in self.event_data:
-                for key, value in self.event_data['#attributes'].items():
-                    self.event_data['@' + key] = value
-                del self.event_data['#attributes']
-
-            for key, value in self.event_data.items():
-                if isinstance(value, dict):
-                    if '#text' in value:
-                        self.event_data[key] = str(value['#text'])
-                    else:
-                        raise RuntimeError("invalid datatype")
-                else:
-                    self.event_data[key] = str(value)
-
-
-    @staticmethod
-    def safe_int(item):
-        return int(item) if item else None
-
-    @staticmethod
-    def get_time_created(timecreated):
-        if timecreated[19] == '.':
-            return datetime.strptime(timecreated, "%Y-%m-%dT%H:%M:%S.%fZ")
-        else:
-            return datetime.strptime(timecreated, "%Y-%m-%dT%H:%M:%SZ")
-
-    def cache_values(self, prefix: str, dictionary: dict):
-        for _key, _value in dictionary.items():
-            if _key == '#attributes':
-                assert isinstance(_value, dict)
-                for _a_key, _a_value in _value.items():
-                    assert not isinstance(_a_value, dict)
-                    self.__values[prefix + self.SEPARATOR + "@" + _a_key] = _a_value
-                continue
+from elasticsearch_dsl import connections, Index
+from el import JSON_NORMALIZED, document_digest, event_to_dict
+from el.BulkLoad import BulkLoad
+from el.BulkIndexer import BulkIndexer, BulkStatistics, DryRunIndexer
+from el.Checkpoints import Checkpoints, Watermark
+from el.JobQueue import DONE, FAILED, JobCheckpoints, JobQueue, LeaseKeeper, worker_name
+from evtxtools.EvtxFile import EvtxFile, read_chunk_range
+from evtxtools.RecordSource import RecordSource, record_sources
 
-            _id = prefix + self.SEPARATOR + _key
+DEFAULT_BUFFER_SIZE = 64 * 1024 * 1024
+DEFAULT_CHECKPOINT_FILE = Path('evtx2elasticsearch.checkpoints.json')
+# used to estimate the number of events in the logs, for the size of the filter of duplicates
+AVERAGE_RECORD_SIZE = 512
 
-            if _key == '#text':
-                self.__values[prefix] = _value
-                continue
-
-            if isinstance(_value, dict):
-                self.cache_values(_id, _value)
-            else:
-                assert _key not in self.__values
-                self.__values[_id] = _value
-
-    def __getitem__(self, item) -> str:
-        return self.get_property(item, allow_none=True)
-
-    def get_property(self, path: str, allow_none=False) -> str:
-        if allow_none:
-            return self.__values.get(path)
-        else:
-            return self.__values[path]
-
-    def to_json(self):
-        return orjson.dumps(self.__record).decode("UTF-8")
-
-
-def event_to_dict(filename: str, swe: SimpleWindowsEvent, index: str):
-    event = el.WindowsEvent(
-        event={
-            'code': swe.event_id,
-            'created': swe.timecreated,
-            'provider': swe.provider_name,
-            'severity': swe.level
-        },
-        record_id=swe.record_id,
-        timestamp=swe.timestamp,
-        correlation={'activity_id': swe.activity_id, 'related_activity_id': swe.related_activity_id},
-        channel=swe.channel,
-        computer=swe.computer,
-        user={
-            'id': swe.user
-        },
-        execution={'process_id': swe.process_id, 'thread_id': swe.thread_id},
-        event_data=swe.event_data,
-        log={
-            'file': {
-                'path': filename
-            },
-            'level': swe.level
-        },
-        json=swe.to_json()
-    )
-    return event.to_dict()
 
 class EventGenerator:
+    """
+    converts the records into documents. Unless random_ids is set, every document gets the id of its event.
+    Events which are contained in the Bloom filter of duplicates have been sent before and are dropped.
+    Records which cannot be converted are logged and dropped, like in the worker processes (see
+    convert_chunk_range). on_dropped is called with the sequence numbers of all dropped records
+    """
     def __init__(self,
                  filename: str,
                  index: str,
-                 raw_items: list,
-                 progress_bar: progressbar.progressbar):
+                 raw_items: Iterable,
+                 progress_bar: progressbar.progressbar,
+                 statistics: Statistics = None,
+                 json_field: str = JSON_NORMALIZED,
+                 random_ids: bool = False,
+                 duplicates: BloomFilter = None,
+                 on_dropped: Callable = None):
         self.__filename = filename
         self.__index = index
+        self.__json_field = json_field
         self.__raw_items = raw_items
         self.__progress = progress_bar
+        self.__statistics = statistics or NO_STATISTICS
+        self.__random_ids = random_ids
+        self.__duplicates = duplicates
+        self.__on_dropped = on_dropped
         self.__counter = 0
+        self.__suppressed = 0
+        self.__errors = 0
 
-    def __iter__(self):
-        for r in self.__raw_items:
-            self.__counter += 1
-            self.__progress.update(self.__counter)
-            yield event_to_dict(
-                filename=self.__filename,
-                swe=SimpleWindowsEvent(r),
-                index=self.__index)
-
+    @property
+    def suppressed(self) -> int:
+        """
+        the number of duplicates which have been dropped
+        """
+        return self.__suppressed
 
-def evtx2elasticsearch(evtx_files: set, index: str,  override: False):
-    connections.create_connection(hosts=['localhost'], timeout=20)
+    @property
+    def errors(self) -> int:
+        """
+        the number of records which could not be converted
+        """
+        return self.__errors
 
-    create_index(index=index, override=override)
+    def __drop(self, sequence):
+        if self.__on_dropped is not None:
+            self.__on_dropped([sequence])
 
+    def __iter__(self):
+        converted = 0
+        seconds = 0.0
+        for sequence, r in self.__raw_items:
+            self.__counter += 1
+            self.__progress.update(self.__counter)
+            if isinstance(r, tuple):
+                # the document has already been converted by a worker process
+                digest, document = r
+            else:
+                start = time.perf_counter()
+                try:
+                    swe = SimpleWindowsEvent(r)
+                    document = event_to_dict(
+                        filename=self.__filename,
+                        swe=swe,
+                        index=self.__index,
+                        json=self.__json_field)
+                    digest = document_digest(swe) if not self.__random_ids or self.__duplicates is not None \
+                        else None
+                except Exception as e:
+                    logging.error("{filename}: unable to convert record {record_id}: {error}".format(
+                        filename=self.__filename, record_id=r['event_record_id'], error=str(e)))
+                    self.__errors += 1
+                    self.__drop(sequence)
+                    continue
+                finally:
+                    seconds += time.perf_counter() - start
+                converted += 1
+            if self.__duplicates is not None and not self.__duplicates.add(digest):
+                self.__suppressed += 1
+                self.__drop(sequence)
+                continue
+            yield sequence, document if self.__random_ids else (digest.hex(), document)
+        self.__statistics.add_time('convert', seconds, converted)
+
+
+def read_records(source: RecordSource, buffer: BoundedBuffer, watermark: Watermark,
+                 statistics: Statistics = NO_STATISTICS):
+    """
+    puts all records which have not been indexed yet into the buffer, together with their sequence number
+    """
+    error = None
+    checkpoint = watermark.value
+    records_read = 0
+    skipped = 0
+    # seconds spent in the parser, and waiting for free space in the buffer
+    reading = waiting = 0.0
+    try:
+        iterator = source.records()
+        while True:
+            start = time.perf_counter()
+            record = next(iterator, None)
+            reading += time.perf_counter() - start
+            if record is None:
+                break
+            records_read += 1
+            if record['event_record_id'] <= checkpoint:
+                skipped += 1
+                continue
+            start = time.perf_counter()
+            buffer.put((watermark.add(record['event_record_id']), record), len(record['data']))
+            waiting += time.perf_counter() - start
+        if skipped > 0:
+            logging.info("{filename}: skipped {count} records which have been indexed before".format(
+                filename=source.name, count=skipped))
+    except BoundedBuffer.Aborted:
+        pass
+    except Exception as e:
+        error = e
+    finally:
+        buffer.close(error)
+        statistics.count('records read', records_read, key=str(source))
+        statistics.count('records skipped', skipped, key=str(source))
+        statistics.add_time('read records', reading, records_read)
+        statistics.add_time('waiting for buffer space', waiting)
+
+
+def convert_chunk_range(path: Path, index: str, offset: int, count: int, checkpoint: int,
+                        json_field: str = JSON_NORMALIZED) -> tuple:
+    """
+    parses some chunks of an evtx file and converts the records into serialized documents,
+    this is done by the worker processes. Returns the documents together with the digests of their events,
+    the number of records which have been read, skipped and could not be converted, and the number of seconds
+    it took. Records which cannot be converted are logged and dropped, like in EventGenerator
+    """
+    start = time.perf_counter()
+    documents = list()
+    skipped = 0
+    errors = 0
+    records = read_chunk_range(path, offset, count)
+    for record in records:
+        if record['event_record_id'] <= checkpoint:
+            skipped += 1
+            continue
+        try:
+            swe = SimpleWindowsEvent(record)
+            document = event_to_dict(filename=path.name, swe=swe, index=index, json=json_field)
+        except Exception as e:
+            logging.error("{filename}: unable to convert record {record_id}: {error}".format(
+                filename=path.name, record_id=record['event_record_id'], error=str(e)))
+            errors += 1
+            continue
+        documents.append((record['event_record_id'], (document_digest(swe), orjson.dumps(document))))
+    return documents, len(records), skipped, errors, time.perf_counter() - start
+
+
+def read_chunk_ranges(source: RecordSource, index: str, buffer: BoundedBuffer, watermark: Watermark,
+                      executor: ProcessPoolExecutor, workers: int, statistics: Statistics = NO_STATISTICS,
+                      json_field: str = JSON_NORMALIZED):
+    """
+    like read_records(), but the chunks of the file are parsed and converted by worker processes.
+    The results are put into the buffer in the order of the chunks
+    """
+    error = None
+    checkpoint = watermark.value
+    skipped = 0
+    pending = deque()
+    statistics.add_gauge('pending tasks', pending.__len__)
+    try:
+        def put_next_result():
+            nonlocal skipped
+            start = time.perf_counter()
+            documents, records_read, skipped_records, errors, seconds = pending.popleft().result()
+            statistics.add_time('waiting for workers', time.perf_counter() - start)
+            statistics.add_time('worker busy', seconds)
+            statistics.count('records read', records_read, key=str(source))
+            statistics.count('conversion errors', errors, key=str(source))
+            skipped += skipped_records
+            start = time.perf_counter()
+            for record_id, document in documents:
+                buffer.put((watermark.add(record_id), document), len(document[1]))
+            statistics.add_time('waiting for buffer space', time.perf_counter() - start)
+
+        for chunks in EvtxFile(source.path).chunk_ranges():
+            # ranges which contain only records that have been indexed before are not parsed at all
+            if max(chunk.last_record_id for chunk in chunks) <= checkpoint:
+                skipped += sum(chunk.last_record_id - chunk.first_record_id + 1 for chunk in chunks)
+                continue
+            pending.append(executor.submit(convert_chunk_range, source.path, index, chunks[0].offset, len(chunks),
+                                           checkpoint, json_field))
+            if len(pending) >= 2 * workers:
+                put_next_result()
+        while len(pending) > 0:
+            put_next_result()
+        if skipped > 0:
+            logging.info("{filename}: skipped {count} records which have been indexed before".format(
+                filename=source.name, count=skipped))
+    except BoundedBuffer.Aborted:
+        for future in pending:
+            future.cancel()
+    except Exception as e:
+        error = e
+    finally:
+        buffer.close(error)
+        statistics.count('records skipped', skipped, key=str(source))
+
+
+def index_source(f: RecordSource, index: str, indexer, checkpoints, executor: ProcessPoolExecutor = None,
+                 parse_workers: int = 0, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 statistics: Statistics = NO_STATISTICS, json_field: str = JSON_NORMALIZED,
+                 random_ids: bool = False, duplicates: BloomFilter = None) -> BulkStatistics:
+    """
+    sends all records of a log which have not been indexed yet to elasticsearch, and returns the statistics of
+    the bulk requests. Events which are contained in duplicates are not sent again
+    """
+    # records are parsed in a separate thread while the previous ones are converted and sent to elasticsearch,
+    # the buffer between them limits the number of records held in memory
+    buffer = BoundedBuffer(max_size=buffer_size)
+    statistics.add_gauge('buffer items', buffer.__len__)
+    statistics.add_gauge('buffer bytes', lambda: buffer.size)
+    # the order of the records of other sources is unknown, so their watermark is only stored at the end
+    watermark = Watermark(f, checkpoints,
+                          records_in_order=f.path is not None and EvtxFile(f.path).records_in_order)
+    if executor is not None and f.path is not None:
+        reader = threading.Thread(target=read_chunk_ranges,
+                                  args=(f, index, buffer, watermark, executor, parse_workers, statistics, json_field))
+    else:
+        reader = threading.Thread(target=read_records, args=(f, buffer, watermark, statistics))
+    reader.start()
+
+    bar = progressbar.ProgressBar(max_value=progressbar.UnknownLength, prefix=f.name)
+    generator = EventGenerator(
+        filename=f.name,
+        index=index,
+        raw_items=buffer,
+        progress_bar=bar,
+        statistics=statistics,
+        json_field=json_field,
+        random_ids=random_ids,
+        duplicates=duplicates,
+        # dropped records count as indexed, so that the watermark can pass them
+        on_dropped=watermark.acknowledge
+    )
+    try:
+        file_statistics = indexer.index(generator, on_acknowledged=watermark.acknowledge)
+    finally:
+        # make sure that the reader does not wait for free buffer space forever
+        buffer.abort()
+        reader.join()
+        watermark.finish()
+    bar.finish()
+    statistics.count('conversion errors', generator.errors, key=str(f))
+    logging.info("{filename}: {statistics}".format(filename=f.name, statistics=file_statistics))
+    if duplicates is not None:
+        logging.info("{filename}: suppressed {count} duplicates".format(filename=f.name, count=generator.suppressed))
+        statistics.count('duplicates suppressed', generator.suppressed, key=str(f))
+    return file_statistics
+
+
+def duplicate_filter(capacity: int) -> BloomFilter:
+    duplicates = BloomFilter(capacity)
+    logging.info("using a filter of {size:.1f} MiB for {capacity} events to suppress duplicates".format(
+        size=duplicates.size / (1024 * 1024), capacity=capacity))
+    return duplicates
+
+
+def evtx2elasticsearch(evtx_files: list, index: str,  override: False, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                       hosts: list = None, bulk_threads: int = 4, chunk_size: int = 500,
+                       max_chunk_bytes: int = 10 * 1024 * 1024, max_retries: int = 8,
+                       resume: bool = False, checkpoint_file: Path = DEFAULT_CHECKPOINT_FILE,
+                       parse_workers: int = 0, dry_run: bool = False, statistics: Statistics = NO_STATISTICS,
+                       json_field: str = JSON_NORMALIZED, bulk_load: bool = False, shards: int = None,
+                       replicas: int = None, force_merge: bool = False, random_ids: bool = False,
+                       dedup: bool = False, dedup_capacity: int = None):
+    # the settings of the index are only changed for a bulk load into a real index
+    bulk_load_settings = contextlib.nullcontext()
+    if dry_run:
+        # the records are parsed and converted, but elasticsearch is not involved at all.
+        # With --resume, the records which have been indexed before are skipped as usual
+        checkpoints = Checkpoints(checkpoint_file, index, read_only=True)
+        if not resume:
+            checkpoints.clear()
+        indexer = DryRunIndexer(chunk_size=chunk_size, max_chunk_bytes=max_chunk_bytes, statistics=statistics)
+    else:
+        connections.create_connection(hosts=hosts or ['localhost'], timeout=20)
+
+        created = create_index(index=index, override=override, resume=resume, shards=shards, replicas=replicas)
+
+        checkpoints = Checkpoints(checkpoint_file, index)
+        if created:
+            # checkpoints of a deleted index are meaningless
+            checkpoints.clear()
+            checkpoints.save()
+
+        el.WindowsEvent.init(index=index)
+
+        indexer = BulkIndexer(connections.get_connection(),
+                              index=index,
+                              threads=bulk_threads,
+                              chunk_size=chunk_size,
+                              max_chunk_bytes=max_chunk_bytes,
+                              max_retries=max_retries,
+                              statistics=statistics)
+        if bulk_load:
+            bulk_load_settings = BulkLoad(connections.get_connection(), index=index, replicas=replicas,
+                                          force_merge=force_merge)
+    duplicates = duplicate_filter(dedup_capacity or sum(f.size for f in evtx_files) // AVERAGE_RECORD_SIZE) \
+        if dedup else None
+    total = BulkStatistics()
+    executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn')) \
+        if parse_workers > 0 else None
+    try:
+        with bulk_load_settings:
+            for f in evtx_files:
+                total.add(index_source(f, index, indexer, checkpoints, executor=executor,
+                                       parse_workers=parse_workers, buffer_size=buffer_size, statistics=statistics,
+                                       json_field=json_field, random_ids=random_ids, duplicates=duplicates))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    logging.info("total: {statistics}".format(statistics=total))
+
+
+def coordinate(queue: JobQueue, evtx_files: list, index: str, override: bool, hosts: list = None,
+               resume: bool = False, bulk_load: bool = False, shards: int = None, replicas: int = None,
+               force_merge: bool = False, poll_interval: float = None) -> int:
+    """
+    creates the index and adds a job for every log to the job queue, which are imported by the workers.
+    Waits until all jobs have been done, and returns the number of jobs which have failed
+    """
+    poll_interval = poll_interval or queue.poll_interval
+    connections.create_connection(hosts=hosts or ['localhost'], timeout=20)
+    created = create_index(index=index, override=override, resume=resume, shards=shards, replicas=replicas)
     el.WindowsEvent.init(index=index)
-
-    for f in evtx_files:
-
-        parser = PyEvtxParser(str(f))
-        items = list()
-        bar = progressbar.ProgressBar(prefix="parsing " + f.name)
-        iterator = parser.records_json()
-
-        n = 0
+    if created:
+        # jobs of a deleted index are meaningless
+        queue.clear()
+    elif resume:
+        queue.retry_failed()
+    queue.set_setting('index', index)
+    added = queue.add(evtx_files)
+    logging.info("added {added} of {count} logs to the job queue".format(added=added, count=len(evtx_files)))
+
+    bulk_load_settings = BulkLoad(connections.get_connection(), index=index, replicas=replicas,
+                                  force_merge=force_merge) if bulk_load else contextlib.nullcontext()
+    with bulk_load_settings:
+        counts = queue.counts()
+        bar = progressbar.ProgressBar(max_value=sum(counts.values()), prefix='jobs')
+        while not queue.finished():
+            counts = queue.counts()
+            bar.update(counts[DONE] + counts[FAILED])
+            time.sleep(poll_interval)
+        bar.finish()
+
+    counts = queue.counts()
+    for source, error in queue.failed_jobs():
+        logging.error("{source}: {error}".format(source=source, error=error))
+    logging.info("{done} logs have been imported, {failed} logs have failed".format(
+        done=counts[DONE], failed=counts[FAILED]))
+    return counts[FAILED]
+
+
+def work(queue: JobQueue, index: str = None, buffer_size: int = DEFAULT_BUFFER_SIZE, hosts: list = None,
+         bulk_threads: int = 4, chunk_size: int = 500, max_chunk_bytes: int = 10 * 1024 * 1024,
+         max_retries: int = 8, parse_workers: int = 0, statistics: Statistics = NO_STATISTICS,
+         json_field: str = JSON_NORMALIZED, random_ids: bool = False, dedup: bool = False,
+         dedup_capacity: int = None, poll_interval: float = None):
+    """
+    claims jobs from the job queue and imports their logs, until all jobs have been done. A failed job is
+    retried later, by this or by another worker. Only the duplicates among the logs imported by this worker
+    are suppressed, but the same event always gets the same document id
+    """
+    poll_interval = poll_interval or queue.poll_interval
+    index = index or queue.get_setting('index')
+    if index is None:
+        raise ValueError("the job queue does not contain any jobs yet, they must be added by a coordinator first")
+    connections.create_connection(hosts=hosts or ['localhost'], timeout=20)
+    indexer = BulkIndexer(connections.get_connection(),
+                          index=index,
+                          threads=bulk_threads,
+                          chunk_size=chunk_size,
+                          max_chunk_bytes=max_chunk_bytes,
+                          max_retries=max_retries,
+                          statistics=statistics)
+    executor = ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context('spawn')) \
+        if parse_workers > 0 else None
+    duplicates = duplicate_filter(dedup_capacity or queue.total_size() // AVERAGE_RECORD_SIZE) if dedup else None
+    worker = worker_name()
+    total = BulkStatistics()
+    try:
         while True:
-            n += 1
-            bar.update(n)
+            job = queue.claim(worker)
+            if job is None:
+                # the jobs of other workers are claimed again if their leases expire
+                if queue.finished():
+                    break
+                time.sleep(poll_interval)
+                continue
+            logging.info("{worker}: importing {source} (attempt {attempt})".format(
+                worker=worker, source=str(job.source), attempt=job.attempts))
             try:
-                e = next(iterator)
-                items.append(e)
-            except StopIteration:
-                break
-            except RuntimeError as e:
-                logging.error(str(e))
+                with LeaseKeeper(queue, job, worker):
+                    file_statistics = index_source(job.source, index, indexer, JobCheckpoints(queue, job),
+                                                   executor=executor, parse_workers=parse_workers,
+                                                   buffer_size=buffer_size, statistics=statistics,
+                                                   json_field=json_field, random_ids=random_ids,
+                                                   duplicates=duplicates)
+            except Exception as e:
+                logging.error("{source}: {error}".format(source=str(job.source), error=str(e)))
+                queue.fail(job, worker, str(e))
                 continue
-
-        bar = progressbar.ProgressBar(max_value=len(items), prefix=f.name)
-        generator = EventGenerator(
-            filename=f.name,
-            index=index,
-            raw_items=items,
-            progress_bar=bar
-        )
-        bulk(connections.get_connection(), generator, index=index)
+            total.add(file_statistics)
+            if file_statistics.failed > 0:
+                queue.fail(job, worker, "{count} documents have not been indexed".format(
+                    count=file_statistics.failed))
+            else:
+                queue.complete(job, worker, file_statistics.documents)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    logging.info("total: {statistics}".format(statistics=total))
 
 
-def create_index(index: str, override: bool):
+def create_index(index: str, override: bool, resume: bool = False, shards: int = None, replicas: int = None) -> bool:
+    """
+    returns False if the records are added to an existing index, whose number of shards cannot be changed
+    """
     logger = logging.getLogger()
     i = Index(name=index)
     if i.exists():
         if override:
             logger.warning("deleting index '{index}'".format(index=index))
             i.delete()
+        elif resume:
+            logger.info("resuming import into index '{index}'".format(index=index))
+            return False
         else:
-            raise ValueError("index '{index}' exists already, "
-                             "you must specify '--override' to override this index".format(index=index))
+            raise ValueError("index '{index}' exists already, you must specify '--override' to override "
+                             "this index or '--resume' to add the remaining records".format(index=index))
     assert not i.exists()
-    index_template = """
-        {
-          "template": {
-            "settings": {},
-            "mappings": {
-              "dynamic_templates": [
-                {
-                  "event_data": {
-                    "path_match": "event_data.*",
-                    "mapping": {
-                      "type": "text"
-                    }
-                  }
-                }
-              ]
-            },
-            "aliases": {}
-          }
-        }
-        """
+    settings = dict()
+    if shards is not None:
+        settings['number_of_shards'] = shards
+    if replicas is not None:
+        settings['number_of_replicas'] = replicas
+    if len(settings) > 0:
+        i.settings(**settings)
     i.get_or_create_mapping().meta('numeric_detection', False)
     i.create()
+    return True
 
 
 
@@ -263,16 +511,64 @@ def main():
         fmt="%(levelname)s %(message)s")
     args = evtxtools.parse_evtx2elasticsearch_arguments()
 
-    evtx_files = set()
-    for f in args.logsdir.iterdir():
-        if f.name.endswith(".evtx"):
-            evtx_files.add(f)
+    evtx_files = [f for logsdir in args.logsdir for f in record_sources(logsdir)]
 
+    statistics = Statistics() if args.stats else NO_STATISTICS
+    statistics.start_reporting(interval=args.stats_interval)
     try:
-        evtx2elasticsearch(evtx_files, index=args.index, override=args.override_index)
+        if args.queue is not None:
+            queue = JobQueue(args.queue, lease=args.lease, max_attempts=args.max_attempts)
+            try:
+                if args.worker:
+                    work(queue, index=args.index,
+                         buffer_size=args.buffer_size * 1024 * 1024,
+                         hosts=args.hosts,
+                         bulk_threads=args.bulk_threads,
+                         chunk_size=args.chunk_size,
+                         max_chunk_bytes=args.max_chunk_bytes * 1024 * 1024,
+                         max_retries=args.max_retries,
+                         parse_workers=args.parse_workers,
+                         statistics=statistics,
+                         json_field=args.json_field,
+                         random_ids=args.random_ids,
+                         dedup=args.dedup,
+                         dedup_capacity=args.dedup_capacity)
+                    return 0
+                failed = coordinate(queue, evtx_files, index=args.index, override=args.override_index,
+                                    hosts=args.hosts,
+                                    resume=args.resume,
+                                    bulk_load=args.bulk_load,
+                                    shards=args.shards,
+                                    replicas=args.replicas,
+                                    force_merge=args.force_merge)
+                return 1 if failed > 0 else 0
+            finally:
+                queue.close()
+        evtx2elasticsearch(evtx_files, index=args.index, override=args.override_index,
+                           buffer_size=args.buffer_size * 1024 * 1024,
+                           hosts=args.hosts,
+                           bulk_threads=args.bulk_threads,
+                           chunk_size=args.chunk_size,
+                           max_chunk_bytes=args.max_chunk_bytes * 1024 * 1024,
+                           max_retries=args.max_retries,
+                           resume=args.resume,
+                           checkpoint_file=args.checkpoint_file,
+                           parse_workers=args.parse_workers,
+                           dry_run=args.dry_run,
+                           statistics=statistics,
+                           json_field=args.json_field,
+                           bulk_load=args.bulk_load,
+                           shards=args.shards,
+                           replicas=args.replicas,
+                           force_merge=args.force_merge,
+                           random_ids=args.random_ids,
+                           dedup=args.dedup,
+                           dedup_capacity=args.dedup_capacity)
     except ValueError as e:
         logger.fatal(str(e))
         return 1
+    finally:
+        statistics.stop_reporting()
     return 0
 
 
@@ -0,0 +1,175 @@
+"""
+evtx2jsonl.py
+
+exports evtx files as newline delimited JSON, one document per record.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import coloredlogs, logging
+import orjson
+import progressbar
+
+import evtxtools
+from el import JSON_NORMALIZED, event_to_dict
+from evtxtools.JsonlWriter import JsonlWriter, DEFAULT_BUFFER_SIZE, DEFAULT_COMPRESS_LEVEL
+from evtxtools.RecordSource import EvtxFileSource, RecordSource, record_sources
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+from evtxtools.Statistics import NO_STATISTICS, Statistics
+
+
+def output_stems(sources: list) -> list:
+    """
+    names the output files like the logs, e.g. 'Security' for 'Security.evtx'. Logs with the same name,
+    e.g. in different directories of an archive, are numbered
+    """
+    stems = list()
+    used = set()
+    for source in sources:
+        stem = Path(source.name).stem
+        candidate = stem
+        number = 1
+        while candidate.lower() in used:
+            number += 1
+            candidate = "{stem}_{number}".format(stem=stem, number=number)
+        used.add(candidate.lower())
+        stems.append(candidate)
+    return stems
+
+
+def export_source(source: RecordSource, directory: Path, stem: str, compress: bool = False,
+                  compress_level: int = DEFAULT_COMPRESS_LEVEL, max_file_size: int = None,
+                  buffer_size: int = DEFAULT_BUFFER_SIZE, json_field: str = JSON_NORMALIZED,
+                  log_level: int = None) -> dict:
+    """
+    converts all records of a log into documents and writes them into the output files of this log,
+    this is done by the worker processes. The records are streamed from the parser to the output file,
+    so only the write buffer is held in memory
+    """
+    if log_level is not None:
+        # worker processes do not inherit the logging configuration
+        logging.basicConfig(level=log_level, format="%(levelname)s " + source.name + ": %(message)s", force=True)
+    records_read = 0
+    errors = 0
+    # seconds spent in the parser, converting the records and writing the documents
+    reading = converting = writing = 0.0
+    with JsonlWriter(directory, stem, compress=compress, compress_level=compress_level,
+                     max_file_size=max_file_size, buffer_size=buffer_size) as writer:
+        iterator = source.records()
+        while True:
+            start = time.perf_counter()
+            record = next(iterator, None)
+            reading += time.perf_counter() - start
+            if record is None:
+                break
+            records_read += 1
+            start = time.perf_counter()
+            try:
+                document = orjson.dumps(event_to_dict(filename=source.name, swe=SimpleWindowsEvent(record),
+                                                      json=json_field),
+                                        option=orjson.OPT_APPEND_NEWLINE)
+            except Exception as e:
+                logging.error("unable to convert record {record_id}: {error}".format(
+                    record_id=record['event_record_id'], error=str(e)))
+                errors += 1
+                continue
+            converting += time.perf_counter() - start
+            start = time.perf_counter()
+            writer.write(document)
+            writing += time.perf_counter() - start
+        # closing the writer writes the rest of the buffer
+        start = time.perf_counter()
+    writing += time.perf_counter() - start
+    if isinstance(source, EvtxFileSource):
+        errors += source.errors
+    return {
+        'records read': records_read,
+        'documents': writer.lines_written,
+        'errors': errors,
+        'bytes': writer.bytes_written,
+        'files': [str(f) for f in writer.files],
+        'timings': {'read records': reading, 'convert': converting, 'write documents': writing},
+    }
+
+
+def evtx2jsonl(sources: list, directory: Path, compress: bool = False,
+               compress_level: int = DEFAULT_COMPRESS_LEVEL, max_file_size: int = None,
+               buffer_size: int = DEFAULT_BUFFER_SIZE, workers: int = None, json_field: str = JSON_NORMALIZED,
+               statistics: Statistics = NO_STATISTICS):
+    workers = workers or math.ceil(os.cpu_count() / 2)
+    directory.mkdir(parents=True, exist_ok=True)
+    # the largest logs are started first, so that the total time is close to the time of the largest one
+    jobs = sorted(zip(sources, output_stems(sources)), key=lambda j: j[0].size, reverse=True)
+    start = time.monotonic()
+    documents = written = 0
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(jobs), 1)),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = {executor.submit(export_source, source, directory, stem, compress, compress_level,
+                                   max_file_size, buffer_size, json_field, logging.getLogger().level): source
+                   for source, stem in jobs}
+        for future in progressbar.progressbar(as_completed(futures), max_value=len(futures)):
+            source = futures[future]
+            result = future.result()
+            documents += result['documents']
+            written += result['bytes']
+            statistics.count('records read', result['records read'], key=str(source))
+            statistics.count('documents written', result['documents'], key=str(source))
+            statistics.count('conversion errors', result['errors'], key=str(source))
+            statistics.count('bytes written', result['bytes'])
+            for name, seconds in result['timings'].items():
+                statistics.add_time(name, seconds, result['records read'])
+            logging.info("{source}: wrote {count} documents to {files}".format(
+                source=str(source), count=result['documents'], files=", ".join(result['files']) or "no file"))
+    duration = time.monotonic() - start
+
+    logging.info("exported {count} documents ({size:.1f} MiB) in {seconds:.1f}s ({rate:.0f} documents/s)".format(
+        count=documents,
+        size=written / (1024 * 1024),
+        seconds=duration,
+        rate=documents / duration if duration > 0 else 0))
+
+
+def main():
+    logger = logging.getLogger()
+    coloredlogs.install(
+        level='INFO',
+        logger=logger,
+        fmt="%(levelname)s %(message)s")
+    args = evtxtools.parse_evtx2jsonl_arguments()
+
+    sources = record_sources(args.logsdir)
+
+    statistics = Statistics() if args.stats else NO_STATISTICS
+    statistics.start_reporting(interval=args.stats_interval)
+    try:
+        evtx2jsonl(sources, directory=args.outdir,
+                   compress=args.gzip,
+                   compress_level=args.compress_level,
+                   max_file_size=args.max_file_size * 1024 * 1024 if args.max_file_size else None,
+                   buffer_size=args.buffer_size * 1024 * 1024,
+                   workers=args.workers,
+                   json_field=args.json_field,
+                   statistics=statistics)
+    finally:
+        statistics.stop_reporting()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""
+evtx2sqlite.py
+
+converts evtx files to a SQLite database.
+
+This program is free software: you can redistribute it and/or modify it under
+the terms of the GNU General Public License as published by the Free Software
+Foundation, either version 3 of the License, or (at your option) any later
+version.
+
+This program is distributed in the hope that it will be useful, but WITHOUT
+ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
+You should have received a copy of the GNU General Public License along with
+this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+import math
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import coloredlogs, logging
+import progressbar
+from sqlalchemy import Table, create_engine
+
+import db
+import evtxtools
+from evtxtools.EvtxFile import EvtxFile, read_chunk_range
+from evtxtools.RecordSource import RecordSource, record_sources
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+
+BATCH_SIZE = 2000
+TRANSACTION_SIZE = 100000
+
+
+def format_datetime(timestamp: datetime) -> str:
+    # this is the format which is used by SQLAlchemy to store DateTime columns in SQLite
+    return "%04d-%02d-%02d %02d:%02d:%02d.%06d" % (timestamp.year, timestamp.month, timestamp.day,
+                                                  timestamp.hour, timestamp.minute, timestamp.second,
+                                                  timestamp.microsecond)
+
+
+def convert_records(records: list) -> list:
+    """
+    converts raw records into tuples which contain the names of the dimension values instead of their ids,
+    the ids are assigned by SqliteLoader in the main process
+    """
+    rows = list()
+    for record in records:
+        try:
+            swe = SimpleWindowsEvent(record)
+        except Exception as e:
+            logging.error("unable to convert record: {error}".format(error=str(e)))
+            continue
+        rows.append((
+            swe.event_id,
+            swe["/System/Provider/@Name"],
+            swe["/System/Provider/@Guid"],
+            format_datetime(swe.timecreated),
+            swe.record_id,
+            swe["/System/Correlation/@ActivityID"],
+            swe["/System/Correlation/@RelatedActivityID"],
+            swe.process_id,
+            swe.thread_id,
+            swe["/System/Channel"],
+            swe["/System/Computer"],
+            swe["/System/Security/@UserID"],
+            tuple(swe.event_data.items()) if swe.event_data else ()
+        ))
+    return rows
+
+
+def convert_chunk_range(path: Path, offset: int, count: int) -> list:
+    """
+    parses some adjacent chunks of an evtx file and converts their records, this runs in a worker process
+    """
+    return convert_records(read_chunk_range(path, offset, count))
+
+
+def insert_statement(table: Table, columns: list) -> str:
+    return "INSERT INTO {table} ({columns}) VALUES ({values})".format(
+        table=table.name,
+        columns=", ".join('"' + c + '"' for c in columns),
+        values=", ".join("?" for _ in columns))
+
+
+class Dimension:
+    """
+    caches the ids of the rows of a small table which is referenced by the events
+    """
+    def __init__(self, connection: sqlite3.Connection, table: Table, key_columns: list, value_columns: list = None):
+        self.__connection = connection
+        self.__insert = insert_statement(table, ['id'] + key_columns + (value_columns or []))
+        self.__ids = dict()
+        query = "SELECT id, {columns} FROM {table}".format(columns=", ".join(key_columns), table=table.name)
+        for row in connection.execute(query):
+            self.__ids[tuple(row[1:])] = row[0]
+        self.__next_id = max(self.__ids.values(), default=0) + 1
+
+    def id(self, key: tuple, values: tuple = ()) -> int:
+        dimension_id = self.__ids.get(key)
+        if dimension_id is None:
+            dimension_id = self.__next_id
+            self.__next_id += 1
+            self.__connection.execute(self.__insert, (dimension_id,) + key + values)
+            self.__ids[key] = dimension_id
+        return dimension_id
+
+
+class SqliteLoader:
+    """
+    writes events into the tables defined in db using plain executemany() calls in large transactions.
+    All ids are assigned here, and the ids of providers, channels, computers, executions and correlations
+    are cached, so that no query is required to insert an event.
+    """
+    EVENT_COLUMNS = ['id', 'event_id', 'provider_id', 'timecreated', 'recordid', 'correlation_id',
+                     'execution_id', 'channel_id', 'computer_id', 'userid']
+    EVENT_DATA_COLUMNS = ['id', 'eventid', 'key', 'value']
+
+    def __init__(self, connection: sqlite3.Connection, transaction_size: int = TRANSACTION_SIZE):
+        self.__connection = connection
+        self.__transaction_size = transaction_size
+        self.__insert_event = insert_statement(db.Event.__table__, self.EVENT_COLUMNS)
+        self.__insert_event_data = insert_statement(db.EventData.__table__, self.EVENT_DATA_COLUMNS)
+        self.__providers = Dimension(connection, db.Provider.__table__, ['name'], ['guid'])
+        self.__channels = Dimension(connection, db.Channel.__table__, ['name'])
+        self.__computers = Dimension(connection, db.Computer.__table__, ['name'])
+        self.__executions = Dimension(connection, db.Execution.__table__, ['process_id', 'thread_id'])
+        self.__correlations = Dimension(connection, db.Correlation.__table__, ['activityid', 'relatedactivityid'])
+        self.__next_event_id = self.__max_id(db.Event.__table__) + 1
+        self.__next_event_data_id = self.__max_id(db.EventData.__table__) + 1
+        self.__events = list()
+        self.__event_data = list()
+        self.__events_written = 0
+
+    @property
+    def events_written(self) -> int:
+        return self.__events_written
+
+    def __max_id(self, table: Table) -> int:
+        return self.__connection.execute("SELECT MAX(id) FROM {table}".format(table=table.name)).fetchone()[0] or 0
+
+    def add(self, row: tuple):
+        (event_id, provider_name, provider_guid, timecreated, record_id, activity_id, related_activity_id,
+         process_id, thread_id, channel, computer, user, event_data) = row
+
+        provider_id = self.__providers.id((provider_name,), (provider_guid,))
+        channel_id = self.__channels.id((channel,)) if channel is not None else None
+        computer_id = self.__computers.id((computer,)) if computer is not None else None
+        execution_id = self.__executions.id((process_id, thread_id)) \
+            if process_id is not None and thread_id is not None else None
+        correlation_id = self.__correlations.id((activity_id, related_activity_id)) \
+            if activity_id is not None or related_activity_id is not None else None
+
+        eid = self.__next_event_id
+        self.__next_event_id += 1
+        self.__events.append((eid, event_id, provider_id, timecreated, record_id, correlation_id,
+                              execution_id, channel_id, computer_id, user))
+        for key, value in event_data:
+            self.__event_data.append((self.__next_event_data_id, eid, key, value))
+            self.__next_event_data_id += 1
+
+        if len(self.__events) >= self.__transaction_size:
+            self.flush()
+
+    def flush(self):
+        self.__connection.executemany(self.__insert_event, self.__events)
+        self.__connection.executemany(self.__insert_event_data, self.__event_data)
+        self.__connection.commit()
+        self.__events_written += len(self.__events)
+        self.__events.clear()
+        self.__event_data.clear()
+
+
+def open_database(dbfile: Path) -> sqlite3.Connection:
+    engine = create_engine("sqlite:///{dbfile}".format(dbfile=dbfile))
+    db.Base.metadata.create_all(engine)
+    engine.dispose()
+
+    connection = sqlite3.connect(str(dbfile))
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.execute("PRAGMA temp_store=MEMORY")
+    connection.execute("PRAGMA cache_size=-262144")
+    return connection
+
+
+def read_batches(source: RecordSource):
+    """
+    reads the records of a source which has no path, and which can therefore only be read by the main process
+    """
+    batch = list()
+    for record in source.records():
+        batch.append(record)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = list()
+    if len(batch) > 0:
+        yield batch
+
+
+def submit_tasks(source: RecordSource, executor: ProcessPoolExecutor):
+    """
+    the chunks of evtx files are parsed by the workers, all other sources are parsed here and only
+    converted by the workers
+    """
+    if source.path is not None:
+        for chunks in EvtxFile(source.path).chunk_ranges():
+            yield executor.submit(convert_chunk_range, source.path, chunks[0].offset, len(chunks))
+    else:
+        for batch in read_batches(source):
+            yield executor.submit(convert_records, batch)
+
+
+def evtx2sqlite(sources: list, dbfile: Path, workers: int = None):
+    workers = workers or math.ceil(os.cpu_count() / 2)
+    connection = open_database(dbfile)
+    loader = SqliteLoader(connection)
+    start = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for source in sources:
+            bar = progressbar.ProgressBar(max_value=progressbar.UnknownLength, prefix=source.name)
+            count = 0
+            pending = deque()
+
+            def load_next_result():
+                nonlocal count
+                for row in pending.popleft().result():
+                    loader.add(row)
+                    count += 1
+                bar.update(count)
+
+            for task in submit_tasks(source, executor):
+                pending.append(task)
+                if len(pending) >= 2 * workers:
+                    load_next_result()
+            while len(pending) > 0:
+                load_next_result()
+            bar.finish()
+    loader.flush()
+    duration = time.monotonic() - start
+
+    logging.info("creating indexes")
+    for statement in db.DEFERRED_INDEXES:
+        connection.execute(statement)
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.execute("ANALYZE")
+    connection.commit()
+    # merge the write-ahead log into the database, so that the database consists of a single file
+    connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    connection.execute("PRAGMA journal_mode=DELETE")
+    connection.close()
+
+    logging.info("loaded {count} events in {seconds:.1f}s ({rate:.0f} events/s)".format(
+        count=loader.events_written,
+        seconds=duration,
+        rate=loader.events_written / duration if duration > 0 else 0))
+
+
+def main():
+    logger = logging.getLogger()
+    coloredlogs.install(
+        level='INFO',
+        logger=logger,
+        fmt="%(levelname)s %(message)s")
+    args = evtxtools.parse_evtx2sqlite_arguments()
+
+    sources = record_sources(args.logsdir)
+    evtx2sqlite(sources, dbfile=args.dbfile, workers=args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -9,23 +9,37 @@ from evtxtools.WindowsEvent import WindowsEvent
 
 @functools.total_ordering
 class Activity:
+    """
+    the events of one activity (e.g. a logon session). Only the first, the last, the begin and the end event are
+    kept, and they are updated as events are added, so no per-event storage and no sorting is required
+    """
     UNKNOWN_TIME = "????-??-?? ??:??:??"
     NO_TIME      = "                   "
 
+    __slots__ = ('__begin_event', '__end_event', '__first_event', '__last_event', '__event_count',
+                 '__activity_id', '__hostname')
+
     def __init__(self, hostname: str):
         self.__begin_event = None
         self.__end_event = None
-        self.__events = dict()
+        self.__first_event = None
+        self.__last_event = None
+        self.__event_count = 0
         self.__activity_id = None
         self.__hostname = hostname
 
     def add_event(self, event: WindowsEvent):
-        self.__events[event.timestamp] = event
         if self.__activity_id is None:
             self.__activity_id = event.activity_id
         else:
             assert self.__activity_id == event.activity_id
 
+        self.__event_count += 1
+        if self.__first_event is None or event.timestamp < self.__first_event.timestamp:
+            self.__first_event = event
+        if self.__last_event is None or event.timestamp >= self.__last_event.timestamp:
+            self.__last_event = event
+
         if event.descriptor.activity_change == ActivityChange.START_ACTIVITY:
             if self.__begin_event is None or event.timestamp < self.__begin_event.timestamp:
                 self.__begin_event = event
@@ -34,12 +48,27 @@ class Activity:
                 self.__end_event = event
 
     @property
-    def logged_out(self) -> bool:
-        return self.__begin_timestamp is not None
+    def event_count(self) -> int:
+        return self.__event_count
+
+    @property
+    def last_timestamp(self) -> datetime:
+        return self.__last_event.timestamp
+
+    @property
+    def sort_key(self) -> datetime:
+        """
+        activities are ordered by the timestamp of their first event
+        """
+        return self.__first_event.timestamp
 
     @property
     def logged_in(self) -> bool:
-        return self.__end_timestamp is not None
+        return self.__begin_event is not None
+
+    @property
+    def logged_out(self) -> bool:
+        return self.__end_event is not None
 
     def __str__(self):
         if self.__hostname:
@@ -47,18 +76,16 @@ class Activity:
         else:
             hostname = ""
 
-        if len(self.__events) == 1:
-            event = next(iter(self.__events.values()))
+        if self.__event_count == 1:
+            event = self.__first_event
             return "%s%s: %s" % (
                 event.timestamp,
                 hostname,
                 str(event)
             )
 
-
-        timestamps = list(sorted(self.__events.keys()))
-        first_event = self.__begin_event or self.__events[timestamps[0]]
-        last_event = self.__end_event or self.__events[timestamps[-1]]
+        first_event = self.__begin_event or self.__first_event
+        last_event = self.__end_event or self.__last_event
         return "%s%s: %s (ended %s (%s))" % (
             first_event.timestamp,
             hostname,
@@ -68,16 +95,15 @@ class Activity:
         )
 
     def latex_str(self):
-        if len(self.__events) == 1:
-            event = next(iter(self.__events.values()))
+        if self.__event_count == 1:
+            event = self.__first_event
             return "\\mmsrow{\\ts{%s} & & & %s}" % (
                 event.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
                 event.latex_str()
             )
 
-        timestamps = list(sorted(self.__events.keys()))
-        first_event = self.__begin_event or self.__events[timestamps[0]]
-        last_event = self.__end_event or self.__events[timestamps[-1]]
+        first_event = self.__begin_event or self.__first_event
+        last_event = self.__end_event or self.__last_event
         td = str(last_event.timestamp - first_event.timestamp)
         idx = td.find(".")
         if idx:
@@ -91,11 +117,11 @@ class Activity:
 
     @property
     def login_time(self):
-        return self.__end_timestamp.strftime("%Y-%m-%d %H:%M:%S") if self.__end_timestamp else self.UNKNOWN_TIME
+        return self.login_timestamp.strftime("%Y-%m-%d %H:%M:%S") if self.logged_in else self.UNKNOWN_TIME
 
     @property
     def logout_time(self):
-        return self.__begin_timestamp.strftime("%Y-%m-%d %H:%M:%S") if self.__begin_timestamp else self.UNKNOWN_TIME
+        return self.logout_timestamp.strftime("%Y-%m-%d %H:%M:%S") if self.logged_out else self.UNKNOWN_TIME
 
     @property
     def username(self):
@@ -123,31 +149,18 @@ class Activity:
 
     @property
     def login_timestamp(self):
-        return self.__end_timestamp
+        return self.__begin_event.timestamp if self.__begin_event else None
 
     @property
     def logout_timestamp(self):
-        return self.__begin_timestamp
+        return self.__end_event.timestamp if self.__end_event else None
 
     @property
     def activity_id(self):
         return self.__activity_id
 
     def __eq__(self, other):
-        if self.logged_in != other.logged_in:
-            return False
-        if self.logged_out != other.logged_out:
-            return False
-        if self.logged_in:
-            return self.login_timestamp.__eq__(other.login_timestamp)
-        elif self.logged_out:
-            return self.logout_timestamp.__eq__(other.logout_timestamp)
-        else:
-            return False
+        return self.sort_key == other.sort_key
 
     def __lt__(self, other):
-        assert len(self.__events) > 0
-        assert len(other.__events) > 0
-        my_first_event = self.__events[sorted(self.__events.keys())[0]]
-        your_first_event = other.__events[sorted(other.__events.keys())[-1]]
-        return my_first_event.timestamp < your_first_event.timestamp
\ No newline at end of file
+        return self.sort_key < other.sort_key
@@ -0,0 +1,102 @@
+import heapq
+from datetime import timedelta
+from operator import attrgetter
+
+from evtxtools.Activity import Activity
+from evtxtools.ActivityChange import ActivityChange
+from evtxtools.WindowsEvent import WindowsEvent
+
+# a logoff is often logged twice, e.g. 4647 (user initiated logoff) followed by 4634 (logoff) of the same session
+END_GRACE = timedelta(seconds=5)
+
+
+class ActivityStream:
+    """
+    groups events, which must be added in the order of their timestamps, into activities. An activity is closed
+    when its end event is older than the end grace, so that events which follow the end event immediately are still
+    added to it, or if it had no events for longer than the idle timeout.
+    Only open activities are kept, so the memory usage depends on the number of concurrent sessions
+    """
+    def __init__(self, hostname: str, idle_timeout: timedelta, end_grace: timedelta = END_GRACE):
+        self.__hostname = hostname
+        self.__idle_timeout = idle_timeout
+        self.__end_grace = end_grace
+        self.__activities = dict()
+        # the timestamps of the end events of the activities which are about to be closed
+        self.__ended = dict()
+        # contains one (deadline, sequence number, activity id) entry for every activity. Deadlines only move
+        # forward, so an entry is pushed again when it is removed before the current deadline of its activity.
+        # Entries whose sequence number is not the current one of their activity are outdated, they are skipped
+        self.__deadlines = list()
+        self.__sequences = dict()
+        self.__sequence = 0
+
+    @property
+    def open_activities(self) -> int:
+        return len(self.__activities)
+
+    @property
+    def scheduled_deadlines(self) -> int:
+        """
+        the size of the heap of deadlines, including outdated entries
+        """
+        return len(self.__deadlines)
+
+    def add_event(self, event: WindowsEvent) -> list:
+        """
+        adds an event and returns all activities which have been closed before it
+        """
+        closed = self.__expire(event.timestamp)
+
+        activity = self.__activities.get(event.activity_id)
+        if activity is None:
+            activity = Activity(self.__hostname)
+            self.__activities[event.activity_id] = activity
+            activity.add_event(event)
+            self.__schedule(event.activity_id)
+        else:
+            activity.add_event(event)
+
+        if event.descriptor.activity_change == ActivityChange.END_ACTIVITY \
+                and event.activity_id not in self.__ended:
+            self.__ended[event.activity_id] = event.timestamp
+            # the end grace is shorter than the idle timeout, so the current entry is too late
+            self.__schedule(event.activity_id)
+        return closed
+
+    def close_all(self) -> list:
+        """
+        closes all remaining activities and returns them, ordered by their first event
+        """
+        activities = sorted(self.__activities.values(), key=attrgetter('sort_key'))
+        self.__activities.clear()
+        self.__ended.clear()
+        self.__deadlines.clear()
+        self.__sequences.clear()
+        return activities
+
+    def __deadline(self, activity_id):
+        if activity_id in self.__ended:
+            return self.__ended[activity_id] + self.__end_grace
+        return self.__activities[activity_id].last_timestamp + self.__idle_timeout
+
+    def __schedule(self, activity_id):
+        self.__sequence += 1
+        self.__sequences[activity_id] = self.__sequence
+        heapq.heappush(self.__deadlines, (self.__deadline(activity_id), self.__sequence, activity_id))
+
+    def __expire(self, now) -> list:
+        expired = list()
+        while len(self.__deadlines) > 0 and self.__deadlines[0][0] < now:
+            deadline, sequence, activity_id = heapq.heappop(self.__deadlines)
+            # the activity may have been closed already, or it may have got an earlier deadline by its end event
+            if self.__sequences.get(activity_id) != sequence:
+                continue
+            if self.__deadline(activity_id) > deadline:
+                # the activity has had events after this entry was pushed
+                self.__schedule(activity_id)
+                continue
+            del self.__sequences[activity_id]
+            self.__ended.pop(activity_id, None)
+            expired.append(self.__activities.pop(activity_id))
+        return expired
@@ -0,0 +1,64 @@
+import math
+
+DEFAULT_ERROR_RATE = 1e-6
+
+
+class BloomFilter:
+    """
+    a set of digests which needs only a few bytes per element, e.g. about 3.6 bytes with an error rate of 1e-6.
+    In exchange, an element which has not been added may be reported as contained with the probability
+    error_rate, as long as no more than capacity elements have been added.
+
+    The digests must be at least 16 bytes long and uniformly distributed, e.g. the digests of a cryptographic hash,
+    they are used as the hash values of the filter
+    """
+    def __init__(self, capacity: int, error_rate: float = DEFAULT_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.__bits = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.__hashes = max(1, round(self.__bits / capacity * math.log(2)))
+        self.__array = bytearray((self.__bits + 7) // 8)
+        self.__capacity = capacity
+        self.__count = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def size(self) -> int:
+        """
+        the size of the filter in bytes
+        """
+        return len(self.__array)
+
+    def __len__(self):
+        """
+        the number of elements which have been added, not counting false positives
+        """
+        return self.__count
+
+    def __probes(self, digest: bytes):
+        # double hashing, the second hash is odd so that it never maps all probes to the same bit
+        h1 = int.from_bytes(digest[0:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        bits = self.__bits
+        return ((h1 + i * h2) % bits for i in range(self.__hashes))
+
+    def __contains__(self, digest: bytes) -> bool:
+        array = self.__array
+        return all(array[bit >> 3] & (1 << (bit & 7)) for bit in self.__probes(digest))
+
+    def add(self, digest: bytes) -> bool:
+        """
+        adds the digest, and returns False if it has (probably) been added before
+        """
+        array = self.__array
+        added = False
+        for bit in self.__probes(digest):
+            mask = 1 << (bit & 7)
+            if not array[bit >> 3] & mask:
+                array[bit >> 3] |= mask
+                added = True
+        if added:
+            self.__count += 1
+        return added
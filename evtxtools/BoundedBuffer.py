@@ -0,0 +1,72 @@
+import threading
+from collections import deque
+
+
+class BoundedBuffer:
+    """
+    hands items over from one producer thread to a consumer. The producer is blocked as long as the
+    total size of all buffered items exceeds the configured limit, so the memory used by the buffer stays constant
+    """
+    class Aborted(Exception):
+        pass
+
+    def __init__(self, max_size: int):
+        self.__max_size = max_size
+        self.__size = 0
+        self.__items = deque()
+        self.__closed = False
+        self.__aborted = False
+        self.__error = None
+        self.__condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def __len__(self):
+        return len(self.__items)
+
+    def put(self, item, size: int):
+        with self.__condition:
+            # a single item which is larger than the limit is accepted as soon as the buffer is empty
+            while self.__size > 0 and self.__size + size > self.__max_size and not self.__aborted:
+                self.__condition.wait()
+            if self.__aborted:
+                raise BoundedBuffer.Aborted()
+            self.__items.append((item, size))
+            self.__size += size
+            self.__condition.notify_all()
+
+    def close(self, error: Exception = None):
+        """
+        signals the end of the stream. If an error is passed, it is raised by the consumer
+        after all buffered items have been consumed
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__error = error
+            self.__condition.notify_all()
+
+    def abort(self):
+        """
+        called by the consumer if it stops consuming items, further calls to put() raise BoundedBuffer.Aborted
+        """
+        with self.__condition:
+            self.__aborted = True
+            self.__items.clear()
+            self.__size = 0
+            self.__condition.notify_all()
+
+    def __iter__(self):
+        while True:
+            with self.__condition:
+                while len(self.__items) == 0 and not self.__closed:
+                    self.__condition.wait()
+                if len(self.__items) == 0:
+                    if self.__error is not None:
+                        raise self.__error
+                    return
+                item, size = self.__items.popleft()
+                self.__size -= size
+                self.__condition.notify_all()
+            yield item
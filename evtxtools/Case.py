@@ -0,0 +1,97 @@
+import heapq
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from operator import attrgetter
+from pathlib import Path
+
+import progressbar
+
+from evtxtools.DescriptorRegistry import DESCRIPTORS, load_descriptor_packs
+from evtxtools.EvtxParser import EvtxParser
+from evtxtools.RecordSource import archive_stem, is_archive
+from evtxtools.Statistics import NO_STATISTICS, Statistics
+from evtxtools.WellKnownSids import WellKnownSidFilter
+
+
+def parse_host(hostname: str, files: list, sid_filter: WellKnownSidFilter, from_date: datetime, to_date: datetime,
+               log_level: int, options: dict) -> list:
+    """
+    parses the logs of one host in a worker process, and returns its activities ordered by their start
+    """
+    # worker processes do not inherit the logging configuration
+    logging.basicConfig(level=log_level, format="%(levelname)s " + hostname + ": %(message)s", force=True)
+    evtx_parser = EvtxParser(files, sid_filter, from_date, to_date, **options)
+    evtx_parser.parse_events(hostname=hostname, show_progress=False)
+    return evtx_parser.activities
+
+
+class Case:
+    """
+    the logs of several hosts, e.g. all hosts of an incident. Every host is parsed by its own worker process,
+    and the activities of all hosts are merged into a single timeline
+    """
+    def __init__(self, hosts: dict, sid_filter: WellKnownSidFilter, from_date: datetime, to_date: datetime,
+                 host_workers: int = None, statistics: Statistics = None, **options):
+        """
+        hosts maps every hostname to its evtx files, the options are passed to the EvtxParser of every host
+        """
+        self.__hosts = hosts
+        self.__sid_filter = sid_filter
+        self.__from_date = from_date
+        self.__to_date = to_date
+        self.__host_workers = host_workers or os.cpu_count()
+        self.__statistics = statistics or NO_STATISTICS
+        self.__options = options
+        self.__activities = dict()
+
+    @staticmethod
+    def hosts_in_directories(directories: list) -> dict:
+        """
+        every directory (or archive) contains the logs of one host, which is named like the directory
+        """
+        return {archive_stem(Path(d).resolve()): EvtxParser.known_files(d) for d in directories}
+
+    @staticmethod
+    def hosts_in_root(root: Path) -> dict:
+        """
+        every subdirectory or archive in the case root which contains logs is a host
+        """
+        hosts = dict()
+        for entry in sorted(Path(root).iterdir()):
+            if entry.is_dir() or is_archive(entry):
+                files = EvtxParser.known_files(entry)
+                if len(files) > 0:
+                    hosts[archive_stem(entry)] = files
+        return hosts
+
+    @property
+    def hosts(self) -> list:
+        return sorted(self.__hosts.keys())
+
+    def parse_events(self):
+        # the largest hosts are started first, so that the total time is close to the time of the largest one
+        hosts = sorted(self.__hosts.items(), key=lambda h: sum(f.size for f in h[1]), reverse=True)
+        with self.__statistics.timer('parse hosts'), \
+                ProcessPoolExecutor(max_workers=min(self.__host_workers, max(len(hosts), 1)),
+                                    mp_context=multiprocessing.get_context('spawn'),
+                                    initializer=load_descriptor_packs, initargs=(DESCRIPTORS.packs,)) as executor:
+            futures = {executor.submit(parse_host, hostname, files, self.__sid_filter, self.__from_date,
+                                       self.__to_date, logging.getLogger().level, self.__options): hostname
+                       for hostname, files in hosts}
+            for future in progressbar.progressbar(as_completed(futures), max_value=len(futures)):
+                hostname = futures[future]
+                self.__activities[hostname] = future.result()
+                self.__statistics.count('activities', len(self.__activities[hostname]), key=hostname)
+        logging.info("parsed the logs of {count} hosts".format(count=len(hosts)))
+
+    def print_logins(self, enable_latex=False):
+        # the activities of every host are already ordered, ties are ordered by the hostname
+        timeline = heapq.merge(*(self.__activities[hostname] for hostname in self.hosts
+                                 if hostname in self.__activities),
+                               key=attrgetter('sort_key'))
+        with self.__statistics.timer('print activities'):
+            for s in timeline:
+                print(s.latex_str() if enable_latex else str(s))
@@ -0,0 +1,158 @@
+import json
+import logging
+from pathlib import Path
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+from evtxtools.ActivityChange import ActivityChange
+from evtxtools.EventDescriptor import EVENT_DESCRIPTORS, EventDescriptor
+
+# packs which are shipped with evtxtools, they can be loaded by their name, e.g. 'kerberos'
+PACKS_DIRECTORY = Path(__file__).parent / 'descriptors'
+YAML_SUFFIXES = ('.yaml', '.yml')
+
+
+def resolve_pack(pack) -> Path:
+    """
+    returns the file of a pack, which is either given by its path or by the name of a pack in PACKS_DIRECTORY
+    """
+    path = Path(pack)
+    if path.is_file():
+        return path.resolve()
+    for suffix in ('.json',) + YAML_SUFFIXES:
+        candidate = PACKS_DIRECTORY / (str(pack) + suffix)
+        if candidate.is_file():
+            return candidate
+    raise FileNotFoundError("there is no descriptor pack '{pack}'".format(pack=pack))
+
+
+def read_pack(path: Path) -> list:
+    """
+    returns the descriptors of a pack, which is a JSON or YAML document like
+
+        {"descriptors": [{"event_id": 4768, "channel": "Security", "activity_change": "NO_ACTIVITY",
+                          "description": "...", "latex_description": "..."}]}
+
+    activity_change and latex_description are optional
+    """
+    with open(path, 'rb') as f:
+        if path.suffix.lower() in YAML_SUFFIXES:
+            if yaml is None:
+                raise ValueError("{path}: descriptor packs in YAML require PyYAML".format(path=path))
+            document = yaml.safe_load(f)
+        else:
+            document = json.load(f)
+    if not isinstance(document, dict) or not isinstance(document.get('descriptors'), list):
+        raise ValueError("{path}: a descriptor pack must contain a list of descriptors".format(path=path))
+
+    descriptors = list()
+    for number, entry in enumerate(document['descriptors'], start=1):
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("expected an object")
+            activity_change = entry.get('activity_change', ActivityChange.NO_ACTIVITY.name)
+            if activity_change not in ActivityChange.__members__:
+                raise ValueError("unknown activity_change '{value}'".format(value=activity_change))
+            if not isinstance(entry.get('description'), str):
+                raise ValueError("the description is missing")
+            event_id = int(entry['event_id'])
+            descriptor = EventDescriptor(activity_change=ActivityChange[activity_change],
+                                         log_source=str(entry['channel']),
+                                         description=entry['description'],
+                                         latex_description=entry.get('latex_description'))
+        except (KeyError, TypeError, ValueError) as e:
+            message = "missing {key}".format(key=str(e)) if isinstance(e, KeyError) else str(e)
+            raise ValueError("{path}: descriptor {number}: {message}".format(
+                path=path, number=number, message=message)) from e
+        descriptors.append((event_id, descriptor))
+    return descriptors
+
+
+class DescriptorRegistry:
+    """
+    the event descriptors, in a flat table which maps (channel, event_id) to the descriptor, so that classifying
+    a record is a single dict lookup. It contains the built-in EVENT_DESCRIPTORS, and the descriptors of the
+    packs which have been loaded. A descriptor of a pack replaces a descriptor of the same event in the same
+    channel which has been added before
+    """
+    def __init__(self):
+        self.__descriptors = dict()
+        self.__event_ids = set()
+        self.__packs = list()
+        self.__pack_channels = set()
+        for event_id, descriptor in EVENT_DESCRIPTORS.items():
+            self.add(event_id, descriptor)
+
+    def add(self, event_id: int, descriptor: EventDescriptor):
+        self.__descriptors[(descriptor.channel, event_id)] = descriptor
+        self.__event_ids.add(event_id)
+
+    def get(self, channel: str, event_id: int) -> EventDescriptor:
+        """
+        returns the descriptor of the event, or None if the event is not described in this channel
+        """
+        return self.__descriptors.get((channel, event_id))
+
+    def load(self, pack) -> int:
+        """
+        loads a pack, given by its path or by its name, and returns the number of its descriptors.
+        A pack which has already been loaded is not loaded again
+        """
+        path = resolve_pack(pack)
+        if str(path) in self.__packs:
+            return 0
+        descriptors = read_pack(path)
+        for event_id, descriptor in descriptors:
+            self.add(event_id, descriptor)
+            self.__pack_channels.add(descriptor.channel)
+        self.__packs.append(str(path))
+        logging.info("loaded {count} event descriptors from {path}".format(count=len(descriptors), path=path))
+        return len(descriptors)
+
+    @property
+    def packs(self) -> tuple:
+        """
+        the files of the loaded packs, in the order in which they have been loaded
+        """
+        return tuple(self.__packs)
+
+    @property
+    def pack_channels(self) -> list:
+        """
+        the channels of the descriptors of the loaded packs, whose logs must be read in addition to the known files
+        """
+        return sorted(self.__pack_channels)
+
+    @property
+    def event_ids(self) -> set:
+        return set(self.__event_ids)
+
+    def describes(self, event_id: int) -> bool:
+        """
+        whether the event is described in any channel
+        """
+        return event_id in self.__event_ids
+
+    def keys(self) -> list:
+        """
+        all (channel, event_id) pairs which are described
+        """
+        return list(self.__descriptors.keys())
+
+    def __len__(self):
+        return len(self.__descriptors)
+
+
+DESCRIPTORS = DescriptorRegistry()
+
+
+def load_descriptor_packs(packs):
+    """
+    loads packs into DESCRIPTORS. Worker processes do not inherit the loaded packs, so this is also
+    the initializer of their process pools, with the packs of the parent process
+    """
+    for pack in packs:
+        DESCRIPTORS.load(pack)
@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import os
+import struct
+import zlib
+from array import array
+from pathlib import Path
+
+import orjson
+
+from evtxtools.EvtxFile import CHUNK_HEADER_SIZE, CHUNK_SIZE, FILE_HEADER_SIZE
+
+HEADER = struct.Struct('<I')
+# size, modification time, hash of the headers and hash of the whole contents of the file of a cache entry
+VALIDATION = struct.Struct('<QQ16s16s')
+NO_HASH = bytes(16)
+
+
+def encode_column(values: list) -> bytes:
+    """
+    stores strings as their lengths followed by their concatenated UTF-8 encodings
+    """
+    encoded = [v.encode('utf-8') for v in values]
+    return array('I', [len(e) for e in encoded]).tobytes() + b''.join(encoded)
+
+
+def decode_column(data: memoryview, offset: int, count: int) -> tuple:
+    """
+    returns the strings of a column and the offset behind it
+    """
+    lengths = array('I')
+    lengths.frombytes(data[offset:offset + count * lengths.itemsize])
+    offset += count * lengths.itemsize
+    values = list()
+    for length in lengths:
+        values.append(str(data[offset:offset + length], 'utf-8'))
+        offset += length
+    return values, offset
+
+
+def encode_records(records: list, records_read: int = None, rejected: dict = None) -> bytes:
+    """
+    stores the records column by column: their number, the record ids, the timestamps and the JSON data.
+    The data is stored as it has been returned by the parser, without decoding it. They are preceded by the number
+    of records which have been read and the number of rejected records by reason, as JSON
+    """
+    counters = orjson.dumps({'records read': len(records) if records_read is None else records_read,
+                             'rejected': rejected or {}})
+    return b''.join([HEADER.pack(len(counters)),
+                     counters,
+                     HEADER.pack(len(records)),
+                     array('q', [r['event_record_id'] for r in records]).tobytes(),
+                     encode_column([r['timestamp'] for r in records]),
+                     encode_column([r['data'] for r in records])])
+
+
+def decode_records(data: bytes) -> tuple:
+    """
+    returns the records, the number of records which have been read and the number of rejected records by reason
+    """
+    data = memoryview(data)
+    size, = HEADER.unpack_from(data)
+    offset = HEADER.size
+    counters = orjson.loads(data[offset:offset + size])
+    offset += size
+    count, = HEADER.unpack_from(data, offset)
+    offset += HEADER.size
+    record_ids = array('q')
+    record_ids.frombytes(data[offset:offset + count * record_ids.itemsize])
+    offset += count * record_ids.itemsize
+    timestamps, offset = decode_column(data, offset, count)
+    values, offset = decode_column(data, offset, count)
+    if offset != len(data):
+        raise ValueError("unexpected size")
+    records = [{'event_record_id': record_id, 'timestamp': timestamp, 'data': value}
+               for record_id, timestamp, value in zip(record_ids, timestamps, values)]
+    return records, counters['records read'], counters['rejected']
+
+
+class EventCache:
+    """
+    stores the records of evtx files which are relevant for a set of event descriptors, so that the files
+    need not be parsed again. Every cache entry is a compressed file which contains the record ids, the
+    timestamps and the JSON data of the records in columns (see encode_records). The entries are identified by
+    the path of the evtx file and the descriptors, and the least recently used entries are removed when the cache
+    grows beyond its maximum size.
+
+    An entry is valid if the size, the modification time and the hash of the headers of the file (see
+    header_hash) are unchanged. Only if the modification time has changed, e.g. because the file has been copied,
+    the whole file is hashed and compared with the hash of its contents when the entry was stored.
+
+    The cache also stores the chunk index (see EvtxFile) of every file.
+    """
+    VERSION = 3
+    SUFFIX = '.events'
+    INDEX_SUFFIX = '.chunks'
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, directory: Path, max_size: int):
+        self.__directory = Path(directory)
+        self.__max_size = max_size
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        # every file is hashed only once, unless it has changed
+        self.__hashes = dict()
+
+    @property
+    def directory(self) -> Path:
+        return self.__directory
+
+    @classmethod
+    def content_hash(cls, file: Path) -> bytes:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file, 'rb') as f:
+            for block in iter(lambda: f.read(cls.BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.digest()
+
+    @staticmethod
+    def header_hash(file: Path) -> bytes:
+        """
+        hashes the file header and the headers of all chunks. A chunk header contains the range of the record ids
+        and the checksum of the records of its chunk, so it changes whenever records are added or modified,
+        but it is only a small part of the chunk
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file, 'rb') as f:
+            digest.update(f.read(FILE_HEADER_SIZE))
+            offset = FILE_HEADER_SIZE
+            while True:
+                f.seek(offset)
+                header = f.read(CHUNK_HEADER_SIZE)
+                if len(header) == 0:
+                    break
+                digest.update(header)
+                offset += CHUNK_SIZE
+        return digest.digest()
+
+    def __hash(self, file: Path, stat: os.stat_result, function) -> bytes:
+        key = (str(file.resolve()), stat.st_size, stat.st_mtime_ns, function)
+        value = self.__hashes.get(key)
+        if value is None:
+            value = function(file)
+            self.__hashes[key] = value
+        return value
+
+    def __validation(self, file: Path, with_content_hash: bool) -> bytes:
+        stat = file.stat()
+        return VALIDATION.pack(stat.st_size, stat.st_mtime_ns,
+                               self.__hash(file, stat, self.header_hash),
+                               self.__hash(file, stat, self.content_hash) if with_content_hash else NO_HASH)
+
+    def __is_valid(self, file: Path, entry: Path, validation: bytes) -> bool:
+        size, mtime_ns, header_hash, content_hash = VALIDATION.unpack(validation)
+        stat = file.stat()
+        if stat.st_size != size or self.__hash(file, stat, self.header_hash) != header_hash:
+            return False
+        if stat.st_mtime_ns == mtime_ns:
+            return True
+        if content_hash == NO_HASH or self.__hash(file, stat, self.content_hash) != content_hash:
+            return False
+        # the contents are unchanged, so the file need not be hashed again next time
+        with open(entry, 'r+b') as f:
+            f.write(VALIDATION.pack(size, stat.st_mtime_ns, header_hash, content_hash))
+        return True
+
+    def __entry(self, file: Path, fingerprint: str, suffix: str = SUFFIX) -> Path:
+        key = "\0".join([str(self.VERSION), str(file.resolve()), fingerprint])
+        return self.__directory / (hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest() + suffix)
+
+    def __read(self, file: Path, entry: Path, decode):
+        try:
+            with open(entry, 'rb') as f:
+                validation = f.read(VALIDATION.size)
+                if len(validation) < VALIDATION.size:
+                    raise ValueError("truncated entry")
+                if not self.__is_valid(file, entry, validation):
+                    return None
+                content = decode(zlib.decompress(f.read()))
+            # mark the entry as recently used, it may have been evicted by another process meanwhile
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, ValueError, struct.error, KeyError) as e:
+            # orjson.JSONDecodeError and UnicodeDecodeError are ValueErrors
+            logging.warning("ignoring invalid cache entry {entry}: {error}".format(entry=entry, error=str(e)))
+            return None
+        return content
+
+    def __write(self, entry: Path, validation: bytes, data: bytes):
+        temp = entry.with_suffix('.tmp{pid}'.format(pid=os.getpid()))
+        with open(temp, 'wb') as f:
+            f.write(validation)
+            f.write(data)
+        os.replace(temp, entry)
+        self.evict()
+
+    def load(self, file: Path, fingerprint: str):
+        """
+        returns the cached records of the file, the number of records which have been read and the number of
+        rejected records by reason, or None if there is no valid cache entry
+        """
+        return self.__read(file, self.__entry(file, fingerprint), decode_records)
+
+    def store(self, file: Path, fingerprint: str, records: list, records_read: int = None, rejected: dict = None):
+        data = zlib.compress(encode_records(records, records_read, rejected))
+        if len(data) > self.__max_size:
+            return
+        self.__write(self.__entry(file, fingerprint), self.__validation(file, True), data)
+
+    def load_chunk_index(self, file: Path):
+        """
+        returns the cached chunk index of the file, or None if there is no valid cache entry. The index is
+        derived from the chunk headers and the record headers only, so the whole file is never hashed for it
+        """
+        return self.__read(file, self.__entry(file, '', self.INDEX_SUFFIX), orjson.loads)
+
+    def store_chunk_index(self, file: Path, index: list):
+        self.__write(self.__entry(file, '', self.INDEX_SUFFIX), self.__validation(file, False),
+                     zlib.compress(orjson.dumps(index)))
+
+    def evict(self):
+        entries = list()
+        for entry in [*self.__directory.glob('*' + self.SUFFIX), *self.__directory.glob('*' + self.INDEX_SUFFIX)]:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.__max_size:
+                break
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -1,18 +1,89 @@
+import string
+
 from evtxtools.LogSource import LogSource
 from evtxtools.LogonType import EventType
 from evtxtools.ActivityChange import ActivityChange
 
+# marks fields which are not contained in the event data at all
+MISSING = object()
+
+# replaces missing fields in the descriptions
+MISSING_VALUE = '-'
+
+CONVERSIONS = {'s': str, 'r': repr, 'a': ascii}
+
 
 def escape_lstinline(s: str):
     return s.replace("\\", "\\\\")
 
+
+def template_fields(template: str) -> list:
+    """
+    returns the names of all fields which are referenced by a format string
+    """
+    fields = list()
+    for _, field_name, _, _ in string.Formatter().parse(template):
+        if field_name:
+            name = field_name.split('.')[0].split('[')[0]
+            if name not in fields:
+                fields.append(name)
+    return fields
+
+
+class DescriptionFormatter:
+    """
+    a description which has been parsed once, so that it can be filled with the values of an event without
+    parsing the format string and without building a dict for every event. The values are passed in the order
+    of the fields of the descriptor, and missing values are replaced by MISSING_VALUE
+    """
+    __slots__ = ('__parts',)
+
+    def __init__(self, template: str, fields: tuple):
+        parts = list()
+        for literal, field_name, format_spec, conversion in string.Formatter().parse(template):
+            if field_name is None:
+                parts.append((literal, None, None, None))
+                continue
+            if field_name not in fields:
+                raise ValueError("unsupported field '{field}' in '{template}'".format(
+                    field=field_name, template=template))
+            if format_spec and '{' in format_spec:
+                raise ValueError("nested fields are not supported in '{template}'".format(template=template))
+            parts.append((literal, fields.index(field_name), format_spec or '', CONVERSIONS.get(conversion)))
+        self.__parts = tuple(parts)
+
+    def format(self, values) -> str:
+        result = list()
+        for literal, index, format_spec, conversion in self.__parts:
+            result.append(literal)
+            if index is None:
+                continue
+            value = values[index]
+            if value is MISSING:
+                value = MISSING_VALUE
+            if conversion is not None:
+                value = conversion(value)
+            result.append(format(value, format_spec))
+        return ''.join(result)
+
+
 class EventDescriptor:
-    def __init__(self, activity_change: ActivityChange, log_source:LogSource, description:str, latex_description=None):
+    def __init__(self, activity_change: ActivityChange, log_source, description:str, latex_description=None):
+        """
+        log_source is either a LogSource or the name of a channel which is not listed in LogSource
+        """
         self.__activity_change = activity_change
         self.__log_source = log_source
+        self.__channel = log_source.value if isinstance(log_source, LogSource) else str(log_source)
         self.__description = description
         assert self.__description is not None
         self.__latex_description = latex_description
+        fields = template_fields(description)
+        if latex_description is not None:
+            fields += [f for f in template_fields(latex_description) if f not in fields]
+        self.__fields = tuple(fields)
+        self.__formatter = DescriptionFormatter(self.__description, self.__fields)
+        self.__latex_formatter = DescriptionFormatter(self.latex_description, self.__fields)
 
     @property
     def activity_change(self) -> ActivityChange:
@@ -30,6 +101,25 @@ class EventDescriptor:
     def log_source(self):
         return self.__log_source
 
+    @property
+    def channel(self) -> str:
+        return self.__channel
+
+    @property
+    def fields(self) -> tuple:
+        """
+        names of the event data fields which are used by the descriptions
+        """
+        return self.__fields
+
+    @property
+    def formatter(self) -> DescriptionFormatter:
+        return self.__formatter
+
+    @property
+    def latex_formatter(self) -> DescriptionFormatter:
+        return self.__latex_formatter
+
 
 EVENT_DESCRIPTORS = {
     # https://docs.microsoft.com/en-us/windows/security/threat-protection/auditing/event-4624
@@ -0,0 +1,242 @@
+import io
+import logging
+import struct
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from evtx import PyEvtxParser
+
+from evtxtools.Timestamp import TimeWindow
+
+FILE_HEADER_SIZE = 4096
+CHUNK_SIZE = 65536
+CHUNK_HEADER_SIZE = 512
+FILE_SIGNATURE = b'ElfFile\0'
+CHUNK_SIGNATURE = b'ElfChnk\0'
+RECORD_SIGNATURE = b'\x2a\x2a\x00\x00'
+# signature, size, record id and timestamp (as FILETIME) of a record
+RECORD_HEADER = struct.Struct('<4sIQQ')
+CHUNKS_PER_RANGE = 16
+FILETIME_EPOCH = datetime(1601, 1, 1)
+
+
+def filetime_to_datetime(filetime: int) -> datetime:
+    return FILETIME_EPOCH + timedelta(microseconds=filetime // 10)
+
+
+class ChunkHeader:
+    def __init__(self, offset: int, first_record_id: int, last_record_id: int,
+                 first_timestamp: int = None, last_timestamp: int = None):
+        self.__offset = offset
+        self.__first_record_id = first_record_id
+        self.__last_record_id = last_record_id
+        self.__first_timestamp = first_timestamp
+        self.__last_timestamp = last_timestamp
+
+    @property
+    def offset(self) -> int:
+        return self.__offset
+
+    @property
+    def first_record_id(self) -> int:
+        return self.__first_record_id
+
+    @property
+    def last_record_id(self) -> int:
+        return self.__last_record_id
+
+    @property
+    def first_timestamp(self) -> int:
+        """
+        earliest timestamp of all records in this chunk (as FILETIME), or None if it is unknown
+        """
+        return self.__first_timestamp
+
+    @property
+    def last_timestamp(self) -> int:
+        """
+        latest timestamp of all records in this chunk (as FILETIME), or None if it is unknown
+        """
+        return self.__last_timestamp
+
+    def read_timestamps(self, first_record: bytes, last_record: bytes):
+        """
+        takes the timestamps from the headers of the first and the last record of the chunk. Records are written
+        in the order of their timestamps, so the records in between are not read at all
+        """
+        timestamps = list()
+        for header in (first_record, last_record):
+            if len(header) < RECORD_HEADER.size:
+                return
+            signature, size, _, timestamp = RECORD_HEADER.unpack_from(header)
+            if signature != RECORD_SIGNATURE or size < RECORD_HEADER.size:
+                return
+            timestamps.append(timestamp)
+        self.__first_timestamp = min(timestamps)
+        self.__last_timestamp = max(timestamps)
+
+    def overlaps(self, time_window: TimeWindow) -> bool:
+        if self.__first_timestamp is None:
+            return True
+        # the window is compared with microsecond precision, like the timestamps of the records
+        return time_window.overlaps(filetime_to_datetime(self.__first_timestamp),
+                                    filetime_to_datetime(self.__last_timestamp))
+
+    def to_tuple(self) -> tuple:
+        return (self.__offset, self.__first_record_id, self.__last_record_id,
+                self.__first_timestamp, self.__last_timestamp)
+
+
+def chunk_ranges(chunks: list, chunks_per_range: int = CHUNKS_PER_RANGE) -> list:
+    """
+    splits a list of chunks into ranges of adjacent chunks, returns a list of lists of chunk headers
+    """
+    ranges = list()
+    for chunk in chunks:
+        if len(ranges) > 0:
+            last = ranges[-1]
+            if len(last) < chunks_per_range and last[-1].offset + CHUNK_SIZE == chunk.offset:
+                last.append(chunk)
+                continue
+        ranges.append([chunk])
+    return ranges
+
+
+class EvtxFile:
+    """
+    reads the chunk headers of an evtx file, without parsing any records. With read_timestamps, the headers of the
+    first and the last record of every chunk are read as well
+    """
+    def __init__(self, path: Path, read_timestamps: bool = False):
+        self.__path = path
+        self.__chunks = list()
+        with open(path, 'rb') as f:
+            if f.read(len(FILE_SIGNATURE)) != FILE_SIGNATURE:
+                raise ValueError("{path} is not an evtx file".format(path=path))
+            offset = FILE_HEADER_SIZE
+            while True:
+                f.seek(offset)
+                data = f.read(CHUNK_HEADER_SIZE + RECORD_HEADER.size if read_timestamps else 40)
+                if len(data) < 40:
+                    break
+                # unused chunks at the end of the file have no signature
+                if data[:8] == CHUNK_SIGNATURE:
+                    first_record_id, last_record_id = struct.unpack_from('<QQ', data, 24)
+                    chunk = ChunkHeader(offset, first_record_id, last_record_id)
+                    if read_timestamps and len(data) >= CHUNK_HEADER_SIZE:
+                        last_record_offset, = struct.unpack_from('<I', data, 44)
+                        if CHUNK_HEADER_SIZE <= last_record_offset <= CHUNK_SIZE - RECORD_HEADER.size:
+                            f.seek(offset + last_record_offset)
+                            chunk.read_timestamps(data[CHUNK_HEADER_SIZE:], f.read(RECORD_HEADER.size))
+                    self.__chunks.append(chunk)
+                offset += CHUNK_SIZE
+
+    @classmethod
+    def from_index(cls, path: Path, index: list):
+        """
+        creates an instance from a chunk index, which has been returned by the index property
+        """
+        evtx_file = cls.__new__(cls)
+        evtx_file.__path = path
+        evtx_file.__chunks = [ChunkHeader(*chunk) for chunk in index]
+        return evtx_file
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    @property
+    def chunks(self) -> list:
+        return self.__chunks
+
+    @property
+    def index(self) -> list:
+        return [chunk.to_tuple() for chunk in self.__chunks]
+
+    @property
+    def records_in_order(self) -> bool:
+        """
+        whether the event record ids increase in the order in which the records are stored. This is not the case
+        if the log has wrapped around and older chunks have been overwritten by newer ones
+        """
+        last = 0
+        for chunk in self.__chunks:
+            if chunk.first_record_id <= last or chunk.last_record_id < chunk.first_record_id:
+                return False
+            last = chunk.last_record_id
+        return True
+
+    def chunk_ranges(self, chunks_per_range: int = CHUNKS_PER_RANGE) -> list:
+        return chunk_ranges(self.__chunks, chunks_per_range)
+
+    def chunks_in_window(self, time_window: TimeWindow) -> list:
+        """
+        returns all chunks which may contain records inside the time window
+        """
+        return [chunk for chunk in self.__chunks if chunk.overlaps(time_window)]
+
+
+def read_chunk_range(path: Path, offset: int, count: int) -> list:
+    """
+    parses the records of some adjacent chunks. Chunks can be parsed independently of each other, so the
+    chunks are copied behind the file header into an in-memory evtx file, which is then passed to the parser
+    """
+    with open(path, 'rb') as f:
+        data = bytearray(f.read(FILE_HEADER_SIZE))
+        f.seek(offset)
+        data += f.read(count * CHUNK_SIZE)
+    return parse_chunks(data, str(path))
+
+
+def parse_chunks(data: bytes, filename: str) -> list:
+    """
+    parses an in-memory evtx file, which may contain only some of the chunks of the original file
+    """
+    records = list()
+    iterator = PyEvtxParser(io.BytesIO(data), number_of_threads=1).records_json()
+    while True:
+        try:
+            records.append(next(iterator))
+        except StopIteration:
+            break
+        except RuntimeError as e:
+            logging.error("error while parsing {filename}: {error}".format(filename=filename, error=str(e)))
+            continue
+    return records
+
+
+def read_exactly(stream, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        block = stream.read(size - len(data))
+        if not block:
+            break
+        data += block
+    return bytes(data)
+
+
+def read_chunk_stream(stream, filename: str, chunks_per_range: int = CHUNKS_PER_RANGE):
+    """
+    parses an evtx file which can only be read sequentially, e.g. a member of a compressed archive.
+    The chunks are parsed in ranges, so that only a few chunks are held in memory
+    """
+    header = read_exactly(stream, FILE_HEADER_SIZE)
+    if header[:len(FILE_SIGNATURE)] != FILE_SIGNATURE:
+        raise ValueError("{filename} is not an evtx file".format(filename=filename))
+    data = bytearray(header)
+    count = 0
+    while True:
+        chunk = read_exactly(stream, CHUNK_SIZE)
+        if len(chunk) < CHUNK_SIZE:
+            break
+        # unused chunks at the end of the file have no signature
+        if chunk[:len(CHUNK_SIGNATURE)] != CHUNK_SIGNATURE:
+            continue
+        data += chunk
+        count += 1
+        if count == chunks_per_range:
+            yield from parse_chunks(data, filename)
+            data = bytearray(header)
+            count = 0
+    if count > 0:
+        yield from parse_chunks(data, filename)
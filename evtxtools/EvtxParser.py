@@ -1,11 +1,19 @@
+import heapq
+import logging
 import xml
-from datetime import datetime
+from operator import attrgetter
+from datetime import datetime, timedelta
+from pathlib import Path
 
 import progressbar
 from evtx import PyEvtxParser
-from evtxtools.EventDescriptor import EVENT_DESCRIPTORS
+from evtxtools.DescriptorRegistry import DESCRIPTORS
 from evtxtools.Activity import Activity
+from evtxtools.ActivityStream import ActivityStream
+from evtxtools.EventCache import EventCache
 from evtxtools.RawEventList import RawEventList
+from evtxtools.RecordSource import JSONL_SUFFIX, record_sources
+from evtxtools.Statistics import NO_STATISTICS, Statistics
 from evtxtools.WellKnownSids import *
 from evtxtools.WindowsEvent import WindowsEvent
 
@@ -16,11 +24,23 @@ class EvtxParser:
 
 class EvtxParser:
 
-    def __init__(self, files_to_scan: list, sid_filter: WellKnownSidFilter, from_date: datetime, to_date: datetime):
+    def __init__(self, files_to_scan: list, sid_filter: WellKnownSidFilter, from_date: datetime, to_date: datetime,
+                 workers: int = None, use_processes: bool = False, use_record_filter: bool = True,
+                 cache: EventCache = None, parallel_chunks: bool = False, statistics: Statistics = None,
+                 batch_size: int = RawEventList.BATCH_SIZE, queue_depth: int = None):
         self.__files_to_scan = files_to_scan
         self.__sid_filter = sid_filter
         self.__from_date = from_date
         self.__to_date = to_date
+        self.__workers = workers
+        self.__use_processes = use_processes
+        self.__use_record_filter = use_record_filter
+        self.__cache = cache
+        self.__parallel_chunks = parallel_chunks
+        self.__statistics = statistics or NO_STATISTICS
+        self.__batch_size = batch_size
+        self.__queue_depth = queue_depth
+        self.__excluded_by_sid = 0
         self.__activities = dict()
 
     KNOWN_FILES = [
@@ -31,17 +51,32 @@ class EvtxParser:
         'Microsoft-Windows-RemoteDesktopServices-RdpCoreTS%4Operational.evtx'
     ]
 
+    @staticmethod
+    def known_files(logs: Path) -> list:
+        """
+        returns the record sources of the files of KNOWN_FILES and of the channels of the loaded descriptor packs
+        in a directory or an archive, or of their JSONL exports
+        """
+        sources = record_sources(logs)
+        known_files = list()
+        file_names = list(EvtxParser.KNOWN_FILES)
+        file_names.extend(f for f in (channel.replace("/", "%4") + ".evtx" for channel in DESCRIPTORS.pack_channels)
+                          if f not in file_names)
+        for kf in file_names:
+            names = (kf, Path(kf).stem + JSONL_SUFFIX)
+            known_files.extend(s for s in sources if s.name in names)
+        return known_files
+
     def exclude_event(self, event: WindowsEvent) -> bool:
-        if 'TargetUserSid' in event.event_data:
+        target_user_sid = event.get('TargetUserSid')
+        if target_user_sid is not None:
             try:
-                if self.__sid_filter.is_excluded(WellKnownSid(event.event_data['TargetUserSid'])):
+                if self.__sid_filter.is_excluded(WellKnownSid(target_user_sid)):
+                    self.__excluded_by_sid += 1
                     return True
             except ValueError:
                 pass
 
-        if event.event_id not in EVENT_DESCRIPTORS:
-            return True
-
         return False
 
     def handle_event(self, event: WindowsEvent, hostname: str):
@@ -51,12 +86,77 @@ class EvtxParser:
             self.__activities[event.activity_id] = activity
         activity.add_event(event)
 
-    def parse_events(self, hostname: str = None):
-        event_list = RawEventList(self.__files_to_scan, set(EVENT_DESCRIPTORS.keys()), self.__from_date, self.__to_date)
-        for event in progressbar.progressbar(event_list):
-            if not self.exclude_event(event):
-                self.handle_event(event, hostname)
+    def __event_list(self, files: list, workers: int = None) -> RawEventList:
+        return RawEventList(files, DESCRIPTORS.event_ids, self.__from_date, self.__to_date,
+                            workers=workers or self.__workers,
+                            use_processes=self.__use_processes,
+                            use_record_filter=self.__use_record_filter,
+                            cache=self.__cache,
+                            parallel_chunks=self.__parallel_chunks,
+                            statistics=self.__statistics,
+                            batch_size=self.__batch_size,
+                            queue_depth=self.__queue_depth)
+
+    def __log_statistics(self, event_lists: list):
+        rejected = dict()
+        for event_list in event_lists:
+            for reason, count in event_list.rejected_records.items():
+                rejected[reason] = rejected.get(reason, 0) + count
+        if self.__excluded_by_sid > 0:
+            rejected['sid filter'] = self.__excluded_by_sid
+        for reason, count in rejected.items():
+            self.__statistics.count('records rejected', count, key=reason)
+        logging.info("read {total} records, rejected {count} of them ({reasons})".format(
+            total=sum(event_list.records_read for event_list in event_lists),
+            count=sum(rejected.values()),
+            reasons=", ".join("{count} by {reason}".format(count=c, reason=r) for r, c in sorted(rejected.items()))
+                    or "none"))
+
+    def parse_events(self, hostname: str = None, show_progress: bool = True):
+        event_list = self.__event_list(self.__files_to_scan)
+        with self.__statistics.timer('parse events'):
+            for event in progressbar.progressbar(event_list) if show_progress else event_list:
+                if not self.exclude_event(event):
+                    self.handle_event(event, hostname)
+        self.__statistics.count('activities', len(self.__activities))
+        self.__log_statistics([event_list])
+
+    def stream_logins(self, hostname: str = None, enable_latex=False, idle_timeout: timedelta = timedelta(days=1)):
+        """
+        prints every activity as soon as it has ended, instead of collecting all activities first.
+        The events of all files are merged by their timestamps, so every file is parsed by its own event list
+        """
+        event_lists = list()
+        for f in self.__files_to_scan:
+            # worker processes return the events in the order of the records,
+            # worker threads only if there is a single one
+            workers = None if self.__use_processes or self.__parallel_chunks else 1
+            event_lists.append(self.__event_list([f], workers=workers))
+
+        stream = ActivityStream(hostname, idle_timeout)
+        self.__statistics.add_gauge('open activities', lambda: stream.open_activities)
+        activities = 0
+        with self.__statistics.timer('stream activities'):
+            for event in heapq.merge(*event_lists, key=attrgetter('timestamp')):
+                if self.exclude_event(event):
+                    continue
+                for activity in stream.add_event(event):
+                    activities += 1
+                    print(activity.latex_str() if enable_latex else str(activity), flush=True)
+            for activity in stream.close_all():
+                activities += 1
+                print(activity.latex_str() if enable_latex else str(activity), flush=True)
+        self.__statistics.count('activities', activities)
+        self.__log_statistics(event_lists)
+
+    @property
+    def activities(self) -> list:
+        """
+        all activities, ordered by their first event
+        """
+        return sorted(self.__activities.values(), key=attrgetter('sort_key'))
 
     def print_logins(self, enable_latex = False):
-        for s in sorted(self.__activities.values()):
-            print(s.latex_str() if enable_latex else str(s))
\ No newline at end of file
+        with self.__statistics.timer('print activities'):
+            for s in self.activities:
+                print(s.latex_str() if enable_latex else str(s))
\ No newline at end of file
@@ -0,0 +1,111 @@
+import gzip
+from pathlib import Path
+
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+class JsonlWriter:
+    """
+    writes lines of JSON into one or more files. Lines are collected in a buffer, which is written to disk
+    with a single call when it is full, so that the disk sees only large sequential writes.
+    If max_file_size is given, a new file is started before a file would exceed this size; the files are
+    then numbered, e.g. Security-0001.jsonl.gz, Security-0002.jsonl.gz. The size of a compressed file is only
+    known after the buffer has been compressed, so a new compressed file is started as soon as the previous
+    one has reached max_file_size
+    """
+    def __init__(self, directory: Path, stem: str, compress: bool = False,
+                 compress_level: int = DEFAULT_COMPRESS_LEVEL, max_file_size: int = None,
+                 buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.__directory = Path(directory)
+        self.__stem = stem
+        self.__compress = compress
+        self.__compress_level = compress_level
+        self.__max_file_size = max_file_size
+        self.__buffer_size = min(buffer_size, max_file_size) if max_file_size and not compress else buffer_size
+        self.__buffer = bytearray()
+        self.__files = list()
+        self.__raw = None
+        self.__stream = None
+        self.__bytes_written = 0
+        self.__lines_written = 0
+
+    @staticmethod
+    def file_name(stem: str, compress: bool = False, number: int = None) -> str:
+        name = stem if number is None else "{stem}-{number:04d}".format(stem=stem, number=number)
+        return name + ('.jsonl.gz' if compress else '.jsonl')
+
+    @property
+    def files(self) -> list:
+        """
+        the files which have been written so far
+        """
+        return list(self.__files)
+
+    @property
+    def bytes_written(self) -> int:
+        """
+        the number of uncompressed bytes written to disk
+        """
+        return self.__bytes_written
+
+    @property
+    def lines_written(self) -> int:
+        return self.__lines_written
+
+    def write(self, line: bytes):
+        """
+        line must already end with a newline
+        """
+        pending = self.__file_size() + len(self.__buffer)
+        if self.__max_file_size and not self.__compress and pending > 0 \
+                and pending + len(line) > self.__max_file_size:
+            self.__flush()
+            self.__close_file()
+        self.__buffer += line
+        self.__lines_written += 1
+        if len(self.__buffer) >= self.__buffer_size:
+            self.__flush()
+            if self.__max_file_size and self.__compress and self.__file_size() >= self.__max_file_size:
+                self.__close_file()
+
+    def close(self):
+        self.__flush()
+        self.__close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __file_size(self) -> int:
+        if self.__raw is None:
+            return 0
+        # for compressed files, this is the size on disk, not counting what the compressor still holds back
+        return self.__raw.tell()
+
+    def __open_file(self):
+        number = len(self.__files) + 1 if self.__max_file_size else None
+        path = self.__directory / self.file_name(self.__stem, self.__compress, number)
+        self.__raw = open(path, 'wb')
+        self.__stream = gzip.GzipFile(filename='', mode='wb', fileobj=self.__raw,
+                                      compresslevel=self.__compress_level) if self.__compress else self.__raw
+        self.__files.append(path)
+
+    def __close_file(self):
+        if self.__raw is None:
+            return
+        if self.__compress:
+            self.__stream.close()
+        self.__raw.close()
+        self.__raw = self.__stream = None
+
+    def __flush(self):
+        if len(self.__buffer) == 0:
+            return
+        if self.__raw is None:
+            self.__open_file()
+        self.__stream.write(self.__buffer)
+        self.__bytes_written += len(self.__buffer)
+        self.__buffer.clear()
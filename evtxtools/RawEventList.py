@@ -1,102 +1,411 @@
 import math
-import os, sys
+import multiprocessing
+import os
 import queue
 import threading
 import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-from evtx import PyEvtxParser
-
+from evtxtools.DescriptorRegistry import DESCRIPTORS, load_descriptor_packs
+from evtxtools.EventCache import EventCache
+from evtxtools.EvtxFile import EvtxFile, chunk_ranges, read_chunk_range
+from evtxtools.RecordFilter import RecordFilter
+from evtxtools.RecordSource import EvtxFileSource, RecordSource
+from evtxtools.Statistics import NO_STATISTICS, Statistics
+from evtxtools.Timestamp import TimeWindow
 from evtxtools.WindowsEvent import WindowsEvent
 
 
+def parse_records(records: list, record_filter: RecordFilter, time_window: TimeWindow) -> tuple:
+    """
+    returns the events, the number of rejected records by reason and the number of seconds spent by every step.
+    The time window is checked by the record filter, or here if there is none
+    """
+    events = list()
+    rejected = dict()
+    filtering = decoding = 0.0
+    for record in records:
+        start = time.perf_counter()
+        if record_filter is not None:
+            reason = record_filter.check(record)
+            filtered = time.perf_counter()
+            filtering += filtered - start
+        else:
+            reason = None if time_window.contains(record['timestamp']) else RecordFilter.REJECTED_BY_TIME
+            filtered = start
+        if reason is not None:
+            rejected[reason] = rejected.get(reason, 0) + 1
+            continue
+        try:
+            events.append(WindowsEvent(record))
+        except WindowsEvent.IgnoreThisEvent as e:
+            rejected[e.reason] = rejected.get(e.reason, 0) + 1
+        decoding += time.perf_counter() - filtered
+    return events, rejected, {'record filter': filtering, 'decode': decoding}
+
+
+def parse_chunk_range(path, offset: int, count: int, record_filter: RecordFilter, time_window: TimeWindow) -> tuple:
+    """
+    like parse_records(), additionally returns the number of records which have been read
+    """
+    start = time.perf_counter()
+    records = read_chunk_range(path, offset, count)
+    reading = time.perf_counter() - start
+    events, rejected, timings = parse_records(records, record_filter, time_window)
+    timings['read chunks'] = reading
+    return events, rejected, timings, len(records)
+
+
 class RawEventList:
-    def __init__(self, files: list, included_event_ids: set, from_date: datetime, to_date: datetime):
-        self.__files = files
-        self.__included_event_ids = included_event_ids
-        self.__from_date = from_date
-        self.__to_date = to_date
+    """
+    reads the records of some evtx files and returns them as WindowsEvents. The files are either paths of
+    evtx files or RecordSources; the cache, the time window index and the parallel parsing of chunk ranges
+    are only used for evtx files on disk. Events are classified by DESCRIPTORS, included_event_ids only select
+    the records which pass the record filter.
+
+    The records are read by a single reader thread and handed over in batches to the worker threads
+    (or processes), which return the events in batches as well. Both queues are bounded, so the number of
+    records and events held in memory does not depend on the size of the files. The end of the records
+    and the end of the events of every worker is marked by None.
+    """
+    BATCH_SIZE = 1000
+
+    def __init__(self, files: list, included_event_ids: set, from_date: datetime, to_date: datetime,
+                 workers: int = None, use_processes: bool = False, use_record_filter: bool = True,
+                 cache: EventCache = None, parallel_chunks: bool = False, statistics: Statistics = None,
+                 batch_size: int = BATCH_SIZE, queue_depth: int = None):
+        self.__files = [f if isinstance(f, RecordSource) else EvtxFileSource(f) for f in files]
+        self.__time_window = TimeWindow(from_date, to_date)
+        self.__worker_count = workers or math.ceil(os.cpu_count() / 2)
+        # parsing chunk ranges of the same file concurrently requires worker processes
+        self.__parallel_chunks = parallel_chunks
+        self.__use_processes = use_processes or parallel_chunks
+        self.__record_filter = RecordFilter(included_event_ids, self.__time_window) if use_record_filter else None
+        self.__cache = cache
+        # the cache stores only records which match one of the event descriptors, independent of the time window
+        self.__cache_filter = RecordFilter(included_event_ids) if cache is not None else None
+        self.__statistics = statistics or NO_STATISTICS
+        self.__batch_size = batch_size
+        # number of batches per queue
+        self.__queue_depth = queue_depth or 2 * self.__worker_count
+        self.__records_read = 0
+        self.__rejected_records = dict()
+        self.__statistics_lock = threading.Lock()
+        self.__started = False
+
+    @property
+    def records_read(self) -> int:
+        return self.__records_read
+
+    @property
+    def rejected_records(self) -> dict:
+        """
+        number of records which have been rejected by the record filter or while being decoded, by reason
+        """
+        return self.__rejected_records
+
+    def __add_rejected_records(self, rejected: dict):
+        with self.__statistics_lock:
+            for reason, count in rejected.items():
+                self.__rejected_records[reason] = self.__rejected_records.get(reason, 0) + count
+
+    def __add_timings(self, timings: dict):
+        for name, seconds in timings.items():
+            self.__statistics.add_time(name, seconds)
+        self.__statistics.add_time('worker busy', sum(timings.values()))
+
+    def __set_error(self, error: Exception):
+        with self.__statistics_lock:
+            if self.__error is None:
+                self.__error = error
 
     def __iter__(self):
-        self.__events = dict()
-        self.__queue = queue.Queue()
-        self.__results = queue.Queue()
+        # the list is its own iterator, so the workers must only be started by the first call
+        if self.__started:
+            return self
+        self.__started = True
+        self.__queue = queue.Queue(maxsize=self.__queue_depth)
+        self.__results = queue.Queue(maxsize=self.__queue_depth)
+        self.__batch = iter(())
+        self.__error = None
         self.__reader = None
-        self.__reader_thread = threading.Thread(target=self.__event_reader_worker)
-        self.__reader_thread.start()
-        self.__workers = set()
-        for _ in range(0, math.ceil(os.cpu_count() / 2)):
-            th = threading.Thread(target=self.__event_parser_worker)
-            self.__workers.add(th)
-            th.start()
+        self.__statistics.add_gauge('record queue', self.__queue.qsize)
+        self.__statistics.add_gauge('event queue', self.__results.qsize)
+        # the threads are daemons, so that they cannot keep the process alive
+        # if the events are not consumed completely
+        if self.__use_processes:
+            # records are read here and parsed in batches by a pool of worker processes,
+            # so there is no separate reader thread
+            self.__producers = 1
+            threading.Thread(target=self.__process_pool_dispatcher, daemon=True).start()
+            return self
+
+        self.__producers = self.__worker_count
+        threading.Thread(target=self.__event_reader_worker, daemon=True).start()
+        for _ in range(0, self.__worker_count):
+            threading.Thread(target=self.__event_parser_worker, daemon=True).start()
         return self
 
     def __next__(self):
-        # if there are no workers anymore, no further results can be expected
-        while len(self.__workers) > 0:
-            # there are still workers, but maybe they return no result anymore
-            try:
-                return self.__results.get(timeout=1)
-            except queue.Empty:
-                continue
-        try:
-            return self.__results.get_nowait()
-        except queue.Empty:
-            raise StopIteration
+        while True:
+            event = next(self.__batch, None)
+            if event is not None:
+                return event
+            if self.__producers == 0:
+                if self.__error is not None:
+                    raise self.__error
+                raise StopIteration
+            batch = self.__results.get()
+            if batch is None:
+                self.__producers -= 1
+            else:
+                self.__batch = iter(batch)
 
     def __event_parser_worker(self):
-        while True:
-            if self.__reader_thread is None:  # no records will ever be made available to be parsed
-                try:
-                    record = self.__queue.get_nowait()
-                except queue.Empty:
-                    # this may happen if another worker has removed the last remaining element
-                    # after we have checked that the queue is not empty
-                    self.__workers.remove(threading.current_thread())
+        rejected = dict()
+        timings = dict()
+        idle = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                batch = self.__queue.get()
+                idle += time.perf_counter() - start
+                if batch is None:
                     return
-            else:
+
+                events, batch_rejected, batch_timings = parse_records(batch, self.__record_filter, self.__time_window)
+                for reason, count in batch_rejected.items():
+                    rejected[reason] = rejected.get(reason, 0) + count
+                for name, seconds in batch_timings.items():
+                    timings[name] = timings.get(name, 0.0) + seconds
+                if len(events) > 0:
+                    self.__results.put(events)
+        except Exception as e:
+            self.__set_error(e)
+        finally:
+            self.__add_rejected_records(rejected)
+            self.__add_timings(timings)
+            self.__statistics.add_time('worker idle', idle)
+            self.__results.put(None)
+
+    def __process_pool_dispatcher(self):
+        try:
+            with ProcessPoolExecutor(max_workers=self.__worker_count,
+                                     mp_context=multiprocessing.get_context('spawn'),
+                                     initializer=load_descriptor_packs, initargs=(DESCRIPTORS.packs,)) as executor:
+                # results are collected in submission order, so events are returned in the order of the records
+                pending = deque()
+                self.__statistics.add_gauge('pending tasks', pending.__len__)
                 try:
-                    record = self.__queue.get(timeout=1)
-                except queue.Empty:
-                    # this may happen if all records provided by the reader got consumed by other workers
-                    continue
-            assert record is not None
+                    for file, *task in self.__tasks():
+                        pending.append((file, executor.submit(*task)))
+                        if len(pending) >= 2 * self.__worker_count:
+                            self.__put_results(*pending.popleft())
+                except Exception as e:
+                    # like the worker threads, the workers return the events of the records read before the error
+                    self.__set_error(e)
+                while len(pending) > 0:
+                    self.__put_results(*pending.popleft())
+        except Exception as e:
+            self.__set_error(e)
+        finally:
+            self.__results.put(None)
 
-            try:
-                self.__results.put(WindowsEvent(record,
-                                                self.__included_event_ids,
-                                                self.__from_date,
-                                                self.__to_date))
-            except WindowsEvent.IgnoreThisEvent:
-                pass
+    def __tasks(self):
+        """
+        generates the work items for the worker processes: either batches of records which have been read here,
+        or ranges of chunks which are read and parsed by the workers themselves. Every work item starts with the
+        file whose records must still be counted when the result arrives, or None if they have been counted already
+        """
+        if not self.__parallel_chunks:
+            batch = self.__get_next_batch()
+            while len(batch) > 0:
+                yield None, parse_records, batch, self.__record_filter, self.__time_window
+                batch = self.__get_next_batch()
+            return
+
+        while len(self.__files) > 0:
+            file = self.__files.pop()
+            if file.path is None:
+                # the source can only be read sequentially
+                batch = list()
+                for record in self.__read_file(file):
+                    batch.append(record)
+                    if len(batch) == self.__batch_size:
+                        yield None, parse_records, batch, self.__record_filter, self.__time_window
+                        batch = list()
+                if len(batch) > 0:
+                    yield None, parse_records, batch, self.__record_filter, self.__time_window
+                continue
+
+            records, records_read = self.__load_from_cache(file)
+            if records is not None:
+                self.__count_records_read(file, records_read)
+                for i in range(0, len(records), self.__batch_size):
+                    yield (None, parse_records, records[i:i + self.__batch_size],
+                           self.__record_filter, self.__time_window)
+                continue
+
+            chunks = self.__chunks_in_window(file)
+            if chunks is None:
+                chunks = EvtxFile(file.path).chunks
+            for chunk_range in chunk_ranges(chunks):
+                yield (file, parse_chunk_range, file.path, chunk_range[0].offset, len(chunk_range),
+                       self.__record_filter, self.__time_window)
+
+    def __load_from_cache(self, file: RecordSource):
+        """
+        returns the cached records of the file and the number of records which have been read to find them,
+        or None, 0 if the file is not cached
+        """
+        if self.__cache is None or file.path is None:
+            return None, 0
+        with self.__statistics.timer('cache load'):
+            entry = self.__cache.load(file.path, self.__cache_filter.fingerprint)
+        if entry is None:
+            return None, 0
+        records, records_read, rejected = entry
+        logging.info("read {count} records of {filename} from the cache".format(
+            count=len(records), filename=str(file)))
+        self.__statistics.count('cache hits', key=str(file))
+        # the records which have been rejected when the entry was stored count as read and rejected again,
+        # so that the counters do not depend on whether the file was parsed or read from the cache
+        self.__add_rejected_records(rejected)
+        return records, records_read
+
+    def __count_records_read(self, file: RecordSource, count: int):
+        self.__records_read += count
+        self.__statistics.count('records read', count, key=str(file))
+
+    def __chunks_in_window(self, file: RecordSource):
+        """
+        returns the chunks of the file which may contain records inside the time window,
+        or None if the whole file must be read
+        """
+        if not self.__time_window.bounded or file.path is None:
+            return None
+
+        index = self.__cache.load_chunk_index(file.path) if self.__cache is not None else None
+        if index is not None:
+            evtx_file = EvtxFile.from_index(file.path, index)
+        else:
+            evtx_file = EvtxFile(file.path, read_timestamps=True)
+            if self.__cache is not None:
+                self.__cache.store_chunk_index(file.path, evtx_file.index)
 
-            self.__queue.task_done()
+        chunks = evtx_file.chunks_in_window(self.__time_window)
+        logging.info("{count} of {total} chunks of {filename} overlap with the time window".format(
+            count=len(chunks), total=len(evtx_file.chunks), filename=str(file)))
+        return chunks
+
+    def __put_results(self, file, future):
+        start = time.perf_counter()
+        result = future.result()
+        self.__statistics.add_time('waiting for workers', time.perf_counter() - start)
+
+        events, rejected, timings = result[0:3]
+        if file is not None:
+            self.__count_records_read(file, result[3])
+        self.__add_timings(timings)
+        self.__add_rejected_records(rejected)
+        if len(events) > 0:
+            self.__results.put(events)
+
+    def __get_next_batch(self) -> list:
+        batch = list()
+        while len(batch) < self.__batch_size:
+            record = self.__get_next_record()
+            if record is None:
+                break
+            batch.append(record)
+        return batch
 
     def __event_reader_worker(self):
-        event = self.__get_next_record()
-        while event is not None:
-            self.__queue.put(event)
-            event = self.__get_next_record()
-        self.__reader_thread = None
+        waiting = 0.0
+        try:
+            batch = self.__get_next_batch()
+            while len(batch) > 0:
+                start = time.perf_counter()
+                self.__queue.put(batch)
+                waiting += time.perf_counter() - start
+                batch = self.__get_next_batch()
+        except Exception as e:
+            self.__set_error(e)
+        finally:
+            self.__statistics.add_time('waiting for queue space', waiting)
+            # every worker stops after it has taken one of these
+            for _ in range(0, self.__worker_count):
+                self.__queue.put(None)
 
     def __get_next_record(self):
         while len(self.__files) > 0 or self.__reader is not None:
             if self.__reader is None:
                 self.__current_file = self.__files.pop()
-                self.__reader = PyEvtxParser(str(self.__current_file)).records_json()
+                self.__reader = self.__read_file(self.__current_file)
 
             try:
                 return self.__reader.__next__()
             except StopIteration:
                 self.__reader = None
-            except RuntimeError as e:
-                logging.fatal("fatal error while parsing {filename}:".format(filename=str(self.__current_file)))
-                logging.fatal(str(e))
-                continue
         return None
 
-    @staticmethod
-    def __fill_queue(self, fstream):
-        records = PyEvtxParser(fstream)
-        for record in records.records():
-            self.__queue.put(record)
\ No newline at end of file
+    def __read_file(self, file: RecordSource):
+        """
+        returns the records of the file, and counts them and the time it took to read them
+        """
+        records = self.__read_records(file)
+        count = 0
+        seconds = 0.0
+        while True:
+            start = time.perf_counter()
+            record = next(records, None)
+            seconds += time.perf_counter() - start
+            if record is None:
+                break
+            count += 1
+            self.__records_read += 1
+            yield record
+        self.__statistics.count('records read', count, key=str(file))
+        self.__statistics.add_time('read records', seconds, count)
+
+    def __read_records(self, file: RecordSource):
+        if file.path is None:
+            yield from file.records()
+            return
+
+        records, records_read = self.__load_from_cache(file)
+        if records is not None:
+            # the cached records are counted by __read_file()
+            self.__count_records_read(file, records_read - len(records))
+            yield from records
+            return
+
+        # the cache stores all relevant records of the file, so it is filled by reading the whole file once,
+        # and the records outside of the time window are rejected later
+        chunks = self.__chunks_in_window(file) if self.__cache is None else None
+        if chunks is not None:
+            for chunk_range in chunk_ranges(chunks):
+                yield from read_chunk_range(file.path, chunk_range[0].offset, len(chunk_range))
+            return
+
+        accepted = list()
+        rejected = dict()
+        for record in file.records():
+            if self.__cache is not None:
+                reason = self.__cache_filter.check_descriptor(record)
+                if reason is not None:
+                    rejected[reason] = rejected.get(reason, 0) + 1
+                    continue
+                accepted.append(record)
+            yield record
+
+        self.__add_rejected_records(rejected)
+        # the rejected records have been read as well, but they are not returned to __read_file()
+        self.__count_records_read(file, sum(rejected.values()))
+        # files which could not be parsed completely are not cached, so that they are parsed again next time
+        if self.__cache is not None and file.errors == 0:
+            self.__cache.store(file.path, self.__cache_filter.fingerprint, accepted,
+                               len(accepted) + sum(rejected.values()), rejected)
@@ -0,0 +1,66 @@
+import re
+
+from evtxtools.DescriptorRegistry import DESCRIPTORS
+from evtxtools.Timestamp import TimeWindow
+
+
+class RecordFilter:
+    """
+    rejects raw records which cannot match any of the included event descriptors,
+    without fully decoding their JSON data
+    """
+    EVENT_ID = re.compile(r'"EventID":\s*(?:"(\d+)"|(\d+)|(\{))')
+    EVENT_ID_TEXT = re.compile(r'"#text":\s*"?(\d+)')
+    CHANNEL = re.compile(r'"Channel":\s*"([^"\\]*)"')
+
+    REJECTED_BY_TIME = 'time window'
+    REJECTED_BY_EVENT_ID = 'event id'
+    REJECTED_BY_CHANNEL = 'channel'
+
+    def __init__(self, included_event_ids: set, time_window: TimeWindow = None):
+        # the channels in which every included event is described
+        self.__channels = dict()
+        for channel, event_id in DESCRIPTORS.keys():
+            if event_id in included_event_ids:
+                self.__channels.setdefault(event_id, set()).add(channel)
+        self.__time_window = time_window
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        identifies the set of records which are accepted by check_descriptor()
+        """
+        return ",".join("{event_id}:{channel}".format(event_id=event_id, channel=channel)
+                        for event_id, channels in sorted(self.__channels.items()) for channel in sorted(channels))
+
+    def check(self, record: dict):
+        """
+        returns the reason why the record was rejected, or None if the record must be fully decoded
+        """
+        if self.__time_window and not self.__time_window.contains(record['timestamp']):
+            return self.REJECTED_BY_TIME
+        return self.check_descriptor(record)
+
+    def check_descriptor(self, record: dict):
+        """
+        like check(), but ignores the time window
+        """
+        data = record['data']
+        match = self.EVENT_ID.search(data)
+        if match is None:
+            return None
+        event_id = match.group(1) or match.group(2)
+        if event_id is None:
+            match = self.EVENT_ID_TEXT.search(data, match.end(), match.end() + 256)
+            if match is None:
+                return None
+            event_id = match.group(1)
+
+        channels = self.__channels.get(int(event_id))
+        if channels is None:
+            return self.REJECTED_BY_EVENT_ID
+
+        match = self.CHANNEL.search(data)
+        if match is not None and match.group(1) not in channels:
+            return self.REJECTED_BY_CHANNEL
+        return None
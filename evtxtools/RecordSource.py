@@ -0,0 +1,266 @@
+import logging
+import tarfile
+from abc import ABC, abstractmethod
+import zipfile
+from pathlib import Path, PurePosixPath
+
+import orjson
+from evtx import PyEvtxParser
+
+from evtxtools.EvtxFile import read_chunk_stream
+from evtxtools.Timestamp import RECORD_TIMESTAMP_SUFFIX, parse_system_time
+
+EVTX_SUFFIX = '.evtx'
+JSONL_SUFFIX = '.jsonl'
+ZIP_SUFFIXES = ('.zip',)
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def is_archive(path: Path) -> bool:
+    name = path.name.lower()
+    return name.endswith(ZIP_SUFFIXES) or name.endswith(TAR_SUFFIXES)
+
+
+def archive_stem(path: Path) -> str:
+    """
+    the name of the archive without its suffixes, e.g. 'WS01' for 'WS01.tar.gz'
+    """
+    name = path.name
+    for suffix in sorted(ZIP_SUFFIXES + TAR_SUFFIXES, key=len, reverse=True):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def is_log(name: str) -> bool:
+    return name.lower().endswith((EVTX_SUFFIX, JSONL_SUFFIX))
+
+
+def jsonl_records(lines, filename: str):
+    """
+    decodes records which have been exported as JSON lines, either in the format of PyEvtxParser.records_json()
+    ({"event_record_id": ..., "timestamp": ..., "data": ...}) or in the format of 'evtx_dump -o jsonl',
+    which contains only the data of every record
+    """
+    for number, line in enumerate(lines, start=1):
+        if len(line.strip()) == 0:
+            continue
+        try:
+            record = orjson.loads(line)
+            if 'data' in record and 'timestamp' in record:
+                data = record['data']
+                yield {
+                    'event_record_id': record.get('event_record_id', number),
+                    'timestamp': record['timestamp'],
+                    'data': data if isinstance(data, str) else orjson.dumps(data).decode('utf-8'),
+                }
+            else:
+                system = record['Event']['System']
+                timestamp = parse_system_time(system['TimeCreated']['#attributes']['SystemTime'])
+                yield {
+                    'event_record_id': int(system.get('EventRecordID', number)),
+                    'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S.%f') + RECORD_TIMESTAMP_SUFFIX,
+                    'data': orjson.dumps(record).decode('utf-8'),
+                }
+        except (orjson.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            logging.error("invalid record in line {number} of {filename}: {error}".format(
+                number=number, filename=filename, error=str(e)))
+
+
+class RecordSource(ABC):
+    """
+    provides the records of an evtx log, in the format of PyEvtxParser.records_json(). Only plain evtx files
+    have a path, all other sources can only be read sequentially
+    """
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """
+        the file name of the log, e.g. 'Security.evtx'
+        """
+
+    @property
+    @abstractmethod
+    def key(self) -> str:
+        """
+        identifies the log, e.g. in the checkpoints of evtx2elasticsearch.py
+        """
+
+    @property
+    def path(self) -> Path:
+        return None
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        pass
+
+    @property
+    @abstractmethod
+    def spec(self) -> dict:
+        """
+        describes the source, so that it can be opened again by source_from_spec(), e.g. by another process
+        """
+
+    @abstractmethod
+    def records(self):
+        pass
+
+    def __str__(self):
+        return self.key
+
+
+class EvtxFileSource(RecordSource):
+    """
+    an evtx file on disk. Records which cannot be parsed are logged and skipped, their number is available as
+    errors afterwards
+    """
+    def __init__(self, path: Path):
+        self.__path = Path(path)
+        self.errors = 0
+
+    @property
+    def name(self) -> str:
+        return self.__path.name
+
+    @property
+    def key(self) -> str:
+        return str(self.__path.resolve())
+
+    @property
+    def path(self) -> Path:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        return self.__path.stat().st_size
+
+    @property
+    def spec(self) -> dict:
+        return {'type': 'evtx', 'path': str(self.__path.resolve())}
+
+    def records(self):
+        self.errors = 0
+        iterator = PyEvtxParser(str(self.__path)).records_json()
+        while True:
+            try:
+                record = next(iterator)
+            except StopIteration:
+                break
+            except RuntimeError as e:
+                logging.error("error while parsing {filename}: {error}".format(filename=str(self), error=str(e)))
+                self.errors += 1
+                continue
+            yield record
+
+    def __str__(self):
+        return str(self.__path)
+
+
+class JsonlFileSource(RecordSource):
+    def __init__(self, path: Path):
+        self.__path = Path(path)
+
+    @property
+    def name(self) -> str:
+        return self.__path.name
+
+    @property
+    def key(self) -> str:
+        return str(self.__path.resolve())
+
+    @property
+    def size(self) -> int:
+        return self.__path.stat().st_size
+
+    @property
+    def spec(self) -> dict:
+        return {'type': 'jsonl', 'path': str(self.__path.resolve())}
+
+    def records(self):
+        with open(self.__path, 'rb') as f:
+            yield from jsonl_records(f, str(self))
+
+    def __str__(self):
+        return str(self.__path)
+
+
+class ArchiveMemberSource(RecordSource):
+    """
+    an evtx or JSONL file inside of a zip or tar archive, which is read without extracting it to disk.
+    Members of compressed tar archives can only be found by decompressing the archive up to the member
+    """
+    def __init__(self, archive: Path, member: str, size: int):
+        self.__archive = Path(archive)
+        self.__member = member
+        self.__size = size
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.__member).name
+
+    @property
+    def key(self) -> str:
+        return str(self.__archive.resolve()) + ':' + self.__member
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def spec(self) -> dict:
+        return {'type': 'archive', 'path': str(self.__archive.resolve()), 'member': self.__member, 'size': self.__size}
+
+    def records(self):
+        if self.__archive.name.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(self.__archive) as archive, archive.open(self.__member) as stream:
+                yield from self.__read(stream)
+        else:
+            with tarfile.open(self.__archive, 'r:*') as archive:
+                stream = archive.extractfile(self.__member)
+                yield from self.__read(stream)
+
+    def __read(self, stream):
+        if self.name.lower().endswith(JSONL_SUFFIX):
+            yield from jsonl_records(stream, str(self))
+        else:
+            yield from read_chunk_stream(stream, str(self))
+
+    def __str__(self):
+        return str(self.__archive) + ':' + self.__member
+
+    @staticmethod
+    def members(archive: Path) -> list:
+        """
+        returns a source for every evtx or JSONL file in the archive
+        """
+        if archive.name.lower().endswith(ZIP_SUFFIXES):
+            with zipfile.ZipFile(archive) as f:
+                return [ArchiveMemberSource(archive, info.filename, info.file_size)
+                        for info in f.infolist() if not info.is_dir() and is_log(info.filename)]
+        with tarfile.open(archive, 'r:*') as f:
+            return [ArchiveMemberSource(archive, info.name, info.size)
+                    for info in f.getmembers() if info.isfile() and is_log(info.name)]
+
+
+def record_sources(path: Path) -> list:
+    """
+    returns the sources of all logs in a directory (evtx and JSONL files, not in subdirectories), in an archive,
+    or the source of a single evtx or JSONL file
+    """
+    path = Path(path)
+    if path.is_dir():
+        return [s for f in sorted(path.iterdir()) if f.is_file() and is_log(f.name) for s in record_sources(f)]
+    if is_archive(path):
+        return ArchiveMemberSource.members(path)
+    if path.name.lower().endswith(JSONL_SUFFIX):
+        return [JsonlFileSource(path)]
+    return [EvtxFileSource(path)]
+
+
+def source_from_spec(spec: dict) -> RecordSource:
+    if spec['type'] == 'archive':
+        return ArchiveMemberSource(Path(spec['path']), spec['member'], spec['size'])
+    if spec['type'] == 'jsonl':
+        return JsonlFileSource(Path(spec['path']))
+    return EvtxFileSource(Path(spec['path']))
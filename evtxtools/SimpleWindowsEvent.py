@@ -0,0 +1,152 @@
+import functools
+from datetime import datetime
+
+import orjson
+
+from evtxtools.Timestamp import parse_record_timestamp, parse_system_time
+
+
+def text(element):
+    """
+    the text of an element, which is a dict if the element also has attributes
+    """
+    return element.get('#text') if isinstance(element, dict) else element
+
+
+def attribute(element, name: str):
+    if isinstance(element, dict):
+        attributes = element.get('#attributes')
+        if isinstance(attributes, dict):
+            return attributes.get(name)
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def compile_path(path: str) -> tuple:
+    """
+    splits a path like '/System/Provider/@Name' into its steps, every path is split only once
+    """
+    return tuple(step for step in path.split(SimpleWindowsEvent.SEPARATOR) if step)
+
+
+class SimpleWindowsEvent:
+    """
+    the fields of the System element which are required by all exports are extracted directly, all other
+    values are only looked up when they are requested by their path, e.g. '/EventData/TargetUserName'
+    """
+    SEPARATOR = "/"
+    event_id: int
+    record_id: int
+    level: int
+    provider_name: str
+    provider_guid: str
+    process_id: int
+    thread_id: int
+    activity_id: str
+    related_activity_id: str
+    channel: str
+    computer: str
+    timestamp: datetime
+    timecreated: datetime
+    user: str
+    event_data: dict
+
+    def __init__(self, record: dict):
+        self.timestamp = parse_record_timestamp(record['timestamp'])
+
+        self.__data = record['data']
+        self.__record = orjson.loads(self.__data)
+        self.__event = self.__record['Event']
+        system = self.__event.get('System')
+        if not isinstance(system, dict):
+            system = dict()
+
+        provider = system.get('Provider')
+        execution = system.get('Execution')
+        correlation = system.get('Correlation')
+        self.event_id = self.safe_int(text(system.get('EventID')))
+        self.record_id = self.safe_int(text(system.get('EventRecordID')))
+        self.level = self.safe_int(text(system.get('Level')))
+        self.provider_name = str(attribute(provider, 'Name'))
+        self.provider_guid = str(attribute(provider, 'Guid'))
+        self.process_id = self.safe_int(attribute(execution, 'ProcessID'))
+        self.thread_id = self.safe_int(attribute(execution, 'ThreadID'))
+        self.activity_id = str(attribute(correlation, 'ActivityID'))
+        self.related_activity_id = str(attribute(correlation, 'RelatedActivityID'))
+        self.channel = str(text(system.get('Channel')))
+        self.computer = str(text(system.get('Computer')))
+        self.timecreated = self.get_time_created(attribute(system.get('TimeCreated'), 'SystemTime'))
+        self.user = str(attribute(system.get('Security'), 'UserID'))
+        self.event_data = self.__normalize_event_data(self.__event.get('EventData'))
+
+    @staticmethod
+    def __normalize_event_data(event_data):
+        """
+        returns a copy of the event data, where attributes are prefixed with '@' and all values are strings.
+        The record itself is not modified, so that paths are still resolved against the original values
+        """
+        if not event_data:
+            return event_data
+        items = [(key, value) for key, value in event_data.items() if key != '#attributes']
+        if '#attributes' in event_data:
+            items.extend(('@' + key, value) for key, value in event_data['#attributes'].items())
+        normalized = dict()
+        for key, value in items:
+            if isinstance(value, dict):
+                if '#text' in value:
+                    normalized[key] = str(value['#text'])
+                else:
+                    raise RuntimeError("invalid datatype")
+            else:
+                normalized[key] = str(value)
+        return normalized
+
+    @staticmethod
+    def safe_int(item):
+        return int(item) if item else None
+
+    @staticmethod
+    def get_time_created(timecreated):
+        return parse_system_time(timecreated)
+
+    def __resolve(self, path: str):
+        value = self.__event
+        for step in compile_path(path):
+            if not isinstance(value, dict):
+                raise KeyError(path)
+            if step[0] == '@':
+                value = value.get('#attributes')
+                if not isinstance(value, dict):
+                    raise KeyError(path)
+                step = step[1:]
+            value = value[step]
+        if isinstance(value, dict):
+            # elements with attributes only have a value if they contain text
+            return value['#text']
+        return value
+
+    def __getitem__(self, item) -> str:
+        return self.get_property(item, allow_none=True)
+
+    def get_property(self, path: str, allow_none=False) -> str:
+        if allow_none:
+            try:
+                return self.__resolve(path)
+            except KeyError:
+                return None
+        else:
+            return self.__resolve(path)
+
+    @property
+    def raw_json(self) -> str:
+        """
+        the record as it has been read from the log, without serializing it again
+        """
+        return self.__data if isinstance(self.__data, str) else self.__data.decode("UTF-8")
+
+    def to_json(self):
+        if not self.event_data:
+            return orjson.dumps(self.__record).decode("UTF-8")
+        # the event data is stored in its normalized form, like in the event_data field
+        event = dict(self.__event, EventData=self.event_data)
+        return orjson.dumps(dict(self.__record, Event=event)).decode("UTF-8")
@@ -0,0 +1,175 @@
+import bisect
+import contextlib
+import sys
+import threading
+import time
+from collections import deque
+
+import orjson
+
+
+class Statistics:
+    """
+    collects counters, timers, histograms and gauges of a run, and writes them as JSON.
+
+    Counters may be split by a key (e.g. the file name or the reason why a record was rejected), timers sum up
+    the duration of an activity, histograms count observed values in fixed buckets, and gauges (e.g. queue
+    depths) are callables which are sampled in regular intervals while the statistics are being reported.
+    """
+    # upper bounds of the histogram buckets, in milliseconds
+    BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000)
+    MAX_SAMPLES = 3600
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__start = time.monotonic()
+        self.__counters = dict()
+        self.__timers = dict()
+        self.__histograms = dict()
+        self.__gauges = dict()
+        self.__samples = dict()
+        self.__reporter = None
+        self.__stop = threading.Event()
+
+    @property
+    def enabled(self) -> bool:
+        return True
+
+    def count(self, name: str, value: int = 1, key: str = None):
+        with self.__lock:
+            if key is None:
+                self.__counters[name] = self.__counters.get(name, 0) + value
+            else:
+                counters = self.__counters.setdefault(name, dict())
+                counters[key] = counters.get(key, 0) + value
+
+    def add_time(self, name: str, seconds: float, count: int = 1):
+        with self.__lock:
+            timer = self.__timers.setdefault(name, {'seconds': 0.0, 'count': 0})
+            timer['seconds'] += seconds
+            timer['count'] += count
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def observe(self, name: str, milliseconds: float):
+        with self.__lock:
+            histogram = self.__histograms.get(name)
+            if histogram is None:
+                histogram = {'buckets': [0] * (len(self.BUCKETS) + 1), 'count': 0, 'sum': 0.0, 'max': 0.0}
+                self.__histograms[name] = histogram
+            histogram['buckets'][bisect.bisect_left(self.BUCKETS, milliseconds)] += 1
+            histogram['count'] += 1
+            histogram['sum'] += milliseconds
+            histogram['max'] = max(histogram['max'], milliseconds)
+
+    def add_gauge(self, name: str, gauge):
+        with self.__lock:
+            self.__gauges[name] = gauge
+            self.__samples.setdefault(name, deque(maxlen=self.MAX_SAMPLES))
+
+    def sample(self):
+        elapsed = round(time.monotonic() - self.__start, 3)
+        with self.__lock:
+            gauges = list(self.__gauges.items())
+        for name, gauge in gauges:
+            try:
+                value = gauge()
+            except Exception:
+                continue
+            with self.__lock:
+                self.__samples[name].append((elapsed, value))
+
+    def to_dict(self) -> dict:
+        with self.__lock:
+            return {
+                'elapsed_seconds': round(time.monotonic() - self.__start, 3),
+                'counters': orjson.loads(orjson.dumps(self.__counters)),
+                'timers': {name: dict(timer) for name, timer in self.__timers.items()},
+                'histograms': {
+                    name: {
+                        'buckets_ms': {('<=' + str(bound) if i < len(self.BUCKETS) else '>' + str(self.BUCKETS[-1])):
+                                       count
+                                       for i, (bound, count) in enumerate(zip(self.BUCKETS + (None,),
+                                                                              histogram['buckets']))
+                                       if count > 0},
+                        'count': histogram['count'],
+                        'mean_ms': histogram['sum'] / histogram['count'] if histogram['count'] > 0 else None,
+                        'max_ms': histogram['max'],
+                    } for name, histogram in self.__histograms.items()
+                },
+                'gauges': {name: list(samples) for name, samples in self.__samples.items()},
+            }
+
+    def write(self, stream=None):
+        stream = stream or sys.stderr
+        stream.write(orjson.dumps(self.to_dict()).decode('utf-8') + '\n')
+        stream.flush()
+
+    def start_reporting(self, interval: float = None, sample_interval: float = 1.0):
+        """
+        samples the gauges every sample_interval seconds, and writes the statistics every interval seconds
+        """
+        def report():
+            last_report = time.monotonic()
+            while not self.__stop.wait(sample_interval):
+                self.sample()
+                if interval and time.monotonic() - last_report >= interval:
+                    self.write()
+                    last_report = time.monotonic()
+
+        self.__reporter = threading.Thread(target=report, daemon=True)
+        self.__reporter.start()
+
+    def stop_reporting(self):
+        """
+        stops the periodic reports and writes the final statistics
+        """
+        if self.__reporter is not None:
+            self.__stop.set()
+            self.__reporter.join()
+            self.__reporter = None
+        self.sample()
+        self.write()
+
+
+class NoStatistics(Statistics):
+    """
+    used if no statistics have been requested, all methods do nothing
+    """
+    @property
+    def enabled(self) -> bool:
+        return False
+
+    def count(self, name: str, value: int = 1, key: str = None):
+        pass
+
+    def add_time(self, name: str, seconds: float, count: int = 1):
+        pass
+
+    @contextlib.contextmanager
+    def timer(self, name: str):
+        yield
+
+    def observe(self, name: str, milliseconds: float):
+        pass
+
+    def add_gauge(self, name: str, gauge):
+        pass
+
+    def sample(self):
+        pass
+
+    def start_reporting(self, interval: float = None, sample_interval: float = 1.0):
+        pass
+
+    def stop_reporting(self):
+        pass
+
+
+NO_STATISTICS = NoStatistics()
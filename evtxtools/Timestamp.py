@@ -0,0 +1,103 @@
+from datetime import datetime
+
+# the evtx parser formats record timestamps as '2020-11-23 08:00:18.596852 UTC' or '2020-11-23 08:00:18 UTC',
+# and SystemTime attributes as '2020-11-23T08:00:18.596852Z' or '2020-11-23T08:00:18Z'
+RECORD_TIMESTAMP_SUFFIX = ' UTC'
+SYSTEM_TIME_SUFFIX = 'Z'
+
+
+def _decode(timestamp: str, suffix: str) -> datetime:
+    value = timestamp[:-len(suffix)] if timestamp.endswith(suffix) else timestamp
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+
+    # fromisoformat only accepts fractions with 3 or 6 digits (before Python 3.11)
+    if len(value) < 19 or value[4] != '-' or value[7] != '-' or value[13] != ':' or value[16] != ':':
+        raise ValueError("invalid timestamp: '{timestamp}'".format(timestamp=timestamp))
+    if len(value) > 19:
+        if value[19] != '.' or not value[20:].isdigit():
+            raise ValueError("invalid timestamp: '{timestamp}'".format(timestamp=timestamp))
+        microsecond = int(value[20:26].ljust(6, '0'))
+    else:
+        microsecond = 0
+    return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                    int(value[11:13]), int(value[14:16]), int(value[17:19]), microsecond)
+
+
+def parse_record_timestamp(timestamp: str) -> datetime:
+    return _decode(timestamp, RECORD_TIMESTAMP_SUFFIX)
+
+
+def parse_system_time(timestamp: str) -> datetime:
+    return _decode(timestamp, SYSTEM_TIME_SUFFIX)
+
+
+def record_timestamp_key(timestamp: str) -> str:
+    """
+    converts a record timestamp into a string which sorts like the timestamp itself
+    """
+    if len(timestamp) == 30:
+        # 'YYYY-MM-DD HH:MM:SS.ffffff UTC'
+        return timestamp[:26]
+    if len(timestamp) == 23:
+        # 'YYYY-MM-DD HH:MM:SS UTC'
+        return timestamp[:19] + '.000000'
+    return parse_record_timestamp(timestamp).isoformat(sep=' ', timespec='microseconds')
+
+
+class TimeWindow:
+    """
+    compares record timestamps with the bounds of a time window, without converting them to datetime objects
+    """
+    def __init__(self, from_date: datetime = None, to_date: datetime = None):
+        self.__from_date = from_date
+        self.__to_date = to_date
+        self.__from_key = self.__key(from_date) if from_date else None
+        self.__to_key = self.__key(to_date) if to_date else None
+
+    @staticmethod
+    def __key(date: datetime) -> str:
+        return date.isoformat(sep=' ', timespec='microseconds')
+
+    @property
+    def from_date(self) -> datetime:
+        return self.__from_date
+
+    @property
+    def to_date(self) -> datetime:
+        return self.__to_date
+
+    def contains(self, timestamp: str) -> bool:
+        key = record_timestamp_key(timestamp)
+        if self.__from_key is not None and key < self.__from_key:
+            return False
+        if self.__to_key is not None and key > self.__to_key:
+            return False
+        return True
+
+    @property
+    def bounded(self) -> bool:
+        """
+        whether the window excludes any timestamps at all
+        """
+        return (self.__from_date is not None and self.__from_date > datetime.min) or \
+               (self.__to_date is not None and self.__to_date < datetime.max)
+
+    def overlaps(self, first: datetime, last: datetime) -> bool:
+        """
+        whether the time range from first to last contains any timestamp inside the window
+        """
+        if self.__from_date is not None and last < self.__from_date:
+            return False
+        if self.__to_date is not None and first > self.__to_date:
+            return False
+        return True
+
+    def contains_datetime(self, timestamp: datetime) -> bool:
+        if self.__from_date is not None and timestamp < self.__from_date:
+            return False
+        if self.__to_date is not None and timestamp > self.__to_date:
+            return False
+        return True
@@ -1,10 +1,14 @@
+import functools
+import sys
 import xml
 from datetime import datetime
 
 import orjson
 
-from evtxtools.EventDescriptor import EVENT_DESCRIPTORS, EventDescriptor
-from evtxtools.LogSource import LogSource
+from evtxtools.DescriptorRegistry import DESCRIPTORS
+from evtxtools.EventDescriptor import MISSING, EventDescriptor
+from evtxtools.RecordFilter import RecordFilter
+from evtxtools.Timestamp import parse_record_timestamp
 
 LOGON_TYPES = {
     0: "System",
@@ -20,24 +24,36 @@ LOGON_TYPES = {
 }
 
 
-class WindowsEvent:
-    class IgnoreThisEvent(Exception):
-        pass
+# fields which are accessed by Activity or EvtxParser, in addition to those used by the descriptions
+EXTRA_FIELDS = ('TargetUserSid', 'TargetUserName', 'WorkstationName', 'IpAddress')
+
+
+@functools.lru_cache(maxsize=None)
+def projected_fields(descriptor: EventDescriptor) -> tuple:
+    return descriptor.fields + tuple(f for f in EXTRA_FIELDS if f not in descriptor.fields)
 
-    def __init__(self, record: dict, included_event_ids: set, from_date: datetime, to_date: datetime):
-        timestamp = record['timestamp']
-        if timestamp[19] == '.':
-            self.__timestamp = datetime.strptime(record['timestamp'], "%Y-%m-%d %H:%M:%S.%f %Z")
-        else:
-            self.__timestamp = datetime.strptime(record['timestamp'], "%Y-%m-%d %H:%M:%S %Z")
 
+def intern_value(value):
+    return sys.intern(value) if isinstance(value, str) else value
 
-        if from_date and self.__timestamp < from_date:
-            raise WindowsEvent.IgnoreThisEvent()
 
-        if to_date and self.__timestamp > to_date:
-            raise WindowsEvent.IgnoreThisEvent()
+class WindowsEvent:
+    """
+    keeps only the event data fields which are required to display the event. The values are stored in
+    the order of projected_fields(descriptor), and strings are interned, because user names, domains and
+    addresses occur in many events
+    """
+    class IgnoreThisEvent(Exception):
+        """
+        the reason is one of the REJECTED_BY_* values of RecordFilter
+        """
+        def __init__(self, reason: str):
+            super().__init__(reason)
+            self.reason = reason
 
+    __slots__ = ('__event_id', '__timestamp', '__activity_id', '__descriptor', '__values')
+
+    def __init__(self, record: dict):
         record_data = orjson.loads(record['data'])
 
         self.__event_id = record_data['Event']['System']['EventID']
@@ -45,19 +61,19 @@ class WindowsEvent:
             self.__event_id = self.__event_id['#text']
         self.__event_id = int(self.__event_id)
 
-        if self.__event_id not in included_event_ids:
-            raise WindowsEvent.IgnoreThisEvent()
-
-        self.__descriptor = EVENT_DESCRIPTORS[self.__event_id]
-        if self.__descriptor.log_source != LogSource(record_data['Event']['System']['Channel']):
-            raise WindowsEvent.IgnoreThisEvent()
+        self.__descriptor = DESCRIPTORS.get(record_data['Event']['System']['Channel'], self.__event_id)
+        if self.__descriptor is None:
+            raise WindowsEvent.IgnoreThisEvent(RecordFilter.REJECTED_BY_CHANNEL
+                                               if DESCRIPTORS.describes(self.__event_id)
+                                               else RecordFilter.REJECTED_BY_EVENT_ID)
 
-        self.__event_data = record_data['Event']['EventData']
-        self.__beautify_event_data()
+        self.__timestamp = parse_record_timestamp(record['timestamp'])
+        self.__project(record_data['Event']['EventData'] or dict())
 
         try:
-            self.__activity_id = self.__get_correlation_id(record_data)\
-                                 or self.__timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")
+            # the logon id is shared by all events of a session, like the activity id of an unpickled event
+            self.__activity_id = intern_value(self.__get_correlation_id(record_data)
+                                              or self.__timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"))
         except TypeError:
             pass
         except KeyError:
@@ -65,9 +81,25 @@ class WindowsEvent:
         except AttributeError:
             pass
 
-    def __beautify_event_data(self):
-        if 'LogonType' in self.__event_data:
-            self.__event_data['LogonType'] = LOGON_TYPES[int(self.__event_data['LogonType'])]
+    def __project(self, event_data: dict):
+        values = list()
+        for field in projected_fields(self.__descriptor):
+            value = event_data.get(field, MISSING)
+            if field == 'LogonType' and value is not MISSING:
+                value = LOGON_TYPES[int(value)]
+            values.append(intern_value(value))
+        self.__values = tuple(values)
+
+    def __getstate__(self):
+        # the descriptor is looked up again instead of being copied, and the strings are interned again
+        return self.__event_id, self.__descriptor.channel, self.__timestamp, self.__activity_id, self.event_data
+
+    def __setstate__(self, state):
+        self.__event_id, channel, self.__timestamp, activity_id, event_data = state
+        self.__activity_id = intern_value(activity_id)
+        self.__descriptor = DESCRIPTORS.get(channel, self.__event_id)
+        self.__values = tuple(intern_value(event_data.get(field, MISSING))
+                              for field in projected_fields(self.__descriptor))
 
     def __get_correlation_id(self, record_data: dict) -> str:
         try:
@@ -98,7 +130,29 @@ class WindowsEvent:
 
     @property
     def event_data(self) -> dict:
-        return self.__event_data
+        """
+        the projected fields of the event data
+        """
+        return {field: value for field, value in zip(projected_fields(self.__descriptor), self.__values)
+                if value is not MISSING}
+
+    def get(self, field: str):
+        for name, value in zip(projected_fields(self.__descriptor), self.__values):
+            if name == field:
+                return value if value is not MISSING else None
+        return None
+
+    @property
+    def target_user_name(self):
+        return self.get('TargetUserName')
+
+    @property
+    def workstation_name(self):
+        return self.get('WorkstationName')
+
+    @property
+    def ip_address(self):
+        return self.get('IpAddress')
 
     @property
     def descriptor(self) -> EventDescriptor:
@@ -111,16 +165,12 @@ class WindowsEvent:
     #
     #    return self.__event_data.get(key)
 
-    class FriendlyDict(dict):
-        def __missing__(self, key):
-            return '-'
-
     def __str__(self):
-        return self.descriptor.description.format_map(WindowsEvent.FriendlyDict(self.event_data))
+        # the values start with the fields of the descriptor, in the order which is expected by its formatters
+        return self.__descriptor.formatter.format(self.__values)
 
     def latex_str(self):
-        data = dict()
-        for key, value in self.event_data.items():
-            data[key] = value.replace("\\", "\\\\").replace('"', '\\"') if isinstance(value, str) else value
-        res = self.descriptor.latex_description.format_map(WindowsEvent.FriendlyDict(data))
+        values = tuple(value.replace("\\", "\\\\").replace('"', '\\"') if isinstance(value, str) else value
+                       for value in self.__values)
+        res = self.__descriptor.latex_formatter.format(values)
         return res.replace("%", "\\%").replace("$", "\\$")
\ No newline at end of file
@@ -8,14 +8,41 @@ from datetime import datetime
 
 class readable_dir(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
-        prospective_dir=Path(values)
+        if isinstance(values, list):
+            setattr(namespace, self.dest, [self.check(v) for v in values])
+        else:
+            setattr(namespace, self.dest, self.check(values))
+
+    @staticmethod
+    def check(value) -> Path:
+        prospective_dir=Path(value)
         if not prospective_dir.is_dir():
             raise argparse.ArgumentTypeError("{0} is not a valid path".format(prospective_dir))
         if os.access(prospective_dir, os.R_OK):
-            setattr(namespace, self.dest, prospective_dir)
+            return prospective_dir
         else:
             raise argparse.ArgumentTypeError("{0} is not a readable dir".format(prospective_dir))
 
+class readable_logs(argparse.Action):
+    """
+    a directory, an archive, or a single evtx or JSONL file
+    """
+    def __call__(self, parser, namespace, values, option_string=None):
+        if isinstance(values, list):
+            setattr(namespace, self.dest, [self.check(v) for v in values])
+        else:
+            setattr(namespace, self.dest, self.check(values))
+
+    @staticmethod
+    def check(value) -> Path:
+        prospective_path = Path(value)
+        if not prospective_path.exists():
+            raise argparse.ArgumentTypeError("{0} is not a valid path".format(prospective_path))
+        if os.access(prospective_path, os.R_OK):
+            return prospective_path
+        else:
+            raise argparse.ArgumentTypeError("{0} is not readable".format(prospective_path))
+
 class creatable_file(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         prospective_file = Path(values)
@@ -26,12 +53,57 @@ class creatable_file(argparse.Action):
         else:
             raise argparse.ArgumentTypeError("{0} is not a writable dir".format(prospective_file.parent))
 
+class empty_dir(argparse.Action):
+    """
+    a directory which does not exist yet, or which is empty
+    """
+    def __call__(self, parser, namespace, values, option_string=None):
+        prospective_dir = Path(values)
+        if prospective_dir.exists():
+            if not prospective_dir.is_dir():
+                raise argparse.ArgumentTypeError("{0} is not a directory".format(prospective_dir))
+            if any(prospective_dir.iterdir()):
+                raise argparse.ArgumentTypeError("{0} is not empty".format(prospective_dir))
+        setattr(namespace, self.dest, prospective_dir)
+
+
+def add_json_field_argument(parser: argparse.ArgumentParser):
+    parser.add_argument('--json-field',
+                        dest='json_field',
+                        help="contents of the json field of every document: the whole record with the normalized "
+                             "event data (normalized), the record exactly as it has been read from the log, which "
+                             "is not serialized again (raw), or no json field at all (none) (default: normalized)",
+                        choices=('normalized', 'raw', 'none'),
+                        default='normalized')
+
+
+def add_statistics_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--stats',
+                        dest='stats',
+                        help='write counters and timers of the processing stages as JSON to stderr on exit',
+                        action='store_true')
+    parser.add_argument('--stats-interval',
+                        dest='stats_interval',
+                        help='with --stats, additionally write the statistics every STATS_INTERVAL seconds',
+                        type=float)
+
 
 def parse_logins_arguments():
     parser = argparse.ArgumentParser(description='analyse user sessions')
     parser.add_argument('logsdir',
-                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs',
+                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs, or a zip or '
+                             'tar archive which contains the logs. If several directories are given, every '
+                             'directory contains the logs of one host, which is named like the directory',
+                        nargs='*',
+                        action=readable_logs)
+    parser.add_argument('--case-root',
+                        dest='case_root',
+                        help='directory which contains a directory or an archive with the logs of every host',
                         action=readable_dir)
+    parser.add_argument('--host-workers',
+                        dest='host_workers',
+                        help='number of hosts which are parsed concurrently, defaults to the number of CPUs',
+                        type=int)
     parser.add_argument('--from',
                         dest='from_date',
                         help='timestamp pattern, where to start',
@@ -58,17 +130,86 @@ def parse_logins_arguments():
                         dest='hostname',
                         help='display this value as hostname',
                         type=str)
+    parser.add_argument('--workers',
+                        dest='workers',
+                        help='number of parallel workers, defaults to half the number of CPUs',
+                        type=int)
+    parser.add_argument('--processes',
+                        dest='use_processes',
+                        help='parse records in worker processes instead of threads',
+                        action='store_true')
+    parser.add_argument('--parallel-chunks',
+                        dest='parallel_chunks',
+                        help='split every file into ranges of chunks, which are read and parsed by worker processes',
+                        action='store_true')
+    parser.add_argument('--no-record-filter',
+                        dest='use_record_filter',
+                        help='fully decode every record instead of rejecting unwanted records early',
+                        action='store_false')
+    parser.add_argument('--batch-size',
+                        dest='batch_size',
+                        help='number of records which are handed over to a worker at once (default: 1000)',
+                        type=int,
+                        default=1000)
+    parser.add_argument('--queue-depth',
+                        dest='queue_depth',
+                        help='maximum number of batches waiting to be parsed, and of parsed batches waiting to be '
+                             'processed, defaults to twice the number of workers',
+                        type=int)
+    parser.add_argument('--stream',
+                        dest='stream',
+                        help='print every session as soon as it has ended, instead of printing all sessions '
+                             'ordered by their start at the end',
+                        action='store_true')
+    parser.add_argument('--idle-timeout',
+                        dest='idle_timeout',
+                        help='with --stream, a session without events for this number of minutes is considered '
+                             'to be ended (default: 1440)',
+                        type=int,
+                        default=1440)
+    parser.add_argument('--cache-dir',
+                        dest='cache_dir',
+                        help='cache the relevant records of every evtx file in this directory',
+                        type=Path)
+    parser.add_argument('--cache-size',
+                        dest='cache_size',
+                        help='maximum size of the cache in MiB (default: 1024)',
+                        type=int,
+                        default=1024)
+    parser.add_argument('--descriptors',
+                        dest='descriptors',
+                        metavar='PACK',
+                        help='also show the events described in this JSON or YAML file, or in the pack of this name '
+                             'which is shipped with evtxtools, e.g. kerberos. Can be given several times',
+                        action='append',
+                        default=[])
+    add_statistics_arguments(parser)
     args = parser.parse_args()
+    if len(args.logsdir) == 0 and args.case_root is None:
+        parser.error("either a logsdir or --case-root must be specified")
+    if len(args.logsdir) > 0 and args.case_root is not None:
+        parser.error("logsdir and --case-root cannot be combined")
+    if args.case_root is not None or len(args.logsdir) > 1:
+        if args.hostname is not None:
+            parser.error("with several hosts, every host is named like its directory, --hostname cannot be used")
+        if args.stream:
+            parser.error("--stream supports only a single logsdir")
     return args
 
 def parse_evtx2sqlite_arguments():
     parser = argparse.ArgumentParser(description='convert evtx files to sqlite database')
     parser.add_argument('logsdir',
-                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs',
-                        action=readable_dir)
+                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs, a zip or '
+                             'tar archive, or a single evtx or JSONL file',
+                        action=readable_logs)
     parser.add_argument('dbfile',
                         help="name of SQLite Database to be created",
                         action=creatable_file)
+    parser.add_argument('--workers',
+                        dest='workers',
+                        help='number of worker processes which parse and convert records, defaults to half the '
+                             'number of CPUs',
+                        type=int)
     args = parser.parse_args()
     return args
 
@@ -80,10 +221,171 @@ def parse_evtx2elasticsearch_arguments():
                         help='overrides an existing index, if it already exists',
                         action='store_true')
     parser.add_argument('logsdir',
-                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs',
-                        action=readable_dir)
+                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs, a zip or '
+                             'tar archive, or a single evtx or JSONL file. Several of them may be given',
+                        nargs='*',
+                        action=readable_logs)
     parser.add_argument('--index',
                         help="name of elasticsearch index",
                         type=str)
+    parser.add_argument('--buffer-size',
+                        dest='buffer_size',
+                        help="maximum size of parsed records held in memory per file, in MiB (default: 64)",
+                        type=int,
+                        default=64)
+    parser.add_argument('--host',
+                        dest='hosts',
+                        help="elasticsearch host, may be specified multiple times (default: localhost)",
+                        action='append')
+    parser.add_argument('--bulk-threads',
+                        dest='bulk_threads',
+                        help="number of concurrent bulk requests (default: 4)",
+                        type=int,
+                        default=4)
+    parser.add_argument('--chunk-size',
+                        dest='chunk_size',
+                        help="maximum number of documents per bulk request (default: 500)",
+                        type=int,
+                        default=500)
+    parser.add_argument('--max-chunk-bytes',
+                        dest='max_chunk_bytes',
+                        help="maximum size of a bulk request, in MiB (default: 10)",
+                        type=int,
+                        default=10)
+    parser.add_argument('--max-retries',
+                        dest='max_retries',
+                        help="number of retries of documents rejected with 429 (Too Many Requests), and of bulk "
+                             "requests which failed because of a connection error or a timeout (default: 8)",
+                        type=int,
+                        default=8)
+    parser.add_argument('--resume',
+                        dest='resume',
+                        help="add records to an existing index, skipping all records which have been indexed before",
+                        action='store_true')
+    parser.add_argument('--checkpoint-file',
+                        dest='checkpoint_file',
+                        help="file which stores the last indexed record of every evtx file "
+                             "(default: evtx2elasticsearch.checkpoints.json)",
+                        type=Path,
+                        default=Path('evtx2elasticsearch.checkpoints.json'))
+    parser.add_argument('--parse-workers',
+                        dest='parse_workers',
+                        help="number of worker processes which parse and convert ranges of chunks of every file "
+                             "concurrently (default: 0, records are parsed by a single thread)",
+                        type=int,
+                        default=0)
+    parser.add_argument('--dry-run',
+                        dest='dry_run',
+                        help="parse and convert all records without connecting to elasticsearch, "
+                             "e.g. to measure the throughput of the parser with --stats",
+                        action='store_true')
+    parser.add_argument('--bulk-load',
+                        dest='bulk_load',
+                        help="disable refreshes, replicas and the synchronous translog of the index while loading, "
+                             "the previous settings are restored afterwards",
+                        action='store_true')
+    parser.add_argument('--shards',
+                        dest='shards',
+                        help="number of primary shards of a new index (default: the default of the cluster)",
+                        type=int)
+    parser.add_argument('--replicas',
+                        dest='replicas',
+                        help="number of replicas of the index after loading (default: the number of replicas "
+                             "which the index had before)",
+                        type=int)
+    parser.add_argument('--force-merge',
+                        dest='force_merge',
+                        help="with --bulk-load, force merge the index into a single segment after loading",
+                        action='store_true')
+    add_json_field_argument(parser)
+    parser.add_argument('--random-ids',
+                        dest='random_ids',
+                        help="let elasticsearch assign random document ids, which is slightly faster. By default, "
+                             "the id of a document is derived from the computer, channel, EventRecordID and "
+                             "timestamp of its event, so that importing an event again replaces its document",
+                        action='store_true')
+    parser.add_argument('--dedup',
+                        dest='dedup',
+                        help="do not send events which have already been sent during this import, e.g. from "
+                             "repeated collections or shadow copies of the same log",
+                        action='store_true')
+    parser.add_argument('--dedup-capacity',
+                        dest='dedup_capacity',
+                        help="with --dedup, expected number of events, which determines the size of the filter "
+                             "of duplicates (default: estimated from the size of the logs)",
+                        type=int)
+    parser.add_argument('--queue',
+                        dest='queue',
+                        help="SQLite database with the jobs of a distributed import, e.g. on a shared path. With a "
+                             "logsdir, a job is added for every log, and the jobs are awaited (coordinator). "
+                             "With --worker, the jobs are imported",
+                        type=Path)
+    parser.add_argument('--worker',
+                        dest='worker',
+                        help="import the logs of the jobs in --queue, until all jobs have been done",
+                        action='store_true')
+    parser.add_argument('--lease',
+                        dest='lease',
+                        help="with --worker, number of seconds after which the job of a worker which does not "
+                             "respond anymore is imported by another worker (default: 300)",
+                        type=float,
+                        default=300.0)
+    parser.add_argument('--max-attempts',
+                        dest='max_attempts',
+                        help="with --queue, number of attempts to import a log before its job is considered "
+                             "to have failed (default: 3)",
+                        type=int,
+                        default=3)
+    add_statistics_arguments(parser)
+    args = parser.parse_args()
+    if args.force_merge and not args.bulk_load:
+        parser.error("--force-merge requires --bulk-load")
+    if args.worker:
+        if args.queue is None:
+            parser.error("--worker requires --queue")
+        if len(args.logsdir) > 0:
+            parser.error("a worker imports the logs of the job queue, no logsdir can be specified")
+    elif len(args.logsdir) == 0:
+        parser.error("a logsdir must be specified")
+    return args
+
+def parse_evtx2jsonl_arguments():
+    parser = argparse.ArgumentParser(description='export evtx files as newline delimited JSON')
+    parser.add_argument('logsdir',
+                        help='directory where logs are stored, e.g. %%windir%%\\System32\\winevt\\Logs, a zip or '
+                             'tar archive, or a single evtx or JSONL file',
+                        action=readable_logs)
+    parser.add_argument('outdir',
+                        help='directory where the JSONL files are written, it is created if it does not exist '
+                             'and must be empty otherwise',
+                        action=empty_dir)
+    parser.add_argument('--gzip',
+                        dest='gzip',
+                        help='compress the output files with gzip',
+                        action='store_true')
+    parser.add_argument('--compress-level',
+                        dest='compress_level',
+                        help='gzip compression level from 1 (fastest) to 9 (smallest) (default: 6)',
+                        type=int,
+                        choices=range(1, 10),
+                        metavar='COMPRESS_LEVEL',
+                        default=6)
+    parser.add_argument('--max-file-size',
+                        dest='max_file_size',
+                        help='start a new output file before a file exceeds this size, in MiB. The files of a log '
+                             'are numbered, e.g. Security-0001.jsonl',
+                        type=int)
+    parser.add_argument('--buffer-size',
+                        dest='buffer_size',
+                        help='size of the write buffer of every output file, in MiB (default: 8)',
+                        type=int,
+                        default=8)
+    parser.add_argument('--workers',
+                        dest='workers',
+                        help='number of worker processes which export files concurrently, '
+                             'defaults to half the number of CPUs',
+                        type=int)
+    add_json_field_argument(parser)
+    add_statistics_arguments(parser)
     args = parser.parse_args()
-    return args
\ No newline at end of file
+    return args
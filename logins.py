@@ -15,13 +15,26 @@ FOR A PARTICULAR PURPOSE. See the GNU General Public License for more details.
 You should have received a copy of the GNU General Public License along with
 this program. If not, see <http://www.gnu.org/licenses/>.
 """
+import logging
+import sys
+from datetime import timedelta
 
+from evtxtools.Case import Case
+from evtxtools.DescriptorRegistry import load_descriptor_packs
+from evtxtools.EventCache import EventCache
 from evtxtools.EvtxParser import EvtxParser
+from evtxtools.Statistics import NO_STATISTICS, Statistics
 import evtxtools
 
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
     args = evtxtools.parse_logins_arguments()
+    try:
+        load_descriptor_packs(args.descriptors)
+    except (OSError, ValueError) as e:
+        logging.error(str(e))
+        sys.exit(1)
     sid_filter = evtxtools.WellKnownSidFilter()
 
     if args.include_local_system:
@@ -29,15 +42,40 @@ def main():
     if args.include_anonymous:
         sid_filter.include_anonymous()
 
-    files_to_scan = list(filter(
-        lambda f: f.is_file(), map(
-            lambda sf: args.logsdir / sf,
-            EvtxParser.KNOWN_FILES
-        )
-    ))
-    evtx_parser = EvtxParser(files_to_scan, sid_filter, args.from_date, args.to_date)
-    evtx_parser.parse_events(hostname=args.hostname)
-    evtx_parser.print_logins(enable_latex=args.latex_output)
+    cache = EventCache(args.cache_dir, args.cache_size * 1024 * 1024) if args.cache_dir else None
+    statistics = Statistics() if args.stats else NO_STATISTICS
+    options = dict(workers=args.workers,
+                   use_processes=args.use_processes,
+                   use_record_filter=args.use_record_filter,
+                   cache=cache,
+                   parallel_chunks=args.parallel_chunks,
+                   batch_size=args.batch_size,
+                   queue_depth=args.queue_depth)
+    statistics.start_reporting(interval=args.stats_interval)
+    try:
+        if args.case_root is not None or len(args.logsdir) > 1:
+            hosts = Case.hosts_in_root(args.case_root) if args.case_root is not None \
+                else Case.hosts_in_directories(args.logsdir)
+            case = Case(hosts, sid_filter, args.from_date, args.to_date,
+                        host_workers=args.host_workers,
+                        statistics=statistics,
+                        **options)
+            case.parse_events()
+            case.print_logins(enable_latex=args.latex_output)
+        else:
+            files_to_scan = EvtxParser.known_files(args.logsdir[0])
+            evtx_parser = EvtxParser(files_to_scan, sid_filter, args.from_date, args.to_date,
+                                     statistics=statistics,
+                                     **options)
+            if args.stream:
+                evtx_parser.stream_logins(hostname=args.hostname,
+                                          enable_latex=args.latex_output,
+                                          idle_timeout=timedelta(minutes=args.idle_timeout))
+            else:
+                evtx_parser.parse_events(hostname=args.hostname)
+                evtx_parser.print_logins(enable_latex=args.latex_output)
+    finally:
+        statistics.stop_reporting()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,28 @@
+import pytest
+from elasticsearch import Elasticsearch
+
+from benchmarks import fixtures
+from tests.fake_elasticsearch import FakeElasticsearch
+
+# the number of records of security_log
+RECORDS = 300
+
+
+@pytest.fixture
+def fake_es():
+    with FakeElasticsearch() as fake:
+        yield fake
+
+
+@pytest.fixture
+def client(fake_es):
+    # the transport must not retry on its own, so that the retries of BulkIndexer can be observed
+    return Elasticsearch(hosts=[fake_es.host], max_retries=0, timeout=5)
+
+
+@pytest.fixture(scope='session')
+def security_log(tmp_path_factory):
+    """
+    a synthetic Security.evtx, see benchmarks/fixtures.py
+    """
+    return fixtures.security_log(RECORDS, tmp_path_factory.mktemp('logs'))
@@ -0,0 +1,35 @@
+"""
+builds WindowsEvents from records like those of PyEvtxParser.records_json(), without an evtx file
+"""
+from datetime import datetime
+
+import orjson
+
+from evtxtools.WindowsEvent import WindowsEvent
+
+
+def record(event_id: int, timestamp: datetime, channel: str = 'Security', record_id: int = 1, **event_data) -> dict:
+    data = {
+        'Event': {
+            'System': {
+                'EventID': event_id,
+                'EventRecordID': record_id,
+                'Channel': channel,
+                'Computer': 'WS01.corp.local',
+                'TimeCreated': {'#attributes': {'SystemTime': timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}},
+            },
+            'EventData': event_data or None
+        }
+    }
+    return {
+        'event_record_id': record_id,
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S.%f UTC'),
+        'data': orjson.dumps(data).decode('utf-8')
+    }
+
+
+def event(event_id: int, timestamp: datetime, logon_id: str = '0x1234', **event_data) -> WindowsEvent:
+    """
+    an event of the Security log, whose activity is the logon session logon_id
+    """
+    return WindowsEvent(record(event_id, timestamp, TargetLogonId=logon_id, **event_data))
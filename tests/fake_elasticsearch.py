@@ -0,0 +1,226 @@
+"""
+a fake elasticsearch server for the tests. It understands the requests which are sent by evtx2elasticsearch.py:
+creating, deleting and checking an index, its settings, refresh, force merge and bulk requests. The responses to
+the next bulk requests can be scripted, e.g. to reject them with 429 or to drop the connection
+"""
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import orjson
+
+OK = 'ok'
+# the whole bulk request is rejected with 429 Too Many Requests
+REJECT = 'reject'
+# every document of the bulk request is rejected with 429
+REJECT_ITEMS = 'reject items'
+# the connection is closed without a response
+DROP = 'drop'
+
+VERSION = {'version': {'number': '7.17.0', 'build_flavor': 'default'}, 'tagline': 'You Know, for Search'}
+DEFAULT_SETTINGS = {'index.number_of_shards': '1', 'index.number_of_replicas': '1'}
+
+
+class FakeIndex:
+    def __init__(self, settings: dict):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings)
+        self.documents = dict()
+        self.refreshes = 0
+        self.force_merges = 0
+
+
+def flatten(settings: dict, prefix: str = 'index.') -> dict:
+    flat = dict()
+    for key, value in settings.items():
+        if key == 'index':
+            flat.update(flatten(value, prefix))
+        elif isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + '.'))
+        else:
+            key = key if key.startswith('index.') else prefix + key
+            flat[key] = str(value) if value is not None else None
+    return flat
+
+
+def unflatten(settings: dict) -> dict:
+    nested = dict()
+    for key, value in settings.items():
+        *parents, name = key.split('.')
+        parent = nested
+        for part in parents:
+            parent = parent.setdefault(part, dict())
+        parent[name] = value
+    return nested
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def __respond(self, status: int, document=None):
+        body = orjson.dumps(document if document is not None else {})
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Elastic-Product', 'Elasticsearch')
+        self.send_header('Content-Length', str(len(body)) if self.command != 'HEAD' else '0')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def __request(self) -> tuple:
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length > 0 else b''
+        return [p for p in url.path.split('/') if p], parse_qs(url.query), body
+
+    def do_HEAD(self):
+        path, _, _ = self.__request()
+        self.__respond(200 if len(path) == 1 and path[0] in self.fake.indices else 404)
+
+    def do_GET(self):
+        path, query, _ = self.__request()
+        if len(path) == 0:
+            return self.__respond(200, VERSION)
+        index = self.fake.indices.get(path[0])
+        if index is None:
+            return self.__respond(404, {'error': {'type': 'index_not_found_exception'}, 'status': 404})
+        if len(path) == 2 and path[1] == '_settings':
+            settings = {k: v for k, v in index.settings.items() if v is not None}
+            if query.get('flat_settings') != ['true']:
+                settings = unflatten(settings)
+            return self.__respond(200, {path[0]: {'settings': settings}})
+        return self.__respond(404, {'error': 'unsupported request ' + self.path})
+
+    def do_DELETE(self):
+        path, _, _ = self.__request()
+        with self.fake.lock:
+            self.fake.indices.pop(path[0], None)
+        self.__respond(200, {'acknowledged': True})
+
+    def do_PUT(self):
+        path, _, body = self.__request()
+        document = orjson.loads(body) if body else {}
+        with self.fake.lock:
+            if len(path) == 1:
+                self.fake.indices[path[0]] = FakeIndex(flatten(document.get('settings', {})))
+                return self.__respond(200, {'acknowledged': True, 'index': path[0]})
+            index = self.fake.indices.get(path[0])
+            if index is None:
+                return self.__respond(404, {'error': {'type': 'index_not_found_exception'}, 'status': 404})
+            if path[1] == '_settings':
+                settings = flatten(document)
+                self.fake.settings_updates.append((path[0], settings))
+                for key, value in settings.items():
+                    if value is None:
+                        # null resets a setting to its default
+                        index.settings[key] = DEFAULT_SETTINGS.get(key)
+                    else:
+                        index.settings[key] = value
+                return self.__respond(200, {'acknowledged': True})
+            if path[1] in ('_mapping', '_mappings'):
+                return self.__respond(200, {'acknowledged': True})
+        return self.__respond(404, {'error': 'unsupported request ' + self.path})
+
+    def do_POST(self):
+        path, query, body = self.__request()
+        if path[-1] == '_bulk':
+            return self.__bulk(path[0] if len(path) == 2 else None, body)
+        index = self.fake.indices.get(path[0])
+        if index is None:
+            return self.__respond(404, {'error': {'type': 'index_not_found_exception'}, 'status': 404})
+        with self.fake.lock:
+            if path[1] == '_refresh':
+                index.refreshes += 1
+            elif path[1] == '_forcemerge':
+                index.force_merges += 1
+            else:
+                return self.__respond(404, {'error': 'unsupported request ' + self.path})
+        return self.__respond(200, {'_shards': {'total': 1, 'successful': 1, 'failed': 0}})
+
+    def __bulk(self, default_index: str, body: bytes):
+        with self.fake.lock:
+            behaviour = self.fake.bulk_responses.pop(0) if len(self.fake.bulk_responses) > 0 else OK
+            self.fake.bulk_requests.append((behaviour, body))
+        if self.fake.delay > 0:
+            time.sleep(self.fake.delay)
+        if behaviour == DROP:
+            self.close_connection = True
+            return
+        if behaviour == REJECT:
+            return self.__respond(429, {'error': {'type': 'es_rejected_execution_exception'}, 'status': 429})
+
+        lines = body.splitlines()
+        items = list()
+        with self.fake.lock:
+            for action_line, source in zip(lines[0::2], lines[1::2]):
+                action = orjson.loads(action_line)['index']
+                index_name = action.get('_index', default_index)
+                document_id = action.get('_id') or uuid.uuid4().hex
+                if behaviour == REJECT_ITEMS:
+                    items.append({'index': {'_index': index_name, '_id': document_id, 'status': 429,
+                                            'error': {'type': 'es_rejected_execution_exception'}}})
+                    continue
+                index = self.fake.indices.setdefault(index_name, FakeIndex(dict()))
+                created = document_id not in index.documents
+                index.documents[document_id] = orjson.loads(source)
+                items.append({'index': {'_index': index_name, '_id': document_id,
+                                        'result': 'created' if created else 'updated',
+                                        'status': 201 if created else 200}})
+        self.__respond(200, {'took': 1, 'errors': behaviour != OK, 'items': items})
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # clients which have timed out have closed the connection before the response
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeElasticsearch:
+    """
+    runs the fake server in a background thread of the test process, on a free port
+    """
+    def __init__(self, delay: float = 0.0):
+        self.lock = threading.Lock()
+        self.indices = dict()
+        # the behaviours of the next bulk requests, the following requests succeed
+        self.bulk_responses = list()
+        self.bulk_requests = list()
+        self.settings_updates = list()
+        self.delay = delay
+        self.__server = Server(('127.0.0.1', 0), Handler)
+        self.__server.fake = self
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+
+    @property
+    def host(self) -> str:
+        return "127.0.0.1:{port}".format(port=self.__server.server_address[1])
+
+    def documents(self, index: str) -> dict:
+        return self.indices[index].documents if index in self.indices else dict()
+
+    def bulk_sizes(self) -> list:
+        """
+        the number of documents in every bulk request
+        """
+        return [len(body.splitlines()) // 2 for _, body in self.bulk_requests]
+
+    def __enter__(self):
+        self.__thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -0,0 +1,78 @@
+import itertools
+from datetime import datetime, timedelta
+from operator import attrgetter
+
+from evtxtools.Activity import Activity
+from tests.events import event
+
+START = datetime(2020, 11, 23, 8, 0, 0)
+
+
+def at(minutes: float) -> datetime:
+    return START + timedelta(minutes=minutes)
+
+
+def session(logon_id: str = '0x1', offset: float = 0) -> list:
+    return [
+        event(4624, at(offset), logon_id, TargetUserName='alice', WorkstationName='WS02', IpAddress='10.0.0.2',
+              LogonType=3),
+        event(4648, at(offset + 1), logon_id, SubjectUserName='alice', TargetUserName='admin'),
+        event(4648, at(offset + 2), logon_id, SubjectUserName='alice', TargetUserName='admin'),
+        event(4647, at(offset + 10), logon_id),
+        event(4634, at(offset + 10), logon_id),
+    ]
+
+
+def activity(events: list, hostname: str = 'WS01') -> Activity:
+    result = Activity(hostname)
+    for e in events:
+        result.add_event(e)
+    return result
+
+
+def test_session():
+    a = activity(session())
+    assert a.activity_id == '0x1'
+    # simultaneous events are counted, not replaced
+    assert a.event_count == 5
+    assert a.logged_in and a.logged_out
+    assert a.login_timestamp == at(0)
+    assert a.logout_timestamp == at(10)
+    assert a.sort_key == at(0)
+    assert a.last_timestamp == at(10)
+    assert a.username == 'alice'
+    assert a.workstation_name == 'WS02'
+    assert a.ip_address == '10.0.0.2'
+    assert str(a) == "2020-11-23 08:00:00 {WS01}: Network login as -\\alice from WS02 (10.0.0.2) " \
+                     "(ended 2020-11-23 08:10:00 (0:10:00))"
+
+
+def test_order_of_the_events_does_not_matter():
+    # the events of an activity may come from several files, so they are not added in order
+    expected = activity(session())
+    for events in itertools.permutations(session()[:4]):
+        a = activity(events + (session()[4],))
+        assert (a.event_count, a.sort_key, a.last_timestamp, a.login_timestamp, a.logout_timestamp, str(a)) == \
+               (expected.event_count, expected.sort_key, expected.last_timestamp, expected.login_timestamp,
+                expected.logout_timestamp, str(expected))
+
+
+def test_activity_without_begin_and_end():
+    a = activity([event(4648, at(5), SubjectUserName='alice', ProcessName='runas.exe', TargetUserName='admin')],
+                 hostname=None)
+    assert not a.logged_in and not a.logged_out
+    assert a.login_time == Activity.UNKNOWN_TIME and a.logout_time == Activity.UNKNOWN_TIME
+    assert a.username == 'unknown user'
+    assert a.workstation_name == '-' and a.ip_address == '-'
+    assert str(a) == "2020-11-23 08:05:00: alice attempted to run runas.exe as admin"
+
+
+def test_activities_are_ordered_by_their_first_event():
+    late = activity(session('0x1', offset=30))
+    # the first event of this activity is not its login
+    early = activity(session('0x2', offset=0)[1:])
+    middle = activity(session('0x3', offset=5))
+    assert early < middle < late
+    assert activity(session('0x4', offset=5)) == middle
+    assert sorted([late, early, middle]) == sorted([late, early, middle], key=attrgetter('sort_key')) == \
+        [early, middle, late]
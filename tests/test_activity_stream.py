@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from evtxtools.ActivityStream import END_GRACE, ActivityStream
+from tests.events import event
+
+START = datetime(2020, 11, 23, 8, 0, 0)
+IDLE_TIMEOUT = timedelta(hours=1)
+
+
+def at(seconds: float) -> datetime:
+    return START + timedelta(seconds=seconds)
+
+
+def stream() -> ActivityStream:
+    return ActivityStream('WS01', IDLE_TIMEOUT)
+
+
+def test_idle_activities_expire():
+    activities = stream()
+    assert activities.add_event(event(4624, at(0), '0x1')) == []
+    assert activities.add_event(event(4624, at(60), '0x2')) == []
+    # the first session has been idle for longer than the timeout, the second one has not
+    closed = activities.add_event(event(4648, at(3601), '0x3'))
+    assert [activity.activity_id for activity in closed] == ['0x1']
+    assert activities.open_activities == 2
+
+
+def test_events_postpone_the_expiry():
+    activities = stream()
+    activities.add_event(event(4624, at(0), '0x1'))
+    activities.add_event(event(4648, at(1800), '0x1'))
+    assert activities.add_event(event(4648, at(3601), '0x2')) == []
+    closed = activities.add_event(event(4648, at(5401), '0x2'))
+    assert [activity.activity_id for activity in closed] == ['0x1']
+    assert closed[0].event_count == 2
+
+
+def test_end_event_closes_the_activity_after_the_grace():
+    activities = stream()
+    activities.add_event(event(4624, at(0), '0x1'))
+    assert activities.add_event(event(4647, at(10), '0x1')) == []
+    # the logoff of the same session which follows the user initiated logoff belongs to it
+    assert activities.add_event(event(4634, at(11), '0x1')) == []
+    assert activities.open_activities == 1
+    closed = activities.add_event(event(4648, at(10) + END_GRACE + timedelta(seconds=1), '0x2'))
+    assert len(closed) == 1
+    assert closed[0].logged_in and closed[0].logged_out
+    assert closed[0].event_count == 3
+    # the session ends with its last end event
+    assert closed[0].logout_timestamp == at(11)
+
+
+def test_events_after_the_grace_start_a_new_activity():
+    activities = stream()
+    activities.add_event(event(4624, at(0), '0x1'))
+    activities.add_event(event(4647, at(10), '0x1'))
+    closed = activities.add_event(event(4634, at(20), '0x1'))
+    assert [activity.event_count for activity in closed] == [2]
+    assert [activity.event_count for activity in activities.close_all()] == [1]
+
+
+def test_close_all_orders_by_the_first_event():
+    activities = stream()
+    activities.add_event(event(4624, at(0), '0x2'))
+    activities.add_event(event(4624, at(1), '0x1'))
+    activities.add_event(event(4647, at(2), '0x2'))
+    assert [activity.activity_id for activity in activities.close_all()] == ['0x2', '0x1']
+    assert activities.open_activities == 0
+    assert activities.scheduled_deadlines == 0
+
+
+def test_one_deadline_per_activity():
+    activities = stream()
+    for i in range(1000):
+        activities.add_event(event(4648, at(i), '0x%d' % (i % 10)))
+    assert activities.open_activities == 10
+    assert activities.scheduled_deadlines == 10
+    # the deadlines of the activities which had events since they were scheduled are pushed again
+    closed = activities.add_event(event(4648, at(4000), '0x0'))
+    assert closed == []
+    assert activities.scheduled_deadlines == 10
+    # the entry of an activity whose end event has moved its deadline is outdated
+    activities.add_event(event(4647, at(4001), '0x1'))
+    assert activities.scheduled_deadlines == 11
+    closed = activities.add_event(event(4648, at(4001) + END_GRACE + timedelta(seconds=1), '0x0'))
+    assert [activity.activity_id for activity in closed] == ['0x1']
+    assert activities.open_activities == 9
@@ -0,0 +1,31 @@
+import hashlib
+
+from evtxtools.BloomFilter import BloomFilter
+
+
+def digest(number: int) -> bytes:
+    return hashlib.blake2b(str(number).encode('utf-8'), digest_size=16).digest()
+
+
+def test_duplicates():
+    bloom_filter = BloomFilter(1000)
+    assert all(bloom_filter.add(digest(i)) for i in range(1000))
+    assert all(digest(i) in bloom_filter for i in range(1000))
+    assert not any(bloom_filter.add(digest(i)) for i in range(1000))
+    assert len(bloom_filter) == 1000
+
+
+def test_size():
+    # about 3.6 bytes per element with the default error rate
+    assert 3.5 * 100000 < BloomFilter(100000).size < 3.7 * 100000
+    assert BloomFilter(0).capacity == 1
+
+
+def test_error_rate():
+    capacity = 10000
+    bloom_filter = BloomFilter(capacity, error_rate=1e-2)
+    for i in range(capacity):
+        bloom_filter.add(digest(i))
+    false_positives = sum(1 for i in range(capacity, 11 * capacity) if digest(i) in bloom_filter)
+    # the expected number of false positives is 1000 for 100000 new elements
+    assert 700 < false_positives < 1300
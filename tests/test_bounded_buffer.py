@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+import evtx2elasticsearch
+from el.Checkpoints import Checkpoints, Watermark
+from evtxtools.BoundedBuffer import BoundedBuffer
+from evtxtools.RecordSource import EvtxFileSource
+from tests.conftest import RECORDS
+
+TIMEOUT = 10
+
+
+def producer(target, *args) -> threading.Thread:
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_put_blocks_while_the_buffer_is_full():
+    buffer = BoundedBuffer(max_size=10)
+    buffer.put('a', 6)
+    blocked = producer(buffer.put, 'b', 6)
+    blocked.join(0.2)
+    assert blocked.is_alive()
+    assert len(buffer) == 1 and buffer.size == 6
+
+    items = iter(buffer)
+    assert next(items) == 'a'
+    blocked.join(TIMEOUT)
+    assert not blocked.is_alive()
+    assert buffer.size == 6
+    buffer.close()
+    assert list(items) == ['b']
+    assert buffer.size == 0
+
+
+def test_large_item_is_accepted_by_an_empty_buffer():
+    buffer = BoundedBuffer(max_size=10)
+    buffer.put('large', 100)
+    assert buffer.size == 100
+    buffer.close()
+    assert list(buffer) == ['large']
+
+
+def test_consumer_waits_until_the_buffer_is_closed():
+    buffer = BoundedBuffer(max_size=10)
+    consumed = list()
+    consumer = producer(lambda: consumed.extend(buffer))
+    buffer.put(1, 1)
+    buffer.put(2, 1)
+    consumer.join(0.2)
+    assert consumer.is_alive()
+    buffer.close()
+    consumer.join(TIMEOUT)
+    assert consumed == [1, 2]
+
+
+def test_error_is_raised_after_the_buffered_items():
+    buffer = BoundedBuffer(max_size=10)
+    buffer.put(1, 1)
+    buffer.close(RuntimeError("parser failed"))
+    items = iter(buffer)
+    assert next(items) == 1
+    with pytest.raises(RuntimeError, match="parser failed"):
+        next(items)
+
+
+def test_abort_releases_a_blocked_producer():
+    buffer = BoundedBuffer(max_size=1)
+    buffer.put(1, 1)
+    errors = list()
+
+    def put():
+        try:
+            buffer.put(2, 1)
+        except BoundedBuffer.Aborted as e:
+            errors.append(e)
+    blocked = producer(put)
+    buffer.abort()
+    blocked.join(TIMEOUT)
+    assert len(errors) == 1
+    assert len(buffer) == 0 and buffer.size == 0
+    with pytest.raises(BoundedBuffer.Aborted):
+        buffer.put(3, 1)
+
+
+class FailingSource(EvtxFileSource):
+    """
+    raises an error after some records
+    """
+    def records(self):
+        for number, record in enumerate(super().records(), start=1):
+            if number > 10:
+                raise RuntimeError("invalid chunk")
+            yield record
+
+
+def read_through_buffer(source, tmp_path) -> list:
+    buffer = BoundedBuffer(max_size=4096)
+    watermark = Watermark(source, Checkpoints(tmp_path / 'checkpoints.json', 'evtx'))
+    reader = producer(evtx2elasticsearch.read_records, source, buffer, watermark)
+    try:
+        return [record['event_record_id'] for _, record in buffer]
+    finally:
+        reader.join(TIMEOUT)
+
+
+def test_end_of_the_records_closes_the_buffer(security_log, tmp_path):
+    # the buffer is much smaller than the log, so the reader is blocked many times
+    assert read_through_buffer(EvtxFileSource(security_log), tmp_path) == list(range(1, RECORDS + 1))
+
+
+def test_reader_error_is_raised_by_the_consumer(security_log, tmp_path):
+    with pytest.raises(RuntimeError, match="invalid chunk"):
+        read_through_buffer(FailingSource(security_log), tmp_path)
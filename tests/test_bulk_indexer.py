@@ -0,0 +1,103 @@
+import orjson
+import pytest
+from elasticsearch import Elasticsearch, TransportError
+
+from el.BulkIndexer import BulkIndexer
+from tests.fake_elasticsearch import DROP, REJECT, REJECT_ITEMS
+
+INDEX = 'evtx'
+
+
+def documents(count: int) -> list:
+    return [{'number': i, 'text': 'x' * 50} for i in range(count)]
+
+
+def indexer(client, **kwargs) -> BulkIndexer:
+    options = dict(threads=1, initial_backoff=0.01, max_backoff=0.05)
+    options.update(kwargs)
+    return BulkIndexer(client, INDEX, **options)
+
+
+def test_chunks_by_count(fake_es, client):
+    statistics = indexer(client, chunk_size=3).index(documents(10))
+    assert fake_es.bulk_sizes() == [3, 3, 3, 1]
+    assert statistics.documents == 10
+    assert statistics.requests == 4
+    assert len(fake_es.documents(INDEX)) == 10
+
+
+def test_chunks_by_bytes(fake_es, client):
+    docs = documents(10)
+    # a chunk is sent as soon as it has reached max_chunk_bytes, so every chunk holds two documents
+    line_size = len(BulkIndexer.ACTION) + len(orjson.dumps(docs[0])) + 1
+    statistics = indexer(client, chunk_size=100, max_chunk_bytes=2 * line_size - 1).index(docs)
+    assert fake_es.bulk_sizes() == [2, 2, 2, 2, 2]
+    assert statistics.documents == 10
+
+
+def test_acknowledged_tokens(fake_es, client):
+    acknowledged = list()
+    indexer(client, chunk_size=4).index(enumerate(documents(10)), on_acknowledged=acknowledged.extend)
+    assert sorted(acknowledged) == list(range(10))
+
+
+def test_document_ids(fake_es, client):
+    indexer(client).index([('a', {'n': 1}), ('b', {'n': 2}), ('a', {'n': 3})])
+    assert fake_es.documents(INDEX) == {'a': {'n': 3}, 'b': {'n': 2}}
+
+
+def test_retries_rejected_requests(fake_es, client):
+    fake_es.bulk_responses = [REJECT, REJECT]
+    statistics = indexer(client, chunk_size=5).index(documents(5))
+    assert [behaviour for behaviour, _ in fake_es.bulk_requests] == [REJECT, REJECT, 'ok']
+    assert statistics.documents == 5
+    assert statistics.retries == 10
+    assert len(fake_es.documents(INDEX)) == 5
+
+
+def test_retries_rejected_documents(fake_es, client):
+    fake_es.bulk_responses = [REJECT_ITEMS]
+    acknowledged = list()
+    statistics = indexer(client, chunk_size=5).index(enumerate(documents(5)), on_acknowledged=acknowledged.extend)
+    assert fake_es.bulk_sizes() == [5, 5]
+    assert statistics.documents == 5
+    assert statistics.retries == 5
+    assert statistics.failed == 0
+    assert sorted(acknowledged) == list(range(5))
+
+
+def test_retries_connection_errors(fake_es, client):
+    fake_es.bulk_responses = [DROP]
+    statistics = indexer(client, chunk_size=5).index(documents(5))
+    assert len(fake_es.bulk_requests) == 2
+    assert statistics.documents == 5
+    assert statistics.retries == 5
+
+
+def test_retries_timeouts(fake_es):
+    fake_es.delay = 0.5
+    client = Elasticsearch(hosts=[fake_es.host], max_retries=0, timeout=0.1)
+    with pytest.raises(TransportError):
+        indexer(client, max_retries=1).index(documents(5))
+    # the request which timed out has been sent again
+    assert len(fake_es.bulk_requests) == 2
+
+
+def test_max_retries_of_rejected_requests(fake_es, client):
+    fake_es.bulk_responses = [REJECT] * 10
+    with pytest.raises(TransportError) as e:
+        indexer(client, max_retries=3).index(documents(5))
+    assert e.value.status_code == 429
+    # the first attempt and three retries
+    assert len(fake_es.bulk_requests) == 4
+    assert len(fake_es.documents(INDEX)) == 0
+
+
+def test_max_retries_of_rejected_documents(fake_es, client):
+    fake_es.bulk_responses = [REJECT_ITEMS] * 10
+    acknowledged = list()
+    statistics = indexer(client, max_retries=2).index(enumerate(documents(5)), on_acknowledged=acknowledged.extend)
+    assert len(fake_es.bulk_requests) == 3
+    assert statistics.failed == 5
+    assert statistics.documents == 0
+    assert acknowledged == []
@@ -0,0 +1,77 @@
+import pytest
+
+import evtx2elasticsearch
+from el.BulkLoad import BulkLoad
+from evtxtools.RecordSource import EvtxFileSource
+from tests.conftest import RECORDS
+
+INDEX = 'evtx'
+LOAD_SETTINGS = {
+    'index.refresh_interval': '-1',
+    'index.number_of_replicas': '0',
+    'index.translog.durability': 'async',
+}
+
+
+@pytest.fixture
+def index(client):
+    client.indices.create(index=INDEX, settings={'refresh_interval': '5s', 'number_of_replicas': 2})
+    return INDEX
+
+
+def settings(fake_es) -> dict:
+    return {key: fake_es.indices[INDEX].settings.get(key) for key in LOAD_SETTINGS.keys()}
+
+
+def test_settings_are_changed_and_restored(fake_es, client, index):
+    with BulkLoad(client, index):
+        assert settings(fake_es) == LOAD_SETTINGS
+        assert fake_es.indices[INDEX].refreshes == 0
+    # the translog durability had not been set, so it is reset to its default
+    assert settings(fake_es) == {
+        'index.refresh_interval': '5s',
+        'index.number_of_replicas': '2',
+        'index.translog.durability': None,
+    }
+    assert fake_es.settings_updates[-1][1]['index.translog.durability'] is None
+    assert fake_es.indices[INDEX].refreshes == 1
+    assert fake_es.indices[INDEX].force_merges == 0
+
+
+def test_replicas_after_the_load(fake_es, client, index):
+    with BulkLoad(client, index, replicas=1):
+        assert settings(fake_es)['index.number_of_replicas'] == '0'
+    assert settings(fake_es)['index.number_of_replicas'] == '1'
+
+
+def test_force_merge(fake_es, client, index):
+    with BulkLoad(client, index, force_merge=True):
+        pass
+    assert fake_es.indices[INDEX].refreshes == 1
+    assert fake_es.indices[INDEX].force_merges == 1
+
+
+def test_settings_are_restored_when_the_load_fails(fake_es, client, index):
+    with pytest.raises(RuntimeError, match='load failed'):
+        with BulkLoad(client, index, force_merge=True):
+            raise RuntimeError('load failed')
+    assert settings(fake_es)['index.refresh_interval'] == '5s'
+    assert settings(fake_es)['index.number_of_replicas'] == '2'
+    # a failed load is neither refreshed nor merged
+    assert fake_es.indices[INDEX].refreshes == 0
+    assert fake_es.indices[INDEX].force_merges == 0
+
+
+def test_bulk_load_of_a_new_index(fake_es, security_log, tmp_path):
+    evtx2elasticsearch.evtx2elasticsearch([EvtxFileSource(security_log)], INDEX, override=False,
+                                          hosts=[fake_es.host], checkpoint_file=tmp_path / 'checkpoints.json',
+                                          bulk_load=True, shards=3, replicas=1, force_merge=True)
+    index = fake_es.indices[INDEX]
+    assert len(index.documents) == RECORDS
+    assert index.settings['index.number_of_shards'] == '3'
+    assert index.settings['index.number_of_replicas'] == '1'
+    assert index.settings['index.refresh_interval'] is None
+    updates = [update for name, update in fake_es.settings_updates if name == INDEX]
+    assert updates[0] == LOAD_SETTINGS
+    assert index.refreshes == 1
+    assert index.force_merges == 1
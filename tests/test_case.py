@@ -0,0 +1,65 @@
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.Case import Case
+from evtxtools.EvtxParser import EvtxParser
+from evtxtools.WellKnownSids import WellKnownSidFilter
+
+
+@pytest.fixture(scope='module')
+def case_root(tmp_path_factory):
+    """
+    a directory with the logs of WS01, an archive with the logs of WS02, and entries without logs
+    """
+    root = tmp_path_factory.mktemp('case')
+    (root / 'WS01').mkdir()
+    fixtures.write_evtx(root / 'WS01' / 'Security.evtx', fixtures.security_events(400, seed=1))
+    (root / 'WS01' / 'Setup.evtx').write_bytes((root / 'WS01' / 'Security.evtx').read_bytes())
+    logs = root / 'logs'
+    logs.mkdir()
+    fixtures.write_evtx(logs / 'Security.evtx', fixtures.security_events(300, seed=2))
+    with zipfile.ZipFile(root / 'WS02.zip', 'w') as archive:
+        archive.write(logs / 'Security.evtx', 'C/Windows/System32/winevt/Logs/Security.evtx')
+    (logs / 'Security.evtx').unlink()
+    (root / 'notes.txt').write_text('no logs')
+    return root
+
+
+def host_activities(hostname: str, files: list) -> list:
+    evtx_parser = EvtxParser(files, WellKnownSidFilter(), datetime.min, datetime.max, workers=1)
+    evtx_parser.parse_events(hostname=hostname, show_progress=False)
+    return evtx_parser.activities
+
+
+def test_hosts_in_root(case_root):
+    hosts = Case.hosts_in_root(case_root)
+    # the directory without known logs is not a host
+    assert list(hosts.keys()) == ['WS01', 'WS02']
+    assert [source.name for source in hosts['WS01']] == ['Security.evtx']
+    assert [source.name for source in hosts['WS02']] == ['Security.evtx']
+    assert hosts['WS02'][0].path is None
+
+
+def test_hosts_in_directories(case_root):
+    hosts = Case.hosts_in_directories([case_root / 'WS01', case_root / 'WS02.zip'])
+    assert list(hosts.keys()) == ['WS01', 'WS02']
+
+
+def test_timeline(case_root, capsys):
+    hosts = Case.hosts_in_root(case_root)
+    case = Case(hosts, WellKnownSidFilter(), datetime.min, datetime.max, host_workers=2, workers=1)
+    assert case.hosts == ['WS01', 'WS02']
+    case.parse_events()
+    capsys.readouterr()
+    case.print_logins()
+    lines = capsys.readouterr().out.splitlines()
+
+    # the activities of both hosts, ordered by their first event, and by the hostname if they start at once
+    activities = [(activity.sort_key, index, str(activity))
+                  for index, hostname in enumerate(case.hosts)
+                  for activity in host_activities(hostname, hosts[hostname])]
+    assert lines == [line for _, _, line in sorted(activities, key=lambda a: a[:2])]
+    assert {line.split(' {')[1].split('}')[0] for line in lines} == {'WS01', 'WS02'}
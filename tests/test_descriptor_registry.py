@@ -0,0 +1,141 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from evtxtools.ActivityChange import ActivityChange
+from evtxtools.DescriptorRegistry import DescriptorRegistry, resolve_pack
+from evtxtools.EventDescriptor import EVENT_DESCRIPTORS, MISSING, DescriptionFormatter
+from evtxtools.RecordFilter import RecordFilter
+from evtxtools.WindowsEvent import WindowsEvent, projected_fields
+from tests.events import record
+
+NOW = datetime(2020, 11, 23, 8, 0, 0)
+
+
+def write_pack(directory, descriptors: list, name: str = 'pack.json'):
+    path = directory / name
+    path.write_text(json.dumps({'descriptors': descriptors}))
+    return path
+
+
+class FriendlyDict(dict):
+    def __missing__(self, key):
+        return '-'
+
+
+def test_builtin_descriptors():
+    registry = DescriptorRegistry()
+    assert len(registry) == len(EVENT_DESCRIPTORS)
+    assert registry.get('Security', 4624) is EVENT_DESCRIPTORS[4624]
+    assert registry.get('System', 4624) is None
+    assert registry.describes(4624) and not registry.describes(4672)
+    assert registry.packs == ()
+
+
+def test_load_pack(tmp_path):
+    registry = DescriptorRegistry()
+    path = write_pack(tmp_path, [
+        {'event_id': 4768, 'channel': 'Security', 'description': 'TGT for {TargetUserName}'},
+        {'event_id': '1149', 'channel': 'Microsoft-Windows-TerminalServices-RemoteConnectionManager/Operational',
+         'activity_change': 'START_ACTIVITY', 'description': 'RDP login of {Param1}'},
+    ])
+    assert registry.load(path) == 2
+    assert registry.get('Security', 4768).activity_change == ActivityChange.NO_ACTIVITY
+    assert registry.get('Microsoft-Windows-TerminalServices-RemoteConnectionManager/Operational',
+                        1149).activity_change == ActivityChange.START_ACTIVITY
+    assert registry.packs == (str(path.resolve()),)
+    assert registry.pack_channels == ['Microsoft-Windows-TerminalServices-RemoteConnectionManager/Operational',
+                                      'Security']
+    assert {4768, 1149} <= registry.event_ids
+    # a pack is only loaded once
+    assert registry.load(path) == 0
+    assert len(registry) == len(EVENT_DESCRIPTORS) + 2
+
+
+def test_bundled_pack():
+    assert resolve_pack('kerberos').name == 'kerberos.json'
+    registry = DescriptorRegistry()
+    assert registry.load('kerberos') == 3
+    assert registry.get('Security', 4769) is not None
+    with pytest.raises(FileNotFoundError):
+        resolve_pack('no-such-pack')
+
+
+def test_yaml_pack(tmp_path):
+    pytest.importorskip('yaml')
+    path = tmp_path / 'pack.yaml'
+    path.write_text("descriptors:\n"
+                    "  - event_id: 4768\n"
+                    "    channel: Security\n"
+                    "    description: TGT for {TargetUserName}\n")
+    registry = DescriptorRegistry()
+    assert registry.load(path) == 1
+    assert registry.get('Security', 4768).description == 'TGT for {TargetUserName}'
+
+
+@pytest.mark.parametrize('descriptors,message', [
+    ([{'channel': 'Security', 'description': 'x'}], "descriptor 1: missing 'event_id'"),
+    ([{'event_id': 1, 'channel': 'Security'}], "descriptor 1: the description is missing"),
+    ([{'event_id': 1, 'channel': 'Security', 'description': 'x'},
+      {'event_id': 2, 'channel': 'Security', 'description': 'x', 'activity_change': 'LOGIN'}],
+     "descriptor 2: unknown activity_change 'LOGIN'"),
+    ([{'event_id': 1, 'channel': 'Security', 'description': '{a.b}'}], "descriptor 1: unsupported field 'a.b'"),
+    (['x'], "descriptor 1: expected an object"),
+])
+def test_invalid_pack(tmp_path, descriptors, message):
+    with pytest.raises(ValueError, match=message):
+        DescriptorRegistry().load(write_pack(tmp_path, descriptors))
+
+
+def test_collisions(tmp_path):
+    registry = DescriptorRegistry()
+    registry.load(write_pack(tmp_path, [
+        {'event_id': 4624, 'channel': 'Security', 'description': 'replaced login'},
+        {'event_id': 4624, 'channel': 'Application', 'description': 'same event id in another channel'},
+    ]))
+    # the descriptor of the same event in the same channel is replaced, the other channel is added
+    assert registry.get('Security', 4624).description == 'replaced login'
+    assert registry.get('Application', 4624).description == 'same event id in another channel'
+    assert len(registry) == len(EVENT_DESCRIPTORS) + 1
+    # a later pack replaces the descriptors of an earlier one
+    registry.load(write_pack(tmp_path, [{'event_id': 4624, 'channel': 'Security', 'description': 'again'}],
+                             'later.json'))
+    assert registry.get('Security', 4624).description == 'again'
+    assert registry.get('Application', 4624).description == 'same event id in another channel'
+
+
+def test_classification_reasons():
+    assert WindowsEvent(record(4624, NOW)).descriptor is EVENT_DESCRIPTORS[4624]
+    with pytest.raises(WindowsEvent.IgnoreThisEvent) as e:
+        WindowsEvent(record(4624, NOW, channel='Application'))
+    assert e.value.reason == RecordFilter.REJECTED_BY_CHANNEL
+    with pytest.raises(WindowsEvent.IgnoreThisEvent) as e:
+        WindowsEvent(record(4672, NOW))
+    assert e.value.reason == RecordFilter.REJECTED_BY_EVENT_ID
+
+
+def test_description_formatter():
+    fields = ('TargetUserName', 'IpAddress', 'LogonType')
+    assert DescriptionFormatter('{TargetUserName} from {IpAddress}', fields).format(('alice', '10.0.0.1', 3)) == \
+        'alice from 10.0.0.1'
+    assert DescriptionFormatter('{TargetUserName} from {IpAddress}', fields).format(('alice', MISSING, 3)) == \
+        'alice from -'
+    assert DescriptionFormatter('{{{TargetUserName}}}: {LogonType:>3} {IpAddress!r}', fields).format(
+        ('alice', '10.0.0.1', 3)) == "{alice}:   3 '10.0.0.1'"
+    assert DescriptionFormatter('no fields', fields).format(()) == 'no fields'
+    with pytest.raises(ValueError):
+        DescriptionFormatter('{WorkstationName}', fields)
+    with pytest.raises(ValueError):
+        DescriptionFormatter('{TargetUserName:{LogonType}}', fields)
+
+
+@pytest.mark.parametrize('event_id', sorted(EVENT_DESCRIPTORS.keys()))
+def test_formatter_is_like_format_map(event_id):
+    descriptor = EVENT_DESCRIPTORS[event_id]
+    fields = projected_fields(descriptor)
+    # every other field is missing
+    values = tuple(MISSING if i % 2 else 'v{i}'.format(i=i) for i in range(len(fields)))
+    event_data = FriendlyDict({field: value for field, value in zip(fields, values) if value is not MISSING})
+    assert descriptor.formatter.format(values) == descriptor.description.format_map(event_data)
+    assert descriptor.latex_formatter.format(values) == descriptor.latex_description.format_map(event_data)
@@ -0,0 +1,84 @@
+import orjson
+import pytest
+
+from benchmarks import fixtures
+from el import JSON_NONE, JSON_NORMALIZED, JSON_RAW, WindowsEvent, event_to_dict
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+
+FILENAME = 'Security.evtx'
+
+
+def dsl_event_to_dict(filename: str, swe: SimpleWindowsEvent) -> dict:
+    """
+    the document as it has been built through the WindowsEvent Document before event_to_dict() built it directly
+    """
+    event = WindowsEvent(
+        event={
+            'code': swe.event_id,
+            'created': swe.timecreated,
+            'provider': swe.provider_name,
+            'severity': swe.level
+        },
+        record_id=swe.record_id,
+        timestamp=swe.timestamp,
+        correlation={'activity_id': swe.activity_id, 'related_activity_id': swe.related_activity_id},
+        channel=swe.channel,
+        computer=swe.computer,
+        user={
+            'id': swe.user
+        },
+        execution={'process_id': swe.process_id, 'thread_id': swe.thread_id},
+        event_data=swe.event_data,
+        log={
+            'file': {
+                'path': filename
+            },
+            'level': swe.level
+        },
+        json=swe.to_json()
+    )
+    return event.to_dict()
+
+
+@pytest.fixture(scope='module')
+def records(security_log):
+    return fixtures.security_records(security_log)
+
+
+def test_same_documents_as_the_dsl(records):
+    for record in records:
+        swe = SimpleWindowsEvent(record)
+        expected = dsl_event_to_dict(FILENAME, swe)
+        document = event_to_dict(FILENAME, swe, json=JSON_NORMALIZED)
+        assert document == expected
+        assert orjson.dumps(document) == orjson.dumps(expected)
+
+
+def test_empty_values_are_dropped(records):
+    record = dict(records[0])
+    event = orjson.loads(record['data'])
+    del event['Event']['EventData']
+    record['data'] = orjson.dumps(event).decode('UTF-8')
+    swe = SimpleWindowsEvent(record)
+    document = event_to_dict(FILENAME, swe)
+    assert 'event_data' not in document
+    assert document == dsl_event_to_dict(FILENAME, swe)
+
+
+def test_raw_json_field(records):
+    for record in records:
+        swe = SimpleWindowsEvent(record)
+        document = event_to_dict(FILENAME, swe, json=JSON_RAW)
+        # the record is not serialized again
+        assert document['json'] == record['data']
+        assert orjson.loads(document['json']) == orjson.loads(record['data'])
+        normalized = event_to_dict(FILENAME, swe, json=JSON_NORMALIZED)
+        assert dict(document, json=None) == dict(normalized, json=None)
+
+
+def test_no_json_field(records):
+    for record in records:
+        swe = SimpleWindowsEvent(record)
+        document = event_to_dict(FILENAME, swe, json=JSON_NONE)
+        assert 'json' not in document
+        assert dict(document, json=swe.to_json()) == event_to_dict(FILENAME, swe, json=JSON_NORMALIZED)
@@ -0,0 +1,125 @@
+import os
+
+import pytest
+
+from evtxtools.EventCache import EventCache, decode_records, encode_records
+
+RECORDS = [
+    {'event_record_id': 1, 'timestamp': '2020-11-23 08:00:18.596852 UTC', 'data': '{\n  "Event": {"ä": 1}\n}'},
+    {'event_record_id': 2, 'timestamp': '2020-11-23 08:00:19.000000 UTC', 'data': '{}'},
+]
+
+
+def evtx_file(directory, content: bytes = b'x' * 200000):
+    path = directory / 'Security.evtx'
+    path.write_bytes(content)
+    return path
+
+
+REJECTED = {'event id': 5, 'channel': 1}
+ENTRY = (RECORDS, len(RECORDS) + 6, REJECTED)
+
+
+@pytest.fixture
+def no_content_hash(monkeypatch):
+    """
+    makes hashing the whole file fail
+    """
+    def content_hash(file):
+        raise AssertionError("the whole file has been hashed")
+    monkeypatch.setattr(EventCache, 'content_hash', staticmethod(content_hash))
+
+
+def modify(path, offset: int):
+    """
+    changes a byte of the file, but keeps its size and modification time
+    """
+    stat = path.stat()
+    content = bytearray(path.read_bytes())
+    content[offset] = ord('y')
+    path.write_bytes(bytes(content))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+
+def test_encode_records():
+    assert decode_records(encode_records(RECORDS)) == (RECORDS, len(RECORDS), {})
+    assert decode_records(encode_records([])) == ([], 0, {})
+    assert decode_records(encode_records(*ENTRY)) == ENTRY
+
+
+def test_load_stored_records(tmp_path):
+    cache = EventCache(tmp_path / 'cache', 1024 * 1024)
+    path = evtx_file(tmp_path)
+    assert cache.load(path, 'filter') is None
+    cache.store(path, 'filter', *ENTRY)
+    assert cache.load(path, 'filter') == ENTRY
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') == ENTRY
+    assert cache.load(path, 'another filter') is None
+
+
+def test_lookup_reads_only_the_headers(tmp_path, no_content_hash):
+    path = evtx_file(tmp_path)
+    cache = EventCache(tmp_path / 'cache', 1024 * 1024)
+    cache.store_chunk_index(path, [[4096, 1, 10, None, None]])
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load_chunk_index(path) == [[4096, 1, 10, None, None]]
+
+
+def test_loading_an_unchanged_file_does_not_hash_it(tmp_path, monkeypatch):
+    path = evtx_file(tmp_path)
+    EventCache(tmp_path / 'cache', 1024 * 1024).store(path, 'filter', *ENTRY)
+    monkeypatch.setattr(EventCache, 'content_hash', staticmethod(lambda file: pytest.fail("hashed " + str(file))))
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') == ENTRY
+
+
+def test_modified_chunk_header(tmp_path):
+    path = evtx_file(tmp_path)
+    EventCache(tmp_path / 'cache', 1024 * 1024).store(path, 'filter', RECORDS)
+    # the header of the second chunk, e.g. its checksum of the records
+    modify(path, 4096 + 65536 + 52)
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') is None
+
+
+def test_touched_file(tmp_path, monkeypatch):
+    path = evtx_file(tmp_path)
+    EventCache(tmp_path / 'cache', 1024 * 1024).store(path, 'filter', *ENTRY)
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10 ** 9))
+    hashed = list()
+    content_hash = EventCache.content_hash
+    monkeypatch.setattr(EventCache, 'content_hash',
+                        staticmethod(lambda file: hashed.append(file) or content_hash(file)))
+    # the modification time disagrees, but the contents have not changed
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') == ENTRY
+    assert hashed == [path]
+    # the entry has got the new modification time
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') == ENTRY
+    assert hashed == [path]
+
+
+def test_touched_and_modified_file(tmp_path):
+    path = evtx_file(tmp_path)
+    EventCache(tmp_path / 'cache', 1024 * 1024).store(path, 'filter', RECORDS)
+    # a change inside of a chunk, which is only found by hashing the whole file
+    modify(path, 100000)
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10 ** 9))
+    assert EventCache(tmp_path / 'cache', 1024 * 1024).load(path, 'filter') is None
+    # the chunk index is stored without the hash of the contents, so it is rebuilt instead
+    cache = EventCache(tmp_path / 'cache', 1024 * 1024)
+    cache.store_chunk_index(path, [])
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 10 ** 9))
+    assert cache.load_chunk_index(path) is None
+
+
+def test_invalid_entry(tmp_path):
+    cache = EventCache(tmp_path / 'cache', 1024 * 1024)
+    path = evtx_file(tmp_path)
+    cache.store(path, 'filter', RECORDS)
+    for entry in (tmp_path / 'cache').iterdir():
+        entry.write_bytes(b'invalid')
+    assert cache.load(path, 'filter') is None
+
+
+def test_eviction(tmp_path):
+    cache = EventCache(tmp_path / 'cache', 1)
+    path = evtx_file(tmp_path)
+    cache.store(path, 'filter', RECORDS)
+    assert cache.load(path, 'filter') is None
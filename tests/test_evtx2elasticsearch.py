@@ -0,0 +1,132 @@
+import orjson
+import pytest
+
+import evtx2elasticsearch
+from benchmarks import fixtures
+from el import JSON_NONE, JSON_RAW, document_digest
+from el.BulkIndexer import DryRunIndexer
+from el.Checkpoints import Checkpoints
+from evtxtools.EvtxFile import EvtxFile
+from evtxtools.RecordSource import EvtxFileSource
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+from evtxtools.Statistics import Statistics
+from tests.conftest import RECORDS
+
+INDEX = 'evtx'
+INVALID_RECORD = 5
+
+
+@pytest.fixture
+def invalid_record(monkeypatch):
+    """
+    makes the conversion of one record fail
+    """
+    event_to_dict = evtx2elasticsearch.event_to_dict
+
+    def failing_event_to_dict(filename, swe, *args, **kwargs):
+        if swe.record_id == INVALID_RECORD:
+            raise RuntimeError("invalid datatype")
+        return event_to_dict(filename, swe, *args, **kwargs)
+    monkeypatch.setattr(evtx2elasticsearch, 'event_to_dict', failing_event_to_dict)
+
+
+def test_conversion_errors_are_dropped(security_log, invalid_record, tmp_path):
+    checkpoints = Checkpoints(tmp_path / 'checkpoints.json', INDEX)
+    source = EvtxFileSource(security_log)
+    statistics = evtx2elasticsearch.index_source(source, INDEX, DryRunIndexer(), checkpoints)
+    assert statistics.documents == RECORDS - 1
+    # the watermark has passed the dropped record
+    assert checkpoints.get(source) == RECORDS
+
+
+def test_conversion_errors_are_dropped_by_workers(security_log, invalid_record):
+    chunks = EvtxFile(security_log).chunks
+    documents, records_read, skipped, errors, _ = evtx2elasticsearch.convert_chunk_range(
+        security_log, INDEX, chunks[0].offset, len(chunks), 0)
+    assert records_read == RECORDS
+    assert errors == 1
+    assert len(documents) == RECORDS - 1
+    assert INVALID_RECORD not in [record_id for record_id, _ in documents]
+
+
+def test_dry_run_of_several_files(security_log, tmp_path):
+    # the statistics of the import must not be replaced by the statistics of the first file
+    copy = tmp_path / 'Security-copy.evtx'
+    copy.write_bytes(security_log.read_bytes())
+    statistics = Statistics()
+    evtx2elasticsearch.evtx2elasticsearch([EvtxFileSource(security_log), EvtxFileSource(copy)], INDEX,
+                                          override=False, dry_run=True, statistics=statistics,
+                                          checkpoint_file=tmp_path / 'checkpoints.json')
+    counters = statistics.to_dict()['counters']
+    assert counters['documents indexed'] == 2 * RECORDS
+    assert counters['records read'] == {str(security_log): RECORDS, str(copy): RECORDS}
+
+
+def import_log(fake_es, security_log, tmp_path, index: str, **kwargs) -> dict:
+    evtx2elasticsearch.evtx2elasticsearch([EvtxFileSource(security_log)], index, override=False,
+                                          hosts=[fake_es.host], bulk_threads=1,
+                                          checkpoint_file=tmp_path / 'checkpoints.json', **kwargs)
+    return fake_es.documents(index)
+
+
+def test_documents_of_workers(fake_es, security_log, tmp_path):
+    documents = import_log(fake_es, security_log, tmp_path, 'in-process')
+    assert len(documents) == RECORDS
+    assert import_log(fake_es, security_log, tmp_path, 'workers', parse_workers=1) == documents
+
+
+def test_json_field(fake_es, security_log, tmp_path):
+    documents = import_log(fake_es, security_log, tmp_path, 'normalized')
+    without_json = import_log(fake_es, security_log, tmp_path, 'none', json_field=JSON_NONE)
+    assert without_json == {document_id: {k: v for k, v in document.items() if k != 'json'}
+                            for document_id, document in documents.items()}
+    raw = import_log(fake_es, security_log, tmp_path, 'raw', json_field=JSON_RAW)
+    assert raw.keys() == documents.keys()
+    for document_id, document in raw.items():
+        assert orjson.loads(document['json']) is not None
+        assert dict(document, json=None) == dict(documents[document_id], json=None)
+
+
+@pytest.fixture
+def copies(security_log, tmp_path) -> list:
+    """
+    the log and a copy of it from another collection
+    """
+    copy = tmp_path / 'collection2' / 'Security.evtx'
+    copy.parent.mkdir()
+    copy.write_bytes(security_log.read_bytes())
+    return [EvtxFileSource(security_log), EvtxFileSource(copy)]
+
+
+def test_document_ids(fake_es, copies, tmp_path):
+    evtx2elasticsearch.evtx2elasticsearch(copies, INDEX, override=False, hosts=[fake_es.host],
+                                          checkpoint_file=tmp_path / 'checkpoints.json')
+    documents = fake_es.documents(INDEX)
+    # the events of the copy have replaced the same documents
+    assert sum(fake_es.bulk_sizes()) == 2 * RECORDS
+    assert len(documents) == RECORDS
+    for record in fixtures.security_records(copies[0].path):
+        swe = SimpleWindowsEvent(record)
+        assert documents[document_digest(swe).hex()]['record_id'] == swe.record_id
+
+
+def test_random_ids(fake_es, copies, tmp_path):
+    evtx2elasticsearch.evtx2elasticsearch(copies, INDEX, override=False, hosts=[fake_es.host],
+                                          checkpoint_file=tmp_path / 'checkpoints.json', random_ids=True)
+    assert len(fake_es.documents(INDEX)) == 2 * RECORDS
+
+
+@pytest.mark.parametrize('parse_workers', [0, 1])
+def test_dedup(fake_es, copies, tmp_path, parse_workers):
+    statistics = Statistics()
+    checkpoint_file = tmp_path / 'checkpoints.json'
+    evtx2elasticsearch.evtx2elasticsearch(copies, INDEX, override=False, hosts=[fake_es.host],
+                                          checkpoint_file=checkpoint_file, statistics=statistics,
+                                          parse_workers=parse_workers, dedup=True)
+    # the events of the copy are not sent at all
+    assert sum(fake_es.bulk_sizes()) == RECORDS
+    assert len(fake_es.documents(INDEX)) == RECORDS
+    assert statistics.to_dict()['counters']['duplicates suppressed'] == {str(copies[0]): 0, str(copies[1]): RECORDS}
+    # suppressed duplicates count as indexed
+    checkpoints = Checkpoints(checkpoint_file, INDEX)
+    assert [checkpoints.get(source) for source in copies] == [RECORDS, RECORDS]
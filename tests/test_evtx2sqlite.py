@@ -0,0 +1,98 @@
+import sqlite3
+
+import orjson
+import pytest
+
+import db
+import evtx2sqlite
+from benchmarks import fixtures
+from evtxtools.RecordSource import EvtxFileSource, JsonlFileSource
+from tests.conftest import RECORDS
+
+
+@pytest.fixture
+def connection(tmp_path):
+    connection = evtx2sqlite.open_database(tmp_path / 'events.db')
+    yield connection
+    connection.close()
+
+
+@pytest.fixture(scope='module')
+def rows(security_log) -> list:
+    return evtx2sqlite.convert_records(fixtures.security_records(security_log))
+
+
+def count(connection: sqlite3.Connection, table: str) -> int:
+    return connection.execute("SELECT COUNT(*) FROM {table}".format(table=table)).fetchone()[0]
+
+
+def test_dimension_caches_ids(connection):
+    computers = evtx2sqlite.Dimension(connection, db.Computer.__table__, ['name'])
+    assert computers.id(('WS01',)) == 1
+    assert computers.id(('WS02',)) == 2
+    assert computers.id(('WS01',)) == 1
+    assert connection.execute("SELECT id, name FROM computer ORDER BY id").fetchall() == [(1, 'WS01'), (2, 'WS02')]
+
+
+def test_dimension_reads_existing_ids(connection):
+    providers = evtx2sqlite.Dimension(connection, db.Provider.__table__, ['name'], ['guid'])
+    providers.id(('Microsoft-Windows-Security-Auditing',), ('{54849625}',))
+    connection.commit()
+    providers = evtx2sqlite.Dimension(connection, db.Provider.__table__, ['name'], ['guid'])
+    assert providers.id(('Microsoft-Windows-Security-Auditing',), ('{54849625}',)) == 1
+    # new rows get the ids after the existing ones
+    assert providers.id(('Microsoft-Windows-Eventlog',), ('{fc65ddd8}',)) == 2
+    assert count(connection, 'provider') == 2
+
+
+def test_loader_writes_events_and_event_data(connection, rows):
+    loader = evtx2sqlite.SqliteLoader(connection)
+    for row in rows:
+        loader.add(row)
+    assert loader.events_written == 0
+    loader.flush()
+    assert loader.events_written == RECORDS
+    assert count(connection, 'event') == RECORDS
+    assert count(connection, 'event_data') == sum(len(row[-1]) for row in rows)
+    assert count(connection, 'computer') == 1
+    assert count(connection, 'channel') == 1
+    record_ids = [row[0] for row in connection.execute("SELECT recordid FROM event ORDER BY id")]
+    assert record_ids == [row[4] for row in rows]
+
+
+def test_loader_commits_full_transactions(connection, rows):
+    loader = evtx2sqlite.SqliteLoader(connection, transaction_size=100)
+    for row in rows[:250]:
+        loader.add(row)
+    assert loader.events_written == 200
+    loader.flush()
+    # a second loader continues with the ids of the first one
+    loader = evtx2sqlite.SqliteLoader(connection)
+    for row in rows[250:]:
+        loader.add(row)
+    loader.flush()
+    assert connection.execute("SELECT MIN(id), MAX(id), COUNT(*) FROM event").fetchone() == (1, RECORDS, RECORDS)
+
+
+def load(sources: list, dbfile, **kwargs) -> list:
+    evtx2sqlite.evtx2sqlite(sources, dbfile, **kwargs)
+    connection = sqlite3.connect(str(dbfile))
+    try:
+        return connection.execute(
+            "SELECT e.recordid, e.event_id, e.timecreated, c.name, d.key, d.value FROM event e "
+            "JOIN computer c ON c.id = e.computer_id LEFT JOIN event_data d ON d.eventid = e.id "
+            "ORDER BY e.recordid, d.key").fetchall()
+    finally:
+        connection.close()
+
+
+def test_evtx2sqlite(security_log, tmp_path):
+    rows = load([EvtxFileSource(security_log)], tmp_path / 'evtx.db', workers=1)
+    assert len({row[0] for row in rows}) == RECORDS
+
+    # JSONL files are read by the main process, and must give the same rows as the chunks parsed by the workers
+    jsonl = tmp_path / 'Security.jsonl'
+    with open(jsonl, 'wb') as f:
+        for record in fixtures.security_records(security_log):
+            f.write(orjson.dumps(record) + b'\n')
+    assert load([JsonlFileSource(jsonl)], tmp_path / 'jsonl.db', workers=1) == rows
@@ -0,0 +1,56 @@
+import io
+from datetime import timedelta
+
+from benchmarks import fixtures
+from evtxtools import EvtxFile as evtx_file_module
+from evtxtools.EvtxFile import CHUNK_SIZE, EvtxFile, filetime_to_datetime
+from evtxtools.Timestamp import TimeWindow
+from tests.conftest import RECORDS
+
+FROM_DATE = fixtures.START + timedelta(hours=1)
+TO_DATE = fixtures.START + timedelta(hours=2)
+
+
+class CountingFile(io.FileIO):
+    """
+    counts the bytes which have been read
+    """
+    read_bytes = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        CountingFile.read_bytes += len(data)
+        return data
+
+
+def test_chunk_timestamps(security_log):
+    events = {event['record_id']: event for event in fixtures.security_events(RECORDS)}
+    chunks = EvtxFile(security_log, read_timestamps=True).chunks
+    assert len(chunks) > 1
+    assert chunks[0].first_record_id == 1
+    assert chunks[-1].last_record_id == RECORDS
+    for chunk in chunks:
+        assert filetime_to_datetime(chunk.first_timestamp) == events[chunk.first_record_id]['timestamp']
+        assert filetime_to_datetime(chunk.last_timestamp) == events[chunk.last_record_id]['timestamp']
+
+
+def test_index_reads_only_the_headers(security_log, monkeypatch):
+    monkeypatch.setattr(evtx_file_module, 'open', CountingFile, raising=False)
+    CountingFile.read_bytes = 0
+    chunks = EvtxFile(security_log, read_timestamps=True).chunks
+    # the chunk header, and the headers of the first and the last record
+    assert CountingFile.read_bytes <= 8 + len(chunks) * (512 + 2 * 24)
+    assert all(chunk.first_timestamp is not None for chunk in chunks)
+
+
+def test_chunks_in_window(security_log):
+    window = TimeWindow(FROM_DATE, TO_DATE)
+    evtx_file = EvtxFile(security_log, read_timestamps=True)
+    chunks = evtx_file.chunks_in_window(window)
+    assert 0 < len(chunks) < len(evtx_file.chunks)
+    cached = EvtxFile.from_index(security_log, evtx_file.index).chunks_in_window(window)
+    assert [chunk.to_tuple() for chunk in cached] == [chunk.to_tuple() for chunk in chunks]
+    # the chunks are adjacent, the first one starts before and the last one ends after the window
+    assert [chunk.offset for chunk in chunks] == list(range(chunks[0].offset, chunks[-1].offset + 1, CHUNK_SIZE))
+    assert filetime_to_datetime(chunks[0].first_timestamp) < FROM_DATE
+    assert filetime_to_datetime(chunks[-1].last_timestamp) > TO_DATE
@@ -0,0 +1,176 @@
+"""
+end-to-end tests of the distributed import: the coordinator and the workers are started as separate processes
+with the command line of evtx2elasticsearch.py, and import into the fake elasticsearch server of the test process
+"""
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import orjson
+import pytest
+
+from benchmarks import fixtures
+from el.JobQueue import DONE, FAILED
+from tests.fake_elasticsearch import FakeElasticsearch, REJECT
+
+INDEX = 'evtx'
+SCRIPT = Path(__file__).parent.parent / 'evtx2elasticsearch.py'
+LARGE_RECORDS = 3000
+SMALL_RECORDS = 300
+LEASE = 1.5
+TIMEOUT = 120
+
+
+@pytest.fixture(scope='module')
+def logs(tmp_path_factory) -> Path:
+    """
+    a large and a small log, whose events are different
+    """
+    directory = tmp_path_factory.mktemp('logs')
+    fixtures.write_evtx(directory / 'Security.evtx', fixtures.security_events(LARGE_RECORDS))
+    fixtures.write_evtx(directory / 'Small.evtx', fixtures.security_events(SMALL_RECORDS, seed=2))
+    return directory
+
+
+@pytest.fixture
+def slow_es():
+    # every bulk request takes a while, so that a worker can be killed in the middle of a log
+    with FakeElasticsearch(delay=0.1) as fake:
+        yield fake
+
+
+def start(fake_es, queue: Path, *args) -> subprocess.Popen:
+    command = [sys.executable, str(SCRIPT), '--queue', str(queue), '--host', fake_es.host, '--index', INDEX,
+               '--lease', str(LEASE), '--chunk-size', '50', '--bulk-threads', '1'] + [str(arg) for arg in args]
+    return subprocess.Popen(command, cwd=queue.parent, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True)
+
+
+def jobs(queue: Path) -> dict:
+    """
+    the jobs by the names of their logs, or no jobs if the coordinator has not created the queue yet
+    """
+    # the processes may hold the write lock for a while on a busy machine
+    connection = sqlite3.connect(str(queue), timeout=60)
+    try:
+        rows = connection.execute("SELECT source, state, worker, attempts, checkpoint, error FROM jobs").fetchall()
+    except sqlite3.OperationalError as e:
+        if 'no such table' not in str(e):
+            raise
+        rows = list()
+    finally:
+        connection.close()
+    return {Path(source).name: dict(state=state, worker=worker, attempts=attempts, checkpoint=checkpoint,
+                                    error=error)
+            for source, state, worker, attempts, checkpoint, error in rows}
+
+
+def wait_for(condition, timeout: float = TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.1)
+
+
+def finish(process: subprocess.Popen) -> tuple:
+    output, _ = process.communicate(timeout=TIMEOUT)
+    return process.returncode, output
+
+
+def sent_record_ids(fake_es, requests: list, filename: str) -> list:
+    """
+    the EventRecordIDs of the documents of a log which have been sent by the bulk requests
+    """
+    record_ids = list()
+    for _, body in requests:
+        for source in body.splitlines()[1::2]:
+            document = orjson.loads(source)
+            if document['log']['file']['path'] == filename:
+                record_ids.append(document['record_id'])
+    return record_ids
+
+
+def test_crashed_worker(slow_es, logs, tmp_path):
+    queue = tmp_path / 'jobs.db'
+    coordinator = start(slow_es, queue, logs)
+    wait_for(lambda: queue.exists() and len(jobs(queue)) == 2)
+    workers = {process.pid: process for process in (start(slow_es, queue, '--worker'),
+                                                    start(slow_es, queue, '--worker'))}
+    try:
+        # the large log is claimed first, its worker is killed after it has stored a checkpoint
+        wait_for(lambda: jobs(queue)['Security.evtx']['checkpoint'] > 0
+                 and jobs(queue)['Small.evtx']['state'] == DONE)
+        crashed = jobs(queue)['Security.evtx']['worker']
+        crashed_pid = int(crashed.rsplit(':', 1)[1])
+        workers[crashed_pid].send_signal(signal.SIGKILL)
+        workers[crashed_pid].wait()
+        sent_before_crash = len(slow_es.bulk_requests)
+        checkpoint = jobs(queue)['Security.evtx']['checkpoint']
+        assert checkpoint < LARGE_RECORDS
+
+        # the other worker claims the job after the lease has expired, and resumes at the checkpoint
+        returncode, output = finish(coordinator)
+        assert returncode == 0, output
+        for pid, worker in workers.items():
+            if pid != crashed_pid:
+                returncode, output = finish(worker)
+                assert returncode == 0, output
+                assert "importing {log} (attempt 2)".format(log=logs / 'Security.evtx') in output
+    finally:
+        for worker in list(workers.values()) + [coordinator]:
+            if worker.poll() is None:
+                worker.kill()
+                worker.wait()
+
+    job = jobs(queue)['Security.evtx']
+    assert job['state'] == DONE
+    assert job['attempts'] == 2
+    assert job['worker'] != crashed
+    assert job['checkpoint'] == LARGE_RECORDS
+    resumed = sent_record_ids(slow_es, slow_es.bulk_requests[sent_before_crash:], 'Security.evtx')
+    assert min(resumed) == checkpoint + 1
+    assert sorted(resumed) == list(range(checkpoint + 1, LARGE_RECORDS + 1))
+    assert len(slow_es.documents(INDEX)) == LARGE_RECORDS + SMALL_RECORDS
+
+
+def test_max_attempts(fake_es, logs, tmp_path):
+    queue = tmp_path / 'jobs.db'
+    # the first bulk request is rejected, and the worker does not retry it
+    fake_es.bulk_responses = [REJECT]
+    coordinator = start(fake_es, queue, '--max-attempts', 1, logs)
+    wait_for(lambda: queue.exists() and len(jobs(queue)) == 2)
+    worker = start(fake_es, queue, '--worker', '--max-retries', 0, '--max-attempts', 1)
+    try:
+        returncode, output = finish(worker)
+        assert returncode == 0, output
+        returncode, output = finish(coordinator)
+    finally:
+        for process in (worker, coordinator):
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+    assert returncode == 1
+    assert "{log}: TransportError(429".format(log=logs / 'Security.evtx') in output
+    assert "1 logs have been imported, 1 logs have failed" in output
+    assert jobs(queue)['Security.evtx']['state'] == FAILED
+    assert jobs(queue)['Small.evtx']['state'] == DONE
+
+    # --resume retries the failed jobs
+    coordinator = start(fake_es, queue, '--resume', logs)
+    try:
+        # a worker which started before would find no jobs to import
+        wait_for(lambda: jobs(queue)['Security.evtx']['state'] != FAILED)
+        worker = start(fake_es, queue, '--worker')
+        assert finish(worker)[0] == 0
+        returncode, output = finish(coordinator)
+    finally:
+        for process in (worker, coordinator):
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+    assert returncode == 0, output
+    assert jobs(queue)['Security.evtx']['state'] == DONE
+    assert len(fake_es.documents(INDEX)) == LARGE_RECORDS + SMALL_RECORDS
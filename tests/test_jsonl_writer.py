@@ -0,0 +1,82 @@
+import gzip
+import random
+
+import orjson
+import pytest
+
+import evtx2jsonl
+from evtxtools.JsonlWriter import JsonlWriter
+from evtxtools.RecordSource import EvtxFileSource
+from tests.conftest import RECORDS
+
+MAX_FILE_SIZE = 4096
+
+
+@pytest.fixture(scope='module')
+def lines() -> list:
+    rnd = random.Random(1)
+    return [orjson.dumps({'record_id': i, 'data': rnd.randbytes(rnd.randint(0, 150)).hex()}, option=orjson.OPT_APPEND_NEWLINE)
+            for i in range(1000)]
+
+
+def write(lines: list, directory, **kwargs) -> JsonlWriter:
+    with JsonlWriter(directory, 'Security', **kwargs) as writer:
+        for line in lines:
+            writer.write(line)
+    return writer
+
+
+def read(path) -> bytes:
+    if path.name.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return f.read()
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_single_file(lines, tmp_path, compress):
+    writer = write(lines, tmp_path, compress=compress, buffer_size=1000)
+    assert writer.files == [tmp_path / JsonlWriter.file_name('Security', compress)]
+    assert read(writer.files[0]) == b''.join(lines)
+    assert writer.lines_written == len(lines)
+    assert writer.bytes_written == sum(len(line) for line in lines)
+
+
+def test_no_lines_no_file(tmp_path):
+    assert write([], tmp_path).files == []
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize('buffer_size', [100, MAX_FILE_SIZE, 1024 * 1024])
+def test_rotation(lines, tmp_path, buffer_size):
+    writer = write(lines, tmp_path, max_file_size=MAX_FILE_SIZE, buffer_size=buffer_size)
+    assert len(writer.files) > 1
+    assert [f.name for f in writer.files] == ['Security-%04d.jsonl' % n for n in range(1, len(writer.files) + 1)]
+    # every file ends with a complete line and none exceeds the maximum size
+    for path in writer.files:
+        data = path.read_bytes()
+        assert len(data) <= MAX_FILE_SIZE
+        assert data.endswith(b'\n')
+    assert b''.join(path.read_bytes() for path in writer.files) == b''.join(lines)
+
+
+def test_rotation_of_compressed_files(lines, tmp_path):
+    writer = write(lines, tmp_path, compress=True, max_file_size=MAX_FILE_SIZE, buffer_size=8192)
+    assert len(writer.files) > 1
+    assert [f.name for f in writer.files] == ['Security-%04d.jsonl.gz' % n for n in range(1, len(writer.files) + 1)]
+    # every file is a complete gzip stream, a new one is only started after it has reached the maximum size
+    for path in writer.files[:-1]:
+        assert path.stat().st_size >= MAX_FILE_SIZE
+    assert b''.join(read(path) for path in writer.files) == b''.join(lines)
+    assert writer.bytes_written == sum(len(line) for line in lines)
+
+
+def test_export_source(security_log, tmp_path):
+    result = evtx2jsonl.export_source(EvtxFileSource(security_log), tmp_path, 'Security',
+                                      max_file_size=64 * 1024, buffer_size=16 * 1024)
+    assert result['records read'] == result['documents'] == RECORDS
+    assert result['errors'] == 0
+    assert len(result['files']) > 1
+    documents = [orjson.loads(line) for path in sorted(tmp_path.iterdir()) for line in read(path).splitlines()]
+    assert len(documents) == RECORDS
+    assert len(set(orjson.dumps(document) for document in documents)) == RECORDS
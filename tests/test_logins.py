@@ -0,0 +1,43 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks import fixtures
+
+LOGINS = Path(__file__).parent.parent / 'logins.py'
+
+
+@pytest.fixture(scope='module')
+def logs(security_log, tmp_path_factory) -> Path:
+    """
+    a log directory with two known files, whose events are merged
+    """
+    logs = tmp_path_factory.mktemp('logs')
+    (logs / 'Security.evtx').write_bytes(security_log.read_bytes())
+    fixtures.write_evtx(logs / 'System.evtx', fixtures.security_events(200, seed=2))
+    return logs
+
+
+def logins(logs: Path, *args) -> list:
+    result = subprocess.run([sys.executable, str(LOGINS), str(logs), '--hostname', 'WS01', *args],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=300)
+    return result.stdout.decode('utf-8').splitlines()
+
+
+@pytest.mark.parametrize('args', [
+    ['--processes', '--workers', '1'],
+    ['--processes', '--workers', '3', '--batch-size', '7'],
+    ['--parallel-chunks', '--workers', '2'],
+])
+def test_processes_print_the_same_logins(logs, args):
+    expected = logins(logs, '--workers', '1')
+    assert len(expected) > 0
+    assert logins(logs, *args) == expected
+
+
+def test_processes_stream_the_same_logins(logs):
+    expected = logins(logs, '--stream', '--workers', '1')
+    assert len(expected) > 0
+    assert logins(logs, '--stream', '--processes', '--workers', '3', '--batch-size', '7') == expected
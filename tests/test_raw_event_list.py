@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.DescriptorRegistry import DESCRIPTORS
+from evtxtools import RawEventList as raw_event_list_module
+from evtxtools.EventCache import EventCache
+from evtxtools.EvtxFile import CHUNK_SIZE, EvtxFile, read_chunk_range
+from evtxtools.RawEventList import RawEventList
+from evtxtools.RecordSource import JsonlFileSource
+from evtxtools.Timestamp import TimeWindow
+from tests.conftest import RECORDS
+
+FROM_DATE = fixtures.START + timedelta(hours=1)
+TO_DATE = fixtures.START + timedelta(hours=2)
+
+
+def read(files: list, from_date: datetime = datetime.min, to_date: datetime = datetime.max, **kwargs) -> tuple:
+    """
+    returns the events as tuples, the number of records read and the number of rejected records by reason
+    """
+    event_list = RawEventList(files, DESCRIPTORS.event_ids, from_date, to_date, workers=1, **kwargs)
+    events = [(event.event_id, event.timestamp, event.activity_id) for event in event_list]
+    return events, event_list.records_read, event_list.rejected_records
+
+
+@pytest.fixture
+def cache(tmp_path) -> EventCache:
+    return EventCache(tmp_path / 'cache', 1024 * 1024 * 1024)
+
+
+@pytest.mark.parametrize('from_date,to_date', [(datetime.min, datetime.max), (FROM_DATE, TO_DATE)])
+def test_cache_hit_counts_like_a_miss(security_log, cache, from_date, to_date):
+    events = read([security_log], from_date, to_date)[0]
+    miss = read([security_log], from_date, to_date, cache=cache)
+    hit = read([security_log], from_date, to_date, cache=cache)
+    assert miss[0] == events
+    # the whole file is read to fill the cache, even if only some chunks overlap with the time window
+    assert miss[1] == RECORDS
+    assert hit == miss
+
+
+def test_time_window_fills_the_cache(security_log, cache):
+    read([security_log], FROM_DATE, TO_DATE, cache=cache)
+    assert len(list(cache.directory.glob('*' + EventCache.SUFFIX))) == 1
+    # the whole file has been cached, so that runs with other time windows read it from the cache as well
+    assert read([security_log], cache=cache) == read([security_log])
+
+
+def test_parallel_chunks_count_cache_hits_like_a_miss(security_log, cache):
+    expected = read([security_log])
+    read([security_log], cache=cache)
+    assert read([security_log], cache=cache, parallel_chunks=True) == expected
+
+
+def test_time_window_skips_chunks(security_log, monkeypatch):
+    offsets = list()
+
+    def reading_chunk_range(path, offset: int, count: int) -> list:
+        offsets.extend(range(offset, offset + count * CHUNK_SIZE, CHUNK_SIZE))
+        return read_chunk_range(path, offset, count)
+    monkeypatch.setattr(raw_event_list_module, 'read_chunk_range', reading_chunk_range)
+
+    events, records_read, _ = read([security_log], FROM_DATE, TO_DATE)
+    chunks = EvtxFile(security_log, read_timestamps=True).chunks_in_window(TimeWindow(FROM_DATE, TO_DATE))
+    assert offsets == [chunk.offset for chunk in chunks]
+    assert records_read == sum(chunk.last_record_id - chunk.first_record_id + 1 for chunk in chunks) < RECORDS
+    # the skipped chunks contain no events inside of the window
+    assert events == [event for event in read([security_log])[0] if FROM_DATE <= event[1] <= TO_DATE]
+    assert len(events) > 0
+
+
+@pytest.mark.parametrize('kwargs', [
+    dict(workers=1, batch_size=1, queue_depth=1),
+    dict(workers=3, batch_size=7, queue_depth=1),
+    dict(workers=4, batch_size=1000),
+    dict(workers=2, batch_size=7, use_processes=True),
+    dict(workers=2, batch_size=7, parallel_chunks=True),
+])
+def test_batches(security_log, kwargs):
+    expected = read([security_log])
+    assert expected[1] == RECORDS and len(expected[0]) > 0
+    event_list = RawEventList([security_log], DESCRIPTORS.event_ids, datetime.min, datetime.max, **kwargs)
+    events = [(event.event_id, event.timestamp, event.activity_id) for event in event_list]
+    # the events are returned in the order of the records by a single worker or by the process pool
+    if kwargs['workers'] == 1 or 'use_processes' in kwargs or 'parallel_chunks' in kwargs:
+        assert events == expected[0]
+    else:
+        assert sorted(events) == sorted(expected[0])
+    assert (event_list.records_read, event_list.rejected_records) == expected[1:]
+    # every worker has put its end marker, so the list stays exhausted
+    assert next(event_list, None) is None
+
+
+def test_several_files_and_sources(security_log, tmp_path):
+    copy = tmp_path / 'Security-copy.evtx'
+    copy.write_bytes(security_log.read_bytes())
+    jsonl = tmp_path / 'Security.jsonl'
+    jsonl.write_bytes(b''.join(orjson.dumps(r) + b'\n' for r in fixtures.security_records(security_log)))
+    events = sorted(read([security_log])[0])
+    for kwargs in (dict(), dict(parallel_chunks=True)):
+        result = read([security_log, copy, JsonlFileSource(jsonl)], **kwargs)
+        assert sorted(result[0]) == sorted(events * 3)
+        assert result[1] == 3 * RECORDS
+
+
+class FailingSource(JsonlFileSource):
+    def records(self):
+        yield from super().records()
+        raise RuntimeError("invalid record")
+
+
+@pytest.mark.parametrize('kwargs', [dict(workers=2), dict(workers=2, use_processes=True)])
+def test_reader_error_is_raised_after_the_events(security_log, tmp_path, kwargs):
+    jsonl = tmp_path / 'Security.jsonl'
+    jsonl.write_bytes(b''.join(orjson.dumps(r) + b'\n' for r in fixtures.security_records(security_log)))
+    event_list = RawEventList([FailingSource(jsonl)], DESCRIPTORS.event_ids, datetime.min, datetime.max,
+                              batch_size=10, **kwargs)
+    events = list()
+    with pytest.raises(RuntimeError, match="invalid record"):
+        for event in event_list:
+            events.append(event)
+    assert len(events) == len(read([security_log])[0])
@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.DescriptorRegistry import DESCRIPTORS
+from evtxtools.RawEventList import RawEventList
+from evtxtools.RecordFilter import RecordFilter
+from evtxtools.Timestamp import TimeWindow
+from evtxtools.WindowsEvent import WindowsEvent
+from tests.events import record
+
+NOON = datetime(2020, 11, 23, 12, 0, 0)
+WINDOW = TimeWindow(NOON, NOON + timedelta(hours=1))
+
+
+@pytest.mark.parametrize('timestamp,reason', [
+    (NOON - timedelta(microseconds=1), RecordFilter.REJECTED_BY_TIME),
+    (NOON, None),
+    (NOON + timedelta(minutes=30), None),
+    (NOON + timedelta(hours=1), None),
+    (NOON + timedelta(hours=1, microseconds=1), RecordFilter.REJECTED_BY_TIME),
+])
+def test_time_window(timestamp, reason):
+    assert RecordFilter({4624}, WINDOW).check(record(4624, timestamp)) == reason
+    # the time window is checked first
+    assert RecordFilter(set(), WINDOW).check(record(4624, timestamp)) == (reason or RecordFilter.REJECTED_BY_EVENT_ID)
+    # check_descriptor() and a filter without a time window ignore the timestamp
+    assert RecordFilter({4624}, WINDOW).check_descriptor(record(4624, timestamp)) is None
+    assert RecordFilter({4624}).check(record(4624, timestamp)) is None
+
+
+def test_descriptors():
+    record_filter = RecordFilter({4624, 4634})
+    assert record_filter.check(record(4624, NOON)) is None
+    assert record_filter.check(record(4672, NOON)) == RecordFilter.REJECTED_BY_EVENT_ID
+    assert record_filter.check(record(4624, NOON, channel='System')) == RecordFilter.REJECTED_BY_CHANNEL
+
+
+def test_rejected_records_are_no_events(security_log):
+    record_filter = RecordFilter(DESCRIPTORS.event_ids)
+    rejected = [r for r in fixtures.security_records(security_log) if record_filter.check(r) is not None]
+    assert len(rejected) > 0
+    for r in rejected:
+        with pytest.raises(WindowsEvent.IgnoreThisEvent):
+            WindowsEvent(r)
+
+
+@pytest.mark.parametrize('from_date,to_date', [
+    (datetime.min, datetime.max),
+    (fixtures.START + timedelta(hours=1), fixtures.START + timedelta(hours=2)),
+])
+def test_same_events_without_record_filter(security_log, from_date, to_date):
+    def events(use_record_filter: bool) -> list:
+        event_list = RawEventList([security_log], DESCRIPTORS.event_ids, from_date, to_date, workers=1,
+                                  use_record_filter=use_record_filter)
+        return [(event.event_id, event.timestamp, event.activity_id) for event in event_list]
+    filtered = events(True)
+    assert len(filtered) > 0
+    assert filtered == events(False)
@@ -0,0 +1,98 @@
+import io
+import tarfile
+import zipfile
+
+import orjson
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.RecordSource import ArchiveMemberSource, EvtxFileSource, JsonlFileSource, RecordSource, \
+    archive_stem, record_sources, source_from_spec
+from tests.conftest import RECORDS
+
+MEMBER = 'C/Windows/System32/winevt/Logs/Security.evtx'
+
+
+@pytest.fixture(scope='module')
+def records(security_log) -> list:
+    return fixtures.security_records(security_log)
+
+
+def normalized(records) -> list:
+    return [(r['event_record_id'], r['timestamp'], orjson.loads(r['data'])) for r in records]
+
+
+def write_zip(path, members: dict):
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+
+def write_tar(path, members: dict):
+    compression = {'.gz': 'gz', '.xz': 'xz'}.get(path.suffix, '')
+    with tarfile.open(path, 'w:' + compression) as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+
+def test_record_source_is_abstract():
+    with pytest.raises(TypeError):
+        RecordSource()
+
+
+@pytest.mark.parametrize('filename,write', [
+    ('WS01.zip', write_zip), ('WS01.tar', write_tar), ('WS01.tar.gz', write_tar), ('WS01.tar.xz', write_tar)])
+def test_archive_members(security_log, records, tmp_path, filename, write):
+    jsonl = b''.join(orjson.dumps(r) + b'\n' for r in records)
+    write(tmp_path / filename, {MEMBER: security_log.read_bytes(), 'logs/Security.jsonl': jsonl,
+                                'readme.txt': b'no log'})
+    assert archive_stem(tmp_path / filename) == 'WS01'
+    sources = record_sources(tmp_path / filename)
+    # only the logs are sources, they are read without extracting them
+    assert [source.name for source in sources] == ['Security.evtx', 'Security.jsonl']
+    assert [source.size for source in sources] == [security_log.stat().st_size, len(jsonl)]
+    assert all(source.path is None for source in sources)
+    assert str(sources[0]) == str(tmp_path / filename) + ':' + MEMBER
+    for source in sources:
+        assert normalized(source.records()) == normalized(records)
+
+
+@pytest.mark.parametrize('evtx_dump', [False, True])
+def test_jsonl(records, tmp_path, evtx_dump):
+    path = tmp_path / 'Security.jsonl'
+    with open(path, 'wb') as f:
+        for record in records:
+            # 'evtx_dump -o jsonl' writes only the data of every record
+            f.write((record['data'].replace('\n', '') if evtx_dump else orjson.dumps(record).decode()).encode())
+            f.write(b'\n\n')
+        f.write(b'{"invalid": \n')
+    source = JsonlFileSource(path)
+    # empty lines are skipped and invalid lines are dropped
+    assert normalized(source.records()) == normalized(records)
+
+
+def test_directory(security_log, records, tmp_path):
+    (tmp_path / 'Security.evtx').write_bytes(security_log.read_bytes())
+    (tmp_path / 'Application.jsonl').write_bytes(b''.join(orjson.dumps(r) + b'\n' for r in records))
+    (tmp_path / 'notes.txt').write_text('no log')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'System.evtx').write_bytes(security_log.read_bytes())
+    sources = record_sources(tmp_path)
+    # the logs in subdirectories are not sources of the directory
+    assert [type(source) for source in sources] == [JsonlFileSource, EvtxFileSource]
+    assert [source.name for source in sources] == ['Application.jsonl', 'Security.evtx']
+    assert sources[1].path == tmp_path / 'Security.evtx'
+    assert len(list(sources[1].records())) == RECORDS
+    assert sources[1].errors == 0
+
+
+def test_source_from_spec(security_log, tmp_path):
+    write_zip(tmp_path / 'WS01.zip', {MEMBER: security_log.read_bytes()})
+    (tmp_path / 'Security.jsonl').write_bytes(b'')
+    for source in (EvtxFileSource(security_log), JsonlFileSource(tmp_path / 'Security.jsonl'),
+                   ArchiveMemberSource.members(tmp_path / 'WS01.zip')[0]):
+        copy = source_from_spec(orjson.loads(orjson.dumps(source.spec)))
+        assert type(copy) is type(source)
+        assert (copy.key, copy.name, copy.size) == (source.key, source.name, source.size)
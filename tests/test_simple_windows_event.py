@@ -0,0 +1,98 @@
+from datetime import datetime
+
+import orjson
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.SimpleWindowsEvent import SimpleWindowsEvent
+from tests.events import record
+
+TIMESTAMP = datetime(2020, 11, 23, 8, 0, 0, 123456)
+
+
+def flatten(element: dict, prefix: str = '') -> dict:
+    """
+    the values of all paths of an element, as they had been cached by every SimpleWindowsEvent before
+    """
+    values = dict()
+    for key, value in element.items():
+        if key == '#attributes':
+            values.update((prefix + '/@' + name, v) for name, v in value.items())
+        elif key == '#text':
+            values[prefix] = value
+        elif isinstance(value, dict):
+            values.update(flatten(value, prefix + '/' + key))
+        else:
+            values[prefix + '/' + key] = value
+    return values
+
+
+def system_record(**system) -> dict:
+    r = record(4624, TIMESTAMP, record_id=7, TargetUserName='alice')
+    data = orjson.loads(r['data'])
+    data['Event']['System'].update(system)
+    return dict(r, data=orjson.dumps(data).decode('utf-8'))
+
+
+def test_system_fields():
+    swe = SimpleWindowsEvent(system_record(
+        Provider={'#attributes': {'Name': 'Microsoft-Windows-Security-Auditing', 'Guid': '{54849625}'}},
+        Execution={'#attributes': {'ProcessID': 4, 'ThreadID': '8'}},
+        Correlation={'#attributes': {'ActivityID': '{ABC}'}},
+        Level=0,
+        Security={'#attributes': {'UserID': 'S-1-5-18'}},
+        EventID={'#attributes': {'Qualifiers': ''}, '#text': 4624}))
+    assert (swe.event_id, swe.record_id, swe.level) == (4624, 7, None)
+    assert (swe.provider_name, swe.provider_guid) == ('Microsoft-Windows-Security-Auditing', '{54849625}')
+    assert (swe.process_id, swe.thread_id) == (4, 8)
+    # missing values are converted to strings like before
+    assert (swe.activity_id, swe.related_activity_id) == ('{ABC}', 'None')
+    assert (swe.channel, swe.computer, swe.user) == ('Security', 'WS01.corp.local', 'S-1-5-18')
+    assert swe.timestamp == swe.timecreated == TIMESTAMP
+    assert swe.event_data == {'TargetUserName': 'alice'}
+
+
+def test_paths_are_resolved_like_the_flattened_record(security_log):
+    for r in fixtures.security_records(security_log):
+        swe = SimpleWindowsEvent(r)
+        for path, value in flatten(orjson.loads(r['data'])['Event']).items():
+            assert swe[path] == value
+            assert swe.get_property(path) == value
+
+
+def test_missing_paths():
+    swe = SimpleWindowsEvent(system_record(Provider={'#attributes': {'Name': 'Security'}}))
+    for path in ('/System/Missing', '/System/Channel/Missing', '/System/Provider/@Guid', '/System/Computer/@Name',
+                 '/EventData/TargetUserName/Missing'):
+        assert swe[path] is None
+        with pytest.raises(KeyError):
+            swe.get_property(path)
+    # an element with attributes but without text has no value
+    assert swe['/System/Provider'] is None
+
+
+def test_event_data_is_normalized():
+    r = record(4624, TIMESTAMP, LogonType=3, TargetUserName={'#text': 'alice'})
+    data = orjson.loads(r['data'])
+    data['Event']['EventData']['#attributes'] = {'Name': 'EventData'}
+    swe = SimpleWindowsEvent(dict(r, data=orjson.dumps(data).decode('utf-8')))
+    assert swe.event_data == {'LogonType': '3', 'TargetUserName': 'alice', '@Name': 'EventData'}
+    # the paths still resolve to the original values
+    assert swe['/EventData/LogonType'] == 3
+    assert swe['/EventData/@Name'] == 'EventData'
+    assert orjson.loads(swe.to_json())['Event']['EventData'] == swe.event_data
+
+    with pytest.raises(RuntimeError, match="invalid datatype"):
+        SimpleWindowsEvent(record(4624, TIMESTAMP, TargetUserName={'#attributes': {'Name': 'alice'}}))
+
+
+def test_raw_json():
+    r = record(4624, TIMESTAMP, TargetUserName='alice')
+    swe = SimpleWindowsEvent(r)
+    # the data of the record is reused without serializing it again
+    assert swe.raw_json is r['data']
+    assert SimpleWindowsEvent(dict(r, data=r['data'].encode('utf-8'))).raw_json == r['data']
+    assert orjson.loads(swe.to_json()) == orjson.loads(r['data'])
+
+    r = record(4625, TIMESTAMP)
+    assert SimpleWindowsEvent(r).to_json() == r['data']
@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+from evtxtools.Timestamp import TimeWindow, parse_record_timestamp, parse_system_time, record_timestamp_key
+
+
+@pytest.mark.parametrize('timestamp,expected', [
+    ('2020-11-23 08:00:18.596852 UTC', datetime(2020, 11, 23, 8, 0, 18, 596852)),
+    ('2020-11-23 08:00:18 UTC', datetime(2020, 11, 23, 8, 0, 18)),
+    ('2020-11-23 08:00:18.5 UTC', datetime(2020, 11, 23, 8, 0, 18, 500000)),
+    ('2020-11-23 08:00:18.1234567 UTC', datetime(2020, 11, 23, 8, 0, 18, 123456)),
+    ('2020-11-23 08:00:18.596852', datetime(2020, 11, 23, 8, 0, 18, 596852)),
+])
+def test_parse_record_timestamp(timestamp, expected):
+    assert parse_record_timestamp(timestamp) == expected
+
+
+@pytest.mark.parametrize('timestamp,expected', [
+    ('2020-11-23T08:00:18.596852Z', datetime(2020, 11, 23, 8, 0, 18, 596852)),
+    ('2020-11-23T08:00:18Z', datetime(2020, 11, 23, 8, 0, 18)),
+    ('2020-11-23T08:00:18.1234567Z', datetime(2020, 11, 23, 8, 0, 18, 123456)),
+])
+def test_parse_system_time(timestamp, expected):
+    assert parse_system_time(timestamp) == expected
+
+
+@pytest.mark.parametrize('timestamp', ['', 'yesterday', '2020/11/23 08:00:18 UTC',
+                                       '2020-11-23 08:00:18.x UTC'])
+def test_invalid_timestamps(timestamp):
+    with pytest.raises(ValueError):
+        parse_record_timestamp(timestamp)
+
+
+@pytest.mark.parametrize('timestamp', ['2020-11-23 08:00:18.596852 UTC', '2020-11-23 08:00:18 UTC',
+                                       '2020-11-23 08:00:18.5 UTC'])
+def test_record_timestamp_key(timestamp):
+    assert record_timestamp_key(timestamp) == parse_record_timestamp(timestamp).isoformat(sep=' ',
+                                                                                         timespec='microseconds')
+
+
+def test_keys_sort_like_timestamps():
+    timestamps = ['2020-11-23 08:00:18.596852 UTC', '2020-11-23 08:00:18 UTC', '2020-11-23 08:00:19 UTC',
+                  '2020-11-23 08:00:18.5 UTC', '2019-12-31 23:59:59.999999 UTC']
+    assert sorted(timestamps, key=record_timestamp_key) == sorted(timestamps, key=parse_record_timestamp)
+
+
+FROM_DATE = datetime(2020, 11, 23, 8, 0, 0)
+TO_DATE = datetime(2020, 11, 23, 9, 0, 0)
+
+
+@pytest.mark.parametrize('timestamp,contained', [
+    ('2020-11-23 07:59:59.999999 UTC', False),
+    ('2020-11-23 08:00:00 UTC', True),
+    ('2020-11-23 08:00:00.000000 UTC', True),
+    ('2020-11-23 08:30:00.5 UTC', True),
+    ('2020-11-23 09:00:00 UTC', True),
+    ('2020-11-23 09:00:00.000001 UTC', False),
+])
+def test_time_window_bounds(timestamp, contained):
+    window = TimeWindow(FROM_DATE, TO_DATE)
+    assert window.contains(timestamp) == contained
+    assert window.contains_datetime(parse_record_timestamp(timestamp)) == contained
+
+
+def test_open_time_windows():
+    assert TimeWindow(FROM_DATE).contains('2100-01-01 00:00:00 UTC')
+    assert not TimeWindow(FROM_DATE).contains('2020-01-01 00:00:00 UTC')
+    assert TimeWindow(to_date=TO_DATE).contains('1601-01-01 00:00:00 UTC')
+    assert TimeWindow().contains('2020-01-01 00:00:00 UTC')
+    assert not TimeWindow().bounded
+    assert not TimeWindow(datetime.min, datetime.max).bounded
+    assert TimeWindow(FROM_DATE, datetime.max).bounded
+    assert TimeWindow(datetime.min, TO_DATE).bounded
+
+
+@pytest.mark.parametrize('first,last,overlaps', [
+    (datetime(2020, 11, 23, 7, 0, 0), datetime(2020, 11, 23, 7, 59, 59), False),
+    (datetime(2020, 11, 23, 7, 0, 0), FROM_DATE, True),
+    (datetime(2020, 11, 23, 8, 10, 0), datetime(2020, 11, 23, 8, 20, 0), True),
+    (datetime(2020, 11, 23, 7, 0, 0), datetime(2020, 11, 23, 10, 0, 0), True),
+    (TO_DATE, datetime(2020, 11, 23, 10, 0, 0), True),
+    (datetime(2020, 11, 23, 9, 0, 1), datetime(2020, 11, 23, 10, 0, 0), False),
+])
+def test_time_window_overlaps(first, last, overlaps):
+    assert TimeWindow(FROM_DATE, TO_DATE).overlaps(first, last) == overlaps
@@ -0,0 +1,75 @@
+import pickle
+import sys
+from datetime import datetime
+
+import pytest
+
+from benchmarks import fixtures
+from evtxtools.WindowsEvent import EXTRA_FIELDS, WindowsEvent, projected_fields
+from tests.events import event, record
+
+NOW = datetime(2020, 11, 23, 8, 0, 0, 596852)
+
+
+def login() -> WindowsEvent:
+    return event(4624, NOW, '0x3e7', TargetUserName='alice', TargetDomainName='CORP', WorkstationName='WS02',
+                 IpAddress='10.0.0.2', LogonType=10, SubjectUserSid='S-1-5-18', ProcessName='C:\\winlogon.exe')
+
+
+def test_only_projected_fields_are_kept():
+    e = login()
+    assert e.event_data == {'LogonType': 'RemoteInteractive', 'TargetDomainName': 'CORP', 'TargetUserName': 'alice',
+                            'WorkstationName': 'WS02', 'IpAddress': '10.0.0.2'}
+    assert set(e.event_data) <= set(projected_fields(e.descriptor))
+    assert set(EXTRA_FIELDS) <= set(projected_fields(e.descriptor))
+    # fields which are not projected are dropped, missing fields are None
+    assert e.get('ProcessName') is None
+    assert e.target_user_name == 'alice' and e.workstation_name == 'WS02' and e.ip_address == '10.0.0.2'
+    assert event(4624, NOW).target_user_name is None
+    assert str(e) == "RemoteInteractive login as CORP\\alice from WS02 (10.0.0.2)"
+
+
+def test_slots():
+    e = login()
+    assert not hasattr(e, '__dict__')
+    with pytest.raises(AttributeError):
+        e.hostname = 'WS01'
+
+
+def test_strings_are_interned():
+    first = login()
+    second = login()
+    assert first.target_user_name is second.target_user_name
+    assert first.activity_id is second.activity_id
+
+
+@pytest.mark.parametrize('protocol', range(2, pickle.HIGHEST_PROTOCOL + 1))
+def test_pickle(protocol):
+    e = login()
+    copy = pickle.loads(pickle.dumps(e, protocol=protocol))
+    assert (copy.event_id, copy.timestamp, copy.activity_id, copy.event_data) == \
+           (e.event_id, e.timestamp, e.activity_id, e.event_data)
+    # the descriptor is looked up again, and the strings are interned again
+    assert copy.descriptor is e.descriptor
+    assert copy.target_user_name is e.target_user_name
+    assert str(copy) == str(e)
+    assert copy.latex_str() == e.latex_str()
+
+
+def test_pickled_events_are_smaller_than_their_records(security_log):
+    records = fixtures.security_records(security_log)
+    events = list()
+    for r in records:
+        try:
+            events.append(WindowsEvent(r))
+        except WindowsEvent.IgnoreThisEvent:
+            pass
+    assert len(events) > 0
+    assert all(pickle.loads(pickle.dumps(e)).event_data == e.event_data for e in events)
+    assert len(pickle.dumps(events)) < sum(sys.getsizeof(r['data']) for r in records)
+
+
+def test_correlation_id_is_the_activity():
+    r = record(4648, NOW, SubjectUserName='alice')
+    r['data'] = r['data'].replace('"System":{', '"System":{"Correlation":{"#attributes":{"ActivityID":"{ABC}"}},')
+    assert WindowsEvent(r).activity_id == '{ABC}'